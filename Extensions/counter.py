@@ -4,7 +4,7 @@ Counter Extension für den Discord Bot
 Hauptfunktionen:
 1. Counter-Setup
     - /setup-counter command
-    - Channel-Tracking
+    - Channel-Tracking pro Server
     - Counter-Status speichern
 
 2. Counter-Logik
@@ -13,34 +13,192 @@ Hauptfunktionen:
     - User-Wechsel prüfen
     - Reaktionen senden
     - Fehlermeldungen bei falscher Zahl
+    - Verarbeitung pro Channel strikt nach Snowflake-ID (CounterSequencer)
+
+3. Speicherung
+    - Status liegt im Speicher, counter_data.json ist nur ein Snapshot
+    - Snapshots werden gebündelt (COUNTER_SAVE_DELAY) und atomar im I/O-Thread geschrieben
+    - Beim Entladen des Cogs (auch beim Beenden des Bots) wird sofort gespeichert
+    - Alte Dateien mit nur Channel-IDs werden ins Server-Format übernommen
+
+Format von counter_data.json:
+    {guild_id: {channel_id: {"current_number": int, "last_user": int | None, "active": bool}}}
 """
 
 import discord
 from discord.ext import commands
 from discord import app_commands
+import asyncio
+import heapq
 import json
 import os
+from config import SYSTEM_CONFIG
+from functions import write_json_file, write_json_async
 
 # Datenbank für Counter-Status
 COUNTER_DB = "counter_data.json"
+# Sekunden zwischen der ersten Änderung und dem Snapshot (max. Datenverlust bei einem Absturz)
+COUNTER_SAVE_DELAY = SYSTEM_CONFIG.get("COUNTER_SAVE_DELAY", 5.0)
+# Sekunden, die eine Zahl auf früher gesendete Nachzügler wartet, bevor sie gewertet wird
+COUNTER_REORDER_WINDOW = SYSTEM_CONFIG.get("COUNTER_REORDER_WINDOW", 0.2)
+
+class CounterSequencer:
+    """Wertet Counter-Nachrichten pro Channel einzeln und nach Snowflake-ID aus
+    
+    on_message reiht nur ein. Pro Channel läuft höchstens ein Worker-Task,
+    der immer die kleinste wartende Message-ID abarbeitet, sobald sie
+    COUNTER_REORDER_WINDOW Sekunden in der Queue lag. Gleichzeitig gesendete
+    Zahlen, die in anderer Reihenfolge ankommen, werden so noch richtig
+    einsortiert. apply() ändert den
+    Status synchron, respond() schickt danach Reaktion bzw. Meldung. Der
+    Status wird also nie von zwei Nachrichten gleichzeitig gelesen oder
+    geschrieben, verschiedene Channels laufen trotzdem parallel.
+    Nachrichten, die erst nach einer neueren ausgewertet werden konnten,
+    zählen in stats["late"].
+    """
+    
+    def __init__(self, apply, respond, window: float = COUNTER_REORDER_WINDOW):
+        self.apply = apply      # (message, zahl) -> Ergebnis oder None
+        self.respond = respond  # async (message, ergebnis)
+        self.window = window
+        self._pending = {}  # channel_id -> Heap [(message_id, ankunft, zahl, message)]
+        self._tasks = {}    # channel_id -> Worker-Task
+        self._last = {}     # channel_id -> zuletzt ausgewertete Message-ID
+        self.stats = {"queued": 0, "applied": 0, "late": 0, "failed": 0}
+    
+    def depth(self) -> int:
+        """Anzahl wartender Nachrichten über alle Channels"""
+        return sum(len(pending) for pending in self._pending.values())
+    
+    def enqueue(self, message, number: int):
+        """Reiht eine Zahl für ihren Channel ein"""
+        channel_id = message.channel.id
+        arrived = asyncio.get_running_loop().time()
+        heapq.heappush(self._pending.setdefault(channel_id, []), (message.id, arrived, number, message))
+        self.stats["queued"] += 1
+        if channel_id not in self._tasks:
+            self._tasks[channel_id] = asyncio.create_task(self._worker(channel_id))
+    
+    async def _worker(self, channel_id: int):
+        """Arbeitet die Nachrichten eines Channels nacheinander ab"""
+        loop = asyncio.get_running_loop()
+        try:
+            while self._pending.get(channel_id):
+                # Die älteste Message-ID wartet ihr Fenster ab, ein Nachzügler wird davor einsortiert
+                delay = self._pending[channel_id][0][1] + self.window - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                    continue
+                await self._process(channel_id)
+        finally:
+            self._tasks.pop(channel_id, None)
+            if not self._pending.get(channel_id):
+                self._pending.pop(channel_id, None)
+    
+    async def _process(self, channel_id: int):
+        """Wertet die älteste wartende Nachricht eines Channels aus"""
+        message_id, _, number, message = heapq.heappop(self._pending[channel_id])
+        if message_id < self._last.get(channel_id, 0):
+            self.stats["late"] += 1
+        self._last[channel_id] = max(message_id, self._last.get(channel_id, 0))
+        result = self.apply(message, number)
+        self.stats["applied"] += 1
+        if result is None:
+            return
+        try:
+            await self.respond(message, result)
+        except Exception as e:
+            self.stats["failed"] += 1
+            print(f"Counter-Antwort konnte nicht gesendet werden: {e}")
+    
+    async def close(self):
+        """Wertet alles Wartende ohne Wartefenster aus und beendet die Worker"""
+        # Laufende Antworten nicht abbrechen, die Worker leeren ihre Queues selbst
+        self.window = 0
+        await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+        self._pending.clear()
+        self._last.clear()
 
 class Counter(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        # Alte Einträge ohne Server (channel_id -> Status), bis der Server bekannt ist
+        self.legacy = {}
         self.counter_data = self.load_counter_data()
-        
+        self._save_handle = None
+        self.sequencer = CounterSequencer(self.apply_number, self.respond)
+    
     def load_counter_data(self):
-        """Lädt die Counter-Daten aus der JSON-Datei"""
-        if os.path.exists(COUNTER_DB):
-            with open(COUNTER_DB, 'r') as f:
-                return json.load(f)
-        return {}
-        
+        """Lädt die Counter-Daten aus der JSON-Datei und trennt Einträge im alten Format ab"""
+        if not os.path.exists(COUNTER_DB):
+            return {}
+        with open(COUNTER_DB, 'r') as f:
+            raw = json.load(f)
+        data = {}
+        for key, value in raw.items():
+            if "current_number" in value:
+                # Altes Format: {channel_id: Status} ohne Server-Ebene
+                self.legacy[key] = value
+            else:
+                data[key] = value
+        return data
+    
+    def snapshot(self) -> dict:
+        """Gibt den zu speichernden Stand zurück (noch nicht zugeordnete alte Einträge bleiben erhalten)"""
+        if not self.legacy:
+            return self.counter_data
+        return {**self.legacy, **self.counter_data}
+    
     def save_counter_data(self):
-        """Speichert die Counter-Daten in die JSON-Datei"""
-        with open(COUNTER_DB, 'w') as f:
-            json.dump(self.counter_data, f, indent=4)
-            
+        """Speichert die Counter-Daten sofort (serialisiert jetzt, schreibt atomar im I/O-Thread)"""
+        if self._save_handle is not None:
+            self._save_handle.cancel()
+            self._save_handle = None
+        return write_json_file(COUNTER_DB, self.snapshot(), indent=4)
+    
+    def schedule_save(self):
+        """Merkt eine Änderung vor, alle Änderungen der nächsten COUNTER_SAVE_DELAY Sekunden ergeben einen Snapshot"""
+        if self._save_handle is None:
+            self._save_handle = asyncio.get_running_loop().call_later(COUNTER_SAVE_DELAY, self.save_counter_data)
+    
+    def migrate_channel(self, guild_id: str, channel_id: str) -> bool:
+        """Hängt einen alten Channel-Eintrag unter seinen Server (True wenn etwas übernommen wurde)"""
+        info = self.legacy.pop(channel_id, None)
+        if info is None:
+            return False
+        # Ein im neuen Format angelegter Counter hat Vorrang
+        self.counter_data.setdefault(guild_id, {}).setdefault(channel_id, info)
+        return True
+    
+    def migrate_known_channels(self):
+        """Übernimmt alte Einträge, deren Channel im Cache des Bots liegt"""
+        migrated = False
+        for channel_id in list(self.legacy):
+            channel = self.bot.get_channel(int(channel_id))
+            if channel is not None and getattr(channel, "guild", None) is not None:
+                migrated |= self.migrate_channel(str(channel.guild.id), channel_id)
+        if migrated:
+            self.save_counter_data()
+    
+    async def cog_load(self):
+        """Übernimmt alte Einträge, falls der Bot schon verbunden ist"""
+        if self.legacy and self.bot.is_ready():
+            self.migrate_known_channels()
+    
+    async def cog_unload(self):
+        """Wertet wartende Zahlen aus und schreibt ausstehende Änderungen sofort (bot.close() entlädt alle Cogs)"""
+        await self.sequencer.close()
+        if self._save_handle is not None:
+            self._save_handle.cancel()
+            self._save_handle = None
+            await write_json_async(COUNTER_DB, self.snapshot(), indent=4)
+    
+    @commands.Cog.listener()
+    async def on_ready(self):
+        """Übernimmt alte Einträge, sobald die Channels bekannt sind"""
+        if self.legacy:
+            self.migrate_known_channels()
+    
     @app_commands.command(
         name="setup-counter",
         description="Richtet den Counter in diesem Channel ein"
@@ -50,16 +208,17 @@ class Counter(commands.Cog):
         """Richtet den Counter in einem Channel ein"""
         guild_id = str(interaction.guild_id)
         channel_id = str(interaction.channel_id)
+        self.migrate_channel(guild_id, channel_id)
         
         # Erstelle Guild-Eintrag falls nicht vorhanden
         if guild_id not in self.counter_data:
             self.counter_data[guild_id] = {}
-            
+        
         # Prüfe ob Channel bereits Counter hat
         if channel_id in self.counter_data[guild_id]:
             await interaction.response.send_message("Der Counter ist in diesem Channel bereits aktiv!", ephemeral=True)
             return
-            
+        
         self.counter_data[guild_id][channel_id] = {
             "current_number": 0,
             "last_user": None,
@@ -68,158 +227,65 @@ class Counter(commands.Cog):
         self.save_counter_data()
         
         await interaction.response.send_message("Counter wurde erfolgreich eingerichtet! Beginnt bei 1.", ephemeral=True)
-        
+    
     @commands.Cog.listener()
     async def on_message(self, message):
         """Prüft jede Nachricht auf Counter-Relevanz"""
         if message.author.bot:
             return
-            
+        
         # Ignoriere DMs (keine Guild)
         if not message.guild:
             return
-            
+        
         guild_id = str(message.guild.id)
         channel_id = str(message.channel.id)
+        if self.legacy and self.migrate_channel(guild_id, channel_id):
+            self.schedule_save()
         
         # Prüfe ob Server und Channel Counter-aktiv sind
-        if (guild_id not in self.counter_data or 
-            channel_id not in self.counter_data[guild_id] or 
-            not self.counter_data[guild_id][channel_id]["active"]):
+        counter_info = self.counter_data.get(guild_id, {}).get(channel_id)
+        if counter_info is None or not counter_info["active"]:
             return
-            
+        
         try:
             number = int(message.content)
         except ValueError:
             return
-            
-        counter_info = self.counter_data[guild_id][channel_id]
-        expected_number = counter_info["current_number"] + 1
-        
-        # Prüfe ob die Zahl korrekt ist
-        if number == expected_number:
-            # Prüfe ob der User sich wiederholt
-            if message.author.id == counter_info["last_user"]:
-                await message.channel.send(f"{message.author.mention} hat die Kette ruiniert! Der nächste muss bei 1 anfangen!")
-                counter_info["current_number"] = 0
-                counter_info["last_user"] = None
-            else:
-                # Alles korrekt, füge Checkmark hinzu
-                await message.add_reaction("✅")
-                counter_info["current_number"] = number
-                counter_info["last_user"] = message.author.id
-        else:
-            await message.channel.send(f"{message.author.mention} hat die Kette ruiniert! Der nächste muss bei 1 anfangen!")
-            counter_info["current_number"] = 0
-            counter_info["last_user"] = None
-            
-        self.save_counter_data()
-
-async def setup(bot: commands.Bot) -> None:
-    await bot.add_cog(Counter(bot)) 
-"""
-Counter Extension für den Discord Bot
-
-Hauptfunktionen:
-1. Counter-Setup
-    - /setup-counter command
-    - Channel-Tracking
-    - Counter-Status speichern
-
-2. Counter-Logik
-    - Nachrichten auf Zahlen prüfen
-    - Reihenfolge prüfen
-    - User-Wechsel prüfen
-    - Reaktionen senden
-    - Fehlermeldungen bei falscher Zahl
-"""
-
-import discord
-from discord.ext import commands
-from discord import app_commands
-import json
-import os
-
-# Datenbank für Counter-Status
-COUNTER_DB = "counter_data.json"
-
-class Counter(commands.Cog):
-    def __init__(self, bot):
-        self.bot = bot
-        self.counter_data = self.load_counter_data()
-        
-    def load_counter_data(self):
-        """Lädt die Counter-Daten aus der JSON-Datei"""
-        if os.path.exists(COUNTER_DB):
-            with open(COUNTER_DB, 'r') as f:
-                return json.load(f)
-        return {}
-        
-    def save_counter_data(self):
-        """Speichert die Counter-Daten in die JSON-Datei"""
-        with open(COUNTER_DB, 'w') as f:
-            json.dump(self.counter_data, f, indent=4)
-            
-    @app_commands.command(
-        name="setup-counter",
-        description="Richtet den Counter in diesem Channel ein"
-    )
-    @app_commands.default_permissions(administrator=True)
-    async def setup_counter(self, interaction: discord.Interaction):
-        """Richtet den Counter in einem Channel ein"""
-        channel_id = str(interaction.channel_id)
-        
-        if channel_id in self.counter_data:
-            await interaction.response.send_message("Der Counter ist in diesem Channel bereits aktiv!", ephemeral=True)
-            return
-            
-        self.counter_data[channel_id] = {
-            "current_number": 0,
-            "last_user": None,
-            "active": True
-        }
-        self.save_counter_data()
         
-        await interaction.response.send_message("Counter wurde erfolgreich eingerichtet! Beginnt bei 1.", ephemeral=True)
+        # Auswertung erst im Sequencer, strikt in Reihenfolge der Message-IDs
+        self.sequencer.enqueue(message, number)
+    
+    def apply_number(self, message, number: int):
+        """Wendet eine Zahl auf den Counter-Status an (synchron, vom Sequencer aufgerufen)
         
-    @commands.Cog.listener()
-    async def on_message(self, message):
-        """Prüft jede Nachricht auf Counter-Relevanz"""
-        if message.author.bot:
-            return
-            
-        channel_id = str(message.channel.id)
+        Gibt True (richtig), False (Kette ruiniert) oder None (kein Counter mehr) zurück.
+        """
+        counter_info = self.counter_data.get(str(message.guild.id), {}).get(str(message.channel.id))
+        if counter_info is None or not counter_info["active"]:
+            return None
         
-        # Prüfe ob Channel Counter-aktiv ist
-        if channel_id not in self.counter_data or not self.counter_data[channel_id]["active"]:
-            return
-        #Checkt ob es eine Zahl ist, wenn nicht gehe in Except return
-        try:
-            number = int(message.content)
-        except ValueError:
-            return
-            
-        counter_info = self.counter_data[channel_id]
         expected_number = counter_info["current_number"] + 1
         
-        # Prüfe ob die Zahl korrekt ist
-        if number == expected_number:
-            # Prüfe ob der User sich wiederholt
-            if message.author.id == counter_info["last_user"]:
-                await message.channel.send(f"{message.author.mention} hat die Kette ruiniert! Der nächste muss bei 1 anfangen!")
-                counter_info["current_number"] = 0
-                counter_info["last_user"] = None
-            else:
-                # Alles korrekt, füge Checkmark hinzu
-                await message.add_reaction("✅")
-                counter_info["current_number"] = number
-                counter_info["last_user"] = message.author.id
+        if number == expected_number and message.author.id != counter_info["last_user"]:
+            counter_info["current_number"] = number
+            counter_info["last_user"] = message.author.id
+            correct = True
         else:
-            await message.channel.send(f"{message.author.mention} hat die Kette ruiniert! Der nächste muss bei 1 anfangen!")
+            # Falsche Zahl oder derselbe User zweimal hintereinander
             counter_info["current_number"] = 0
             counter_info["last_user"] = None
-            
-        self.save_counter_data()
+            correct = False
+        self.schedule_save()
+        return correct
+    
+    async def respond(self, message, correct: bool):
+        """Reagiert auf eine ausgewertete Zahl"""
+        if correct:
+            # Alles korrekt, füge Checkmark hinzu
+            await message.add_reaction("✅")
+        else:
+            await message.channel.send(f"{message.author.mention} hat die Kette ruiniert! Der nächste muss bei 1 anfangen!")
 
 async def setup(bot: commands.Bot) -> None:
-    await bot.add_cog(Counter(bot)) 
\ No newline at end of file
+    await bot.add_cog(Counter(bot))
@@ -3,13 +3,937 @@ import discord
 from discord import app_commands
 from functions import *
 from config import DISCORD_IDS, COLORS, ALLOWED_GUILDS
+from leveling import merge_top, SpamFilter
+from storage import guess_format
 import random
 import math
+import asyncio
+import time
+import heapq
+import os
+import tempfile
+import aiohttp
 from asyncio import TimeoutError
+from collections import deque, OrderedDict
+from datetime import datetime
+
+# Intervall in Sekunden, in dem gepufferte XP gutgeschrieben werden
+XP_BATCH_INTERVAL = SYSTEM_CONFIG.get("XP_BATCH_INTERVAL", 2.0)
+# Level-Ups innerhalb dieses Fensters (Sekunden) werden pro Channel zu einem Embed zusammengefasst.
+# Gleichzeitig der Mindestabstand zwischen zwei Nachrichten im selben Channel (Discord: 5 / 5s)
+ANNOUNCE_WINDOW = SYSTEM_CONFIG.get("ANNOUNCE_WINDOW", 3.0)
+ANNOUNCE_MAX_QUEUE = SYSTEM_CONFIG.get("ANNOUNCE_MAX_QUEUE", 100)  # Max. wartende Level-Ups pro Channel
+ANNOUNCE_PER_EMBED = 10  # Max. User pro Sammel-Embed
+RENDER_CACHE_TTL = SYSTEM_CONFIG.get("RENDER_CACHE_TTL", 300)  # Sekunden (Namen/Avatare im Leaderboard)
+RENDER_CACHE_USERS = 10000  # Max. gecachte Fortschrittsdaten
+LEADERBOARD_SIZE = 10
+BACKFILL_BATCH = SYSTEM_CONFIG.get("BACKFILL_BATCH", 5000)  # Nachrichten pro Commit beim History-Backfill
+GLOBAL_AGGREGATE_REFRESH = SYSTEM_CONFIG.get("GLOBAL_AGGREGATE_REFRESH", 60)  # Sekunden zwischen zwei Summen-Berechnungen
+VOICE_XP_PER_MINUTE = SYSTEM_CONFIG.get("VOICE_XP_PER_MINUTE", 2)      # XP pro Minute aktiver Sprachzeit
+VOICE_TICK_INTERVAL = SYSTEM_CONFIG.get("VOICE_TICK_INTERVAL", 60.0)   # Sekunden zwischen zwei Sprach-Gutschriften
+ROLE_UPDATES_PER_SECOND = SYSTEM_CONFIG.get("ROLE_UPDATES_PER_SECOND", 5)  # Rollen-Änderungen pro Sekunde (alle Server)
+SPAM_HISTORY = SYSTEM_CONFIG.get("SPAM_HISTORY", 8)            # Gemerkte Nachrichten pro User für den Duplikat-Vergleich
+SPAM_FILTER_USERS = SYSTEM_CONFIG.get("SPAM_FILTER_USERS", 10000)  # Max. gemerkte User (LRU)
+COLD_SWEEP_INTERVAL = SYSTEM_CONFIG.get("COLD_SWEEP_INTERVAL", 3600)  # Sekunden zwischen zwei Archivierungsläufen
+DOWNLOAD_CHUNK = 64 * 1024  # Bytes pro Lesevorgang beim Herunterladen eines Imports
+RECONCILE_CHUNK = SYSTEM_CONFIG.get("RECONCILE_CHUNK", 1000)  # User pro Schritt beim Einreihen eines Rollen-Abgleichs
+
+WEEKDAYS = {"mo": 0, "di": 1, "mi": 2, "do": 3, "fr": 4, "sa": 5, "so": 6}
+
+def roll_xp(guild_id: str) -> int:
+    """Würfelt die XP für eine Nachricht (live und beim Backfill gleich)"""
+    # Zufällige XP im xp_range des Servers (Standard 1-15)
+    return random.randint(*get_xp_range(guild_id))
+
+def message_xp(guild_id: str, message) -> int:
+    """XP für eine Nachricht inkl. Channel-, Rollen- und Zeit-Multiplikatoren"""
+    xp = roll_xp(guild_id)
+    rules = get_xp_rules(guild_id)
+    if rules:
+        # Beim Backfill ist der Autor evtl. kein Member mehr - dann zählen nur Channel und Zeit
+        role_ids = [role.id for role in getattr(message.author, "roles", ())]
+        xp = round(xp * rules.multiplier(message.channel.id, role_ids, message.created_at.timestamp()))
+    return xp
+
+class XPAccumulator:
+    """Puffert XP-relevante Nachrichten und schreibt sie gebündelt gut
+    
+    on_message hängt nur die Nachricht an eine Queue an (O(1), kein
+    Speicherzugriff). drain() prüft danach pro Nachricht Aktivierung,
+    Blockierung und Cooldown anhand des Nachrichten-Zeitstempels und
+    schreibt die XP pro Server mit einem add_xp_bulk() gut. Cooldown und
+    Level-Ups sind dadurch genauso exakt wie bei der direkten Vergabe.
+    Ist der Spam-Filter eines Servers aktiv, werden Nachrichten nach dem
+    Cooldown zusätzlich auf Mindestlänge und Beinahe-Duplikate geprüft.
+    """
+    
+    def __init__(self, interval: float = XP_BATCH_INTERVAL):
+        self.interval = interval
+        self._queue = deque()
+        self.spam = SpamFilter(SPAM_HISTORY, SPAM_FILTER_USERS)
+        self.stats = {"queued": 0, "granted": 0, "cooldown": 0, "batches": 0}
+    
+    def __len__(self):
+        return len(self._queue)
+    
+    def enqueue(self, message):
+        """Merkt eine Nachricht zur XP-Vergabe vor"""
+        self._queue.append(message)
+        self.stats["queued"] += 1
+    
+    def drain(self) -> list:
+        """Verarbeitet alle gepufferten Nachrichten
+        
+        Gibt die Level-Ups als Liste von (letzte Nachricht des Users, Datensatz) zurück.
+        """
+        batch, self._queue = self._queue, deque()
+        if not batch:
+            return []
+        
+        grants = {}      # guild_id -> {user_id: [xp, nachrichten, last_message_time]}
+        last_seen = {}   # (guild_id, user_id) -> Zeitpunkt der letzten XP-Vergabe
+        latest = {}      # (guild_id, user_id) -> letzte Nachricht mit XP
+        cooldowns = {}   # guild_id -> Cooldown (None wenn Level-System aus)
+        filters = {}     # guild_id -> Spam-Filter-Einstellungen (None wenn aus)
+        
+        for message in batch:
+            guild_id = str(message.guild.id)
+            user_id = str(message.author.id)
+            
+            if guild_id not in cooldowns:
+                cooldowns[guild_id] = get_xp_cooldown(guild_id) if is_level_system_enabled(guild_id) else None
+                settings = get_spam_filter(guild_id)
+                filters[guild_id] = settings if settings["enabled"] else None
+            cooldown = cooldowns[guild_id]
+            if cooldown is None or is_channel_blocked(guild_id, str(message.channel.id)):
+                continue
+            
+            # Cooldown exakt anhand des Nachrichten-Zeitstempels prüfen
+            key = (guild_id, user_id)
+            timestamp = int(message.created_at.timestamp())
+            last = last_seen.get(key)
+            if last is None:
+                last = get_user_level_data(guild_id, user_id)["last_message_time"]
+            if timestamp - last < cooldown:
+                self.stats["cooldown"] += 1
+                continue
+            # Verworfene Nachrichten verbrauchen den Cooldown nicht
+            settings = filters[guild_id]
+            if settings is not None and self.spam.check(guild_id, user_id, message.content, settings["min_length"], settings["distance"]):
+                continue
+            last_seen[key] = timestamp
+            
+            grant = grants.setdefault(guild_id, {}).setdefault(user_id, [0, 0, 0])
+            grant[0] += message_xp(guild_id, message)
+            grant[1] += 1
+            grant[2] = timestamp
+            latest[key] = message
+            self.stats["granted"] += 1
+        
+        level_ups = []
+        for guild_id, users in grants.items():
+            for user_id, old_level, record in add_xp_bulk(guild_id, users):
+                level_ups.append((latest[(guild_id, user_id)], record))
+        self.stats["batches"] += 1
+        return level_ups
+
+class VoiceSession:
+    """Laufende Sprachzeit eines Users"""
+    
+    __slots__ = ("member", "channel", "since", "counting", "seconds", "left")
+    
+    def __init__(self, member, channel, since: float, counting: bool):
+        self.member = member
+        self.channel = channel
+        self.since = since          # Beginn des aktuellen Abschnitts
+        self.counting = counting    # Zählt der aktuelle Abschnitt?
+        self.seconds = 0.0          # Gesammelte (gewichtete) Sekunden, noch nicht gutgeschrieben
+        self.left = False
+
+class VoiceTracker:
+    """Sprachzeit pro User im Speicher, XP-Gutschrift gebündelt
+    
+    on_voice_state_update schließt nur den laufenden Abschnitt einer
+    Session ab (O(1), kein Speicherzugriff). Zeit zählt nur in einem
+    Sprach-Channel, der nicht der AFK-Channel ist, und nur ohne Mute oder
+    Deafen (selbst oder durch den Server). Die XP-Multiplikatoren des
+    Servers gelten auch hier.
+    
+    Gutgeschrieben wird in drain() - beim Tick alle VOICE_TICK_INTERVAL
+    Sekunden und beim Entladen des Cogs, auch für verlassene Sessions:
+    pro Server ein add_xp_bulk() für alle User, egal wie viele im Channel
+    sind. Angefangene Minuten bleiben als Rest in der Session (nach dem
+    Verlassen verfällt der Rest unter einer Minute).
+    """
+    
+    def __init__(self, xp_per_minute: int = VOICE_XP_PER_MINUTE, interval: float = VOICE_TICK_INTERVAL):
+        self.xp_per_minute = xp_per_minute
+        self.interval = interval
+        self._sessions = {}  # (guild_id, user_id) -> VoiceSession
+        self.stats = {"joins": 0, "leaves": 0, "updates": 0, "minutes": 0, "batches": 0, "writes": 0}
+    
+    def __len__(self):
+        return sum(1 for session in self._sessions.values() if not session.left)
+    
+    @staticmethod
+    def _counts(state) -> bool:
+        """Prüft, ob Sprachzeit in diesem Zustand zählt"""
+        channel = state.channel
+        if channel is None:
+            return False
+        afk_channel = channel.guild.afk_channel
+        if afk_channel is not None and channel.id == afk_channel.id:
+            return False
+        return not (state.self_mute or state.self_deaf or state.mute or state.deaf)
+    
+    def _close(self, session: VoiceSession, now: float):
+        """Bucht die Zeit seit Beginn des Abschnitts (gewichtet mit den Multiplikatoren)"""
+        if session.counting and now > session.since:
+            factor = 1.0
+            rules = get_xp_rules(str(session.member.guild.id))
+            if rules:
+                role_ids = [role.id for role in getattr(session.member, "roles", ())]
+                factor = rules.multiplier(session.channel.id, role_ids, now)
+            session.seconds += (now - session.since) * factor
+        session.since = now
+    
+    def update(self, member, before, after, now: float = None):
+        """Verarbeitet eine Änderung des Sprachstatus"""
+        now = time.time() if now is None else now
+        key = (str(member.guild.id), str(member.id))
+        session = self._sessions.get(key)
+        if session is not None:
+            self._close(session, now)
+        
+        if after.channel is None:
+            if session is not None and not session.left:
+                session.left = True
+                session.counting = False
+                self.stats["leaves"] += 1
+            return
+        
+        counting = self._counts(after)
+        if session is None:
+            if not is_level_system_enabled(key[0]):
+                return
+            self._sessions[key] = VoiceSession(member, after.channel, now, counting)
+            self.stats["joins"] += 1
+        else:
+            if session.left:
+                self.stats["joins"] += 1
+            session.member = member
+            session.channel = after.channel
+            session.counting = counting
+            session.left = False
+            self.stats["updates"] += 1
+    
+    def seed(self, guild, now: float = None):
+        """Übernimmt User, die beim Start bereits in Sprach-Channels sind"""
+        now = time.time() if now is None else now
+        for channel in list(guild.voice_channels) + list(getattr(guild, "stage_channels", [])):
+            for member in channel.members:
+                key = (str(guild.id), str(member.id))
+                if member.bot or key in self._sessions or member.voice is None:
+                    continue
+                self._sessions[key] = VoiceSession(member, channel, now, self._counts(member.voice))
+                self.stats["joins"] += 1
+    
+    def drain(self, now: float = None) -> list:
+        """Schreibt die Sprachzeit aller Sessions gut
+        
+        Gibt die Level-Ups als Liste von (Member, Channel, Datensatz) zurück.
+        """
+        now = time.time() if now is None else now
+        grants = {}   # guild_id -> {user_id: (xp, 0, 0)}
+        sessions = {}
+        for key, session in list(self._sessions.items()):
+            self._close(session, now)
+            minutes = int(session.seconds // 60)
+            if minutes:
+                session.seconds -= minutes * 60
+                guild_id, user_id = key
+                grants.setdefault(guild_id, {})[user_id] = (minutes * self.xp_per_minute, 0, 0)
+                sessions[key] = session
+                self.stats["minutes"] += minutes
+            if session.left:
+                del self._sessions[key]
+        
+        level_ups = []
+        for guild_id, users in grants.items():
+            # Keine Nachrichten, last_message_time bleibt -> Text-Cooldown unberührt
+            for user_id, old_level, record in add_xp_bulk(guild_id, users, timestamp=int(now)):
+                session = sessions[(guild_id, user_id)]
+                level_ups.append((session.member, session.channel, record))
+            self.stats["writes"] += 1
+        self.stats["batches"] += 1
+        return level_ups
+
+class AnnouncementQueue:
+    """Ausgehende Level-Up-Nachrichten mit einer Queue pro Channel
+    
+    Pro Channel läuft höchstens ein Sender-Task. Er wartet ANNOUNCE_WINDOW
+    Sekunden, sammelt bis zu ANNOUNCE_PER_EMBED Level-Ups und schickt sie
+    als ein Embed. Dadurch gehen pro Channel höchstens 1 Nachricht pro
+    Fenster raus, egal wie viele User gleichzeitig aufsteigen. Steigt ein
+    User erneut auf, solange er noch wartet, wird sein Eintrag ersetzt.
+    Volle Queues verwerfen neue Level-Ups (gezählt in stats["dropped"]).
+    """
+    
+    def __init__(self, window: float = ANNOUNCE_WINDOW, max_queue: int = ANNOUNCE_MAX_QUEUE):
+        self.window = window
+        self.max_queue = max_queue
+        self._pending = {}   # channel_id -> OrderedDict(user_id -> (member, user_data))
+        self._tasks = {}     # channel_id -> Sender-Task
+        self._channels = {}  # channel_id -> Channel-Objekt
+        self.stats = {"queued": 0, "merged": 0, "dropped": 0, "sent": 0, "announced": 0, "failed": 0}
+    
+    def depth(self) -> int:
+        """Anzahl wartender Level-Ups über alle Channels"""
+        return sum(len(pending) for pending in self._pending.values())
+    
+    def enqueue(self, channel, member, user_data: dict):
+        """Reiht ein Level-Up für einen Channel ein"""
+        pending = self._pending.setdefault(channel.id, OrderedDict())
+        if member.id in pending:
+            self.stats["merged"] += 1
+        elif len(pending) >= self.max_queue:
+            self.stats["dropped"] += 1
+            return
+        else:
+            self.stats["queued"] += 1
+        pending[member.id] = (member, user_data)
+        self._channels[channel.id] = channel
+        if channel.id not in self._tasks:
+            self._tasks[channel.id] = asyncio.create_task(self._sender(channel))
+    
+    async def _sender(self, channel):
+        """Schickt die Level-Ups eines Channels gebündelt im Takt des Fensters"""
+        try:
+            while self._pending.get(channel.id):
+                await asyncio.sleep(self.window)
+                await self._send_batch(channel)
+        finally:
+            self._tasks.pop(channel.id, None)
+            if not self._pending.get(channel.id):
+                self._pending.pop(channel.id, None)
+                self._channels.pop(channel.id, None)
+    
+    async def _send_batch(self, channel):
+        """Schickt bis zu ANNOUNCE_PER_EMBED wartende Level-Ups als ein Embed"""
+        pending = self._pending.get(channel.id)
+        batch = []
+        while pending and len(batch) < ANNOUNCE_PER_EMBED:
+            batch.append(pending.popitem(last=False)[1])
+        if not batch:
+            return
+        try:
+            await channel.send(embed=self.build_embed(batch))
+            self.stats["sent"] += 1
+            self.stats["announced"] += len(batch)
+        except Exception as e:
+            self.stats["failed"] += 1
+            print(f"Level-Up Nachricht konnte nicht gesendet werden: {e}")
+    
+    @staticmethod
+    def build_embed(batch: list) -> discord.Embed:
+        """Baut das Embed für ein einzelnes oder mehrere Level-Ups"""
+        if len(batch) == 1:
+            member, user_data = batch[0]
+            new_level = user_data["level"]
+            embed = discord.Embed(
+                title="🎉 Level-Up!",
+                description=f"**{member.display_name}** ist auf Level **{new_level}** aufgestiegen!",
+                color=COLORS["green"]
+            )
+            embed.set_thumbnail(url=member.display_avatar.url)
+            embed.add_field(
+                name="📊 Neue Statistiken",
+                value=f"**Level:** {new_level}\n"
+                      f"**XP:** {user_data['xp']:,}\n"
+                      f"**Nachrichten:** {user_data['messages']:,}",
+                inline=True
+            )
+            return embed
+        
+        lines = [
+            f"**{member.display_name}** ist auf Level **{user_data['level']}** aufgestiegen!"
+            for member, user_data in batch
+        ]
+        return discord.Embed(
+            title=f"🎉 {len(batch)} Level-Ups!",
+            description="\n".join(lines),
+            color=COLORS["green"]
+        )
+    
+    async def close(self):
+        """Stoppt die Sender-Tasks und schickt alles Wartende sofort"""
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for channel_id in list(self._pending):
+            channel = self._channels.get(channel_id)
+            while channel is not None and self._pending.get(channel_id):
+                await self._send_batch(channel)
+        self._pending.clear()
+        self._channels.clear()
+
+class RoleRewardQueue:
+    """Vergibt Level-Rollen gebündelt und gedrosselt
+    
+    Jede Level-Änderung (Text, Sprache, Backfill) landet über den
+    Level-Listener als Ziel-Level in einer Queue pro Member - mehrere
+    Änderungen desselben Members vor der Verarbeitung fallen zu einer
+    zusammen. Nach einer neuen Level-Kurve wird der ganze Server
+    abgeglichen: eingereiht werden nur User ab der niedrigsten
+    Belohnungs-Stufe (aus dem Rang-Index, in Schritten von RECONCILE_CHUNK)
+    und Members, die noch eine Belohnungs-Rolle tragen. Der Worker
+    berechnet den Diff erst beim Anwenden gegen die aktuellen Rollen und
+    braucht pro Member höchstens eine Anfrage;
+    zwischen zwei Anfragen wartet er 1 / ROLE_UPDATES_PER_SECOND Sekunden.
+    Fortschritt großer Abgleiche steht in jobs.
+    """
+    
+    def __init__(self, bot, rate: float = ROLE_UPDATES_PER_SECOND):
+        self.bot = bot
+        self.rate = rate
+        self._pending = OrderedDict()  # (guild_id, user_id) -> Ziel-Level (neuestes gewinnt)
+        self._wakeup = asyncio.Event()
+        self._task = None
+        self._scans = {}  # guild_id -> Task, der einen Abgleich einreiht
+        self.jobs = {}  # guild_id -> {"total", "done", "changed", "failed", "scanning", "started", "finished"}
+        self.stats = {"queued": 0, "merged": 0, "changed": 0, "unchanged": 0, "missing": 0, "failed": 0}
+    
+    def depth(self) -> int:
+        return len(self._pending)
+    
+    def start(self):
+        self._task = asyncio.create_task(self._worker())
+    
+    async def close(self):
+        tasks = [*self._scans.values(), *([self._task] if self._task else [])]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+    
+    def on_level_change(self, guild_id: str, user_id: str, old_record: dict, record: dict):
+        """Level-Listener: reiht Members mit geändertem Level ein"""
+        if not get_reward_table(guild_id):
+            return
+        if user_id is None:
+            self.reconcile(guild_id)
+        elif old_record is None or old_record["level"] != record["level"]:
+            self.enqueue(guild_id, user_id, record["level"])
+    
+    def enqueue(self, guild_id: str, user_id: str, level: int):
+        key = (guild_id, user_id)
+        if key in self._pending:
+            self.stats["merged"] += 1
+        else:
+            self.stats["queued"] += 1
+        self._pending[key] = level
+        self._wakeup.set()
+    
+    def reconcile(self, guild_id: str) -> dict:
+        """Startet den Abgleich eines Servers und gibt den Fortschritt zurück (total wächst beim Einreihen)"""
+        previous = self._scans.pop(guild_id, None)
+        if previous is not None:
+            previous.cancel()
+        job = {"total": 0, "done": 0, "changed": 0, "failed": 0, "scanning": True,
+               "started": time.monotonic(), "finished": None}
+        self.jobs[guild_id] = job
+        self._scans[guild_id] = asyncio.create_task(self._scan(guild_id, job))
+        return job
+    
+    async def _scan(self, guild_id: str, job: dict):
+        """Reiht alle User ein, deren Rollen sich ändern können, ohne den Loop zu blockieren"""
+        try:
+            table = get_reward_table(guild_id)
+            seen = set()
+            if table:
+                # Absteigend nach XP bis zur niedrigsten Stufe, das Archiv wird dafür nicht entpackt
+                for user_id, level in iter_ranked_levels(guild_id, table.levels[0]):
+                    seen.add(user_id)
+                    self._enqueue_job(guild_id, user_id, level, job)
+                    if len(seen) % RECONCILE_CHUNK == 0:
+                        await asyncio.sleep(0)
+            # Members unter der Schwelle mit Belohnungs-Rolle (z.B. nach einer steileren Kurve)
+            guild = self.bot.get_guild(int(guild_id))
+            holders = set()
+            if guild is not None:
+                for role_id in table.managed:
+                    role = guild.get_role(role_id)
+                    if role is not None:
+                        holders.update(str(member.id) for member in role.members)
+            holders = list(holders - seen)
+            curve = get_xp_curve(guild_id)
+            for start in range(0, len(holders), RECONCILE_CHUNK):
+                chunk = holders[start:start + RECONCILE_CHUNK]
+                xp = get_level_xp_many(guild_id, chunk)
+                for user_id in chunk:
+                    self._enqueue_job(guild_id, user_id, curve.level_for(xp.get(user_id, 0)), job)
+                await asyncio.sleep(0)
+        finally:
+            if self._scans.get(guild_id) is asyncio.current_task():
+                del self._scans[guild_id]
+            job["scanning"] = False
+            if job["finished"] is None and job["done"] >= job["total"]:
+                job["finished"] = time.monotonic()
+    
+    def _enqueue_job(self, guild_id: str, user_id: str, level: int, job: dict):
+        job["total"] += 1
+        self.enqueue(guild_id, user_id, level)
+    
+    async def _worker(self):
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            while self._pending:
+                (guild_id, user_id), level = self._pending.popitem(last=False)
+                try:
+                    outcome = await self._apply(guild_id, user_id, level)
+                except Exception as e:
+                    print(f"Fehler bei Level-Rollen ({guild_id}/{user_id}): {e}")
+                    outcome = "failed"
+                self.stats[outcome] += 1
+                job = self.jobs.get(guild_id)
+                if job is not None and job["finished"] is None:
+                    job["done"] += 1
+                    if outcome in ("changed", "failed"):
+                        job[outcome] += 1
+                    if not job["scanning"] and job["done"] >= job["total"]:
+                        job["finished"] = time.monotonic()
+                if outcome in ("changed", "failed"):
+                    await asyncio.sleep(1 / self.rate)
+                else:
+                    await asyncio.sleep(0)
+    
+    async def _apply(self, guild_id: str, user_id: str, level: int) -> str:
+        """Gleicht die Rollen eines Members ab (höchstens eine API-Anfrage)"""
+        guild = self.bot.get_guild(int(guild_id))
+        member = guild.get_member(int(user_id)) if guild is not None else None
+        if member is None:
+            return "missing"
+        table = get_reward_table(guild_id)
+        add, remove = table.diff(level, [role.id for role in member.roles])
+        # Rollen, die es nicht mehr gibt oder die über der Bot-Rolle liegen, überspringen
+        top_role = guild.me.top_role
+        add = [role for role in map(guild.get_role, add) if role is not None and role < top_role]
+        remove = [role for role in map(guild.get_role, remove) if role is not None and role < top_role]
+        if not add and not remove:
+            return "unchanged"
+        reason = f"Level-Belohnung (Level {level})"
+        try:
+            if add and remove:
+                keep = [role for role in member.roles if role not in remove and not role.is_default()]
+                await member.edit(roles=keep + add, reason=reason)
+            elif add:
+                await member.add_roles(*add, reason=reason, atomic=False)
+            else:
+                await member.remove_roles(*remove, reason=reason, atomic=False)
+        except discord.HTTPException:
+            return "failed"
+        return "changed"
+
+class RenderCache:
+    """Fertige Leaderboard-Embeds pro Server und Fortschrittsdaten pro User
+    
+    Invalidiert wird über den Level-Listener (register_level_listener) nur,
+    wenn eine XP-Änderung das Ergebnis wirklich betrifft:
+    - Leaderboard: der User steht in den Top-K, die Top-K sind noch nicht
+      voll oder der User überholt den letzten Platz
+    - Fortschritt: der eigene Datensatz des Users hat sich geändert
+    - Neue Level-Kurve: alle Einträge des Servers
+    Leaderboard-Einträge laufen zusätzlich nach RENDER_CACHE_TTL Sekunden
+    ab, damit geänderte Namen und Avatare nachgezogen werden.
+    """
+    
+    def __init__(self, ttl: float = RENDER_CACHE_TTL, max_users: int = RENDER_CACHE_USERS):
+        self.ttl = ttl
+        self.max_users = max_users
+        self._leaderboards = {}         # guild_id -> (Ablaufzeit, Embed, {user_id}, (xp, user_id) des letzten Platzes, voll)
+        self._progress = OrderedDict()  # (guild_id, user_id) -> (xp, current_xp, needed_xp, percentage, progress_bar)
+        self.stats = {
+            "leaderboard_hits": 0, "leaderboard_misses": 0, "leaderboard_invalidations": 0,
+            "progress_hits": 0, "progress_misses": 0, "progress_invalidations": 0,
+        }
+    
+    def on_level_change(self, guild_id: str, user_id: str, old_record: dict, record: dict):
+        """Level-Listener: verwirft betroffene Cache-Einträge"""
+        if user_id is None:
+            self.invalidate_guild(guild_id)
+            return
+        if self._progress.pop((guild_id, user_id), None) is not None:
+            self.stats["progress_invalidations"] += 1
+        
+        entry = self._leaderboards.get(guild_id)
+        if entry is None:
+            return
+        _, _, top_ids, (last_xp, last_id), full = entry
+        if (user_id in top_ids or not full
+                or record["xp"] > last_xp
+                or (record["xp"] == last_xp and int(user_id) < int(last_id))):
+            del self._leaderboards[guild_id]
+            self.stats["leaderboard_invalidations"] += 1
+    
+    def invalidate_guild(self, guild_id: str):
+        """Verwirft alle Einträge eines Servers"""
+        if self._leaderboards.pop(guild_id, None) is not None:
+            self.stats["leaderboard_invalidations"] += 1
+        stale = [key for key in self._progress if key[0] == guild_id]
+        for key in stale:
+            del self._progress[key]
+        self.stats["progress_invalidations"] += len(stale)
+    
+    def get_leaderboard(self, guild_id: str):
+        """Gibt das gecachte Leaderboard-Embed zurück (None bei Miss)"""
+        entry = self._leaderboards.get(guild_id)
+        if entry is not None and entry[0] > time.monotonic():
+            self.stats["leaderboard_hits"] += 1
+            return entry[1]
+        self.stats["leaderboard_misses"] += 1
+        return None
+    
+    def store_leaderboard(self, guild_id: str, leaderboard_data: list, embed: discord.Embed):
+        """Merkt sich ein fertiges Leaderboard-Embed samt Top-K"""
+        last_id, last_data = leaderboard_data[-1]
+        self._leaderboards[guild_id] = (
+            time.monotonic() + self.ttl,
+            embed,
+            {user_id for user_id, _ in leaderboard_data},
+            (last_data["xp"], last_id),
+            len(leaderboard_data) >= LEADERBOARD_SIZE
+        )
+    
+    def progress(self, guild_id: str, user_id: str, xp: int) -> tuple:
+        """Gibt (current_xp, needed_xp, percentage, progress_bar) zurück (gecacht)"""
+        key = (guild_id, user_id)
+        entry = self._progress.get(key)
+        if entry is not None and entry[0] == xp:
+            self._progress.move_to_end(key)
+            self.stats["progress_hits"] += 1
+            return entry[1:]
+        self.stats["progress_misses"] += 1
+        
+        current_xp, needed_xp, percentage = get_progress_to_next_level(xp, guild_id)
+        progress_bar_length = 20
+        filled_length = int((percentage / 100) * progress_bar_length)
+        progress_bar = "█" * filled_length + "░" * (progress_bar_length - filled_length)
+        
+        self._progress[key] = (xp, current_xp, needed_xp, percentage, progress_bar)
+        if len(self._progress) > self.max_users:
+            self._progress.popitem(last=False)
+        return current_xp, needed_xp, percentage, progress_bar
+
+class GlobalLeaderboard:
+    """Serverübergreifende Rangliste über alle Server aus ALLOWED_GUILDS["level"]
+    
+    Pro Server werden die Top-K gecacht. Der Level-Listener verwirft nur
+    die Liste des betroffenen Servers und nur, wenn die Änderung dessen
+    Top-K betrifft (gleiche Regel wie im RenderCache). Beim Abruf werden
+    nur verworfene Server neu gelesen und alle Listen per Heap
+    verschmolzen - Kosten O(K · Server) statt O(alle User).
+    
+    Die Summe pro User über alle Server (Threshold-Algorithmus) wird bei
+    jeder XP-Änderung als veraltet markiert und beim Abruf höchstens alle
+    GLOBAL_AGGREGATE_REFRESH Sekunden neu berechnet.
+    """
+    
+    def __init__(self, limit: int = LEADERBOARD_SIZE, refresh: float = GLOBAL_AGGREGATE_REFRESH):
+        self.limit = limit
+        self.refresh = refresh
+        self._tops = {}           # guild_id -> ([(user_id, xp)], {user_id}, (xp, user_id) des letzten Platzes, voll)
+        self._merged = None       # (Server-Liste, [(guild_id, user_id, xp)])
+        self._aggregate = None    # (Berechnungszeit, [(user_id, summe)])
+        self._aggregate_dirty = True
+        self.stats = {"hits": 0, "guild_refreshes": 0, "merges": 0, "aggregate_runs": 0, "aggregate_reads": 0}
+    
+    def on_level_change(self, guild_id: str, user_id: str, old_record: dict, record: dict):
+        """Level-Listener: verwirft die Top-K eines Servers, wenn die Änderung sie betrifft"""
+        if user_id is None:
+            return  # Neue Level-Kurve, XP bleiben gleich
+        self._aggregate_dirty = True
+        entry = self._tops.get(guild_id)
+        if entry is None:
+            return
+        _, top_ids, (last_xp, last_id), full = entry
+        if (user_id in top_ids or not full
+                or record["xp"] > last_xp
+                or (record["xp"] == last_xp and int(user_id) < int(last_id))):
+            del self._tops[guild_id]
+            self._merged = None
+    
+    def _refresh_guild(self, guild_id: str):
+        entries = [(user_id, user_data["xp"]) for user_id, user_data in get_leaderboard(guild_id, self.limit)]
+        last_id, last_xp = entries[-1] if entries else ("0", 0)
+        self._tops[guild_id] = (entries, {user_id for user_id, _ in entries}, (last_xp, last_id), len(entries) >= self.limit)
+        self.stats["guild_refreshes"] += 1
+    
+    def top(self) -> list:
+        """Gibt die globalen Top-K als (guild_id, user_id, xp) zurück"""
+        guild_ids = get_level_guilds()
+        if self._merged is not None and self._merged[0] == guild_ids:
+            self.stats["hits"] += 1
+            return self._merged[1]
+        for guild_id in guild_ids:
+            if guild_id not in self._tops:
+                self._refresh_guild(guild_id)
+        merged = merge_top({guild_id: self._tops[guild_id][0] for guild_id in guild_ids}, self.limit)
+        self._merged = (guild_ids, merged)
+        self.stats["merges"] += 1
+        return merged
+    
+    def aggregate(self) -> list:
+        """Gibt die Top-K nach XP-Summe über alle Server als (user_id, summe) zurück"""
+        now = time.monotonic()
+        if self._aggregate is not None and (not self._aggregate_dirty or now - self._aggregate[0] < self.refresh):
+            self.stats["hits"] += 1
+            return self._aggregate[1]
+        self._aggregate_dirty = False
+        ranking, reads = get_global_aggregate(get_level_guilds(), self.limit)
+        self._aggregate = (now, ranking)
+        self.stats["aggregate_runs"] += 1
+        self.stats["aggregate_reads"] += reads
+        return ranking
+
+class HistoryBackfill:
+    """Vergibt XP rückwirkend aus der Channel-History eines Servers
+    
+    Die History aller nicht blockierten Text-Channels wird gestreamt und
+    nach Snowflake-ID (= Zeitpunkt) zusammengeführt. Dadurch gelten
+    Cooldown und XP-Regeln genau wie bei on_message, auch über Channels
+    hinweg. XP werden im Speicher gesammelt und alle BACKFILL_BATCH
+    Nachrichten mit einem add_xp_bulk() gutgeschrieben. Direkt danach
+    wird der Checkpoint gespeichert:
+    - cutoff: Einrichtung des Level-Systems (setup_id), neuere Nachrichten
+      hat on_message bereits gewertet
+    - positions: letzte verarbeitete Nachricht pro Channel
+    - recent: letzte Vergabe der User, die am Checkpoint noch im Cooldown sind
+    Nach einem Neustart setzt /level-backfill an diesem Stand wieder an.
+    """
+    
+    def __init__(self, guild, state: dict, report_channel=None):
+        self.guild = guild
+        self.guild_id = str(guild.id)
+        self.state = state
+        self.report_channel = report_channel
+        self.cooldown = get_xp_cooldown(self.guild_id)
+        spam_filter = get_spam_filter(self.guild_id)
+        self.spam_filter = spam_filter if spam_filter["enabled"] else None
+        self.spam = SpamFilter(SPAM_HISTORY, SPAM_FILTER_USERS)
+        self.processed = 0        # Nachrichten in diesem Lauf
+        self.started = time.monotonic()
+        self.task = None
+    
+    def throughput(self) -> float:
+        """Verarbeitete Nachrichten pro Sekunde in diesem Lauf"""
+        elapsed = time.monotonic() - self.started
+        return self.processed / elapsed if elapsed > 0 else 0.0
+    
+    def is_spam(self, user_id: str, message) -> bool:
+        """Spam-Filter wie bei on_message (eigener Verlauf, die History ist zeitversetzt)"""
+        settings = self.spam_filter
+        if settings is None:
+            return False
+        return self.spam.check(self.guild_id, user_id, message.content, settings["min_length"], settings["distance"]) is not None
+    
+    def channels(self) -> list:
+        """Alle Text-Channels, die gelesen werden dürfen und nicht blockiert sind"""
+        channels = []
+        for channel in self.guild.text_channels:
+            if is_channel_blocked(self.guild_id, str(channel.id)):
+                continue
+            permissions = channel.permissions_for(self.guild.me)
+            if permissions.view_channel and permissions.read_message_history:
+                channels.append(channel)
+        return channels
+    
+    async def _next(self, streams: dict, heap: list, channel_id: int):
+        """Holt die nächste Nachricht eines Channels in den Heap"""
+        try:
+            message = await streams[channel_id].__anext__()
+        except StopAsyncIteration:
+            del streams[channel_id]
+            return
+        except discord.HTTPException as e:
+            print(f"Backfill: Channel {channel_id} übersprungen: {e}")
+            del streams[channel_id]
+            return
+        heapq.heappush(heap, (message.id, channel_id, message))
+    
+    def _commit(self, grants: dict, recent: dict, last_timestamp: int):
+        """Schreibt gesammelte XP gut und speichert den Checkpoint"""
+        if grants:
+            add_xp_bulk(self.guild_id, {user_id: tuple(grant) for user_id, grant in grants.items()})
+            grants.clear()
+        # Nur User, die am Checkpoint noch im Cooldown sind, müssen gemerkt werden
+        self.state["recent"] = {
+            user_id: timestamp for user_id, timestamp in recent.items()
+            if last_timestamp - timestamp < self.cooldown
+        }
+        recent.clear()
+        recent.update(self.state["recent"])
+        # Kopie speichern, positions ändert sich bis zum nächsten Checkpoint weiter
+        save_backfill_state(self.guild_id, {**self.state, "positions": dict(self.state["positions"]), "recent": dict(self.state["recent"])})
+    
+    async def run(self):
+        """Führt den Backfill aus (als Hintergrund-Task)"""
+        state = self.state
+        cutoff = discord.Object(id=state["cutoff"])
+        positions = state["positions"]
+        recent = dict(state["recent"])
+        grants = {}       # user_id -> [xp, nachrichten, last_message_time]
+        since_commit = 0
+        last_timestamp = 0
+        
+        streams = {}
+        for channel in self.channels():
+            after = discord.Object(id=positions[str(channel.id)]) if str(channel.id) in positions else None
+            streams[channel.id] = channel.history(limit=None, after=after, before=cutoff, oldest_first=True).__aiter__()
+        heap = []
+        for channel_id in list(streams):
+            await self._next(streams, heap, channel_id)
+        
+        try:
+            while heap:
+                _, channel_id, message = heapq.heappop(heap)
+                positions[str(channel_id)] = message.id
+                self.processed += 1
+                state["messages"] += 1
+                since_commit += 1
+                
+                if not message.author.bot:
+                    # Gleiche Cooldown-Regel wie on_message, nur mit historischem Zeitstempel
+                    user_id = str(message.author.id)
+                    timestamp = int(message.created_at.timestamp())
+                    last_timestamp = timestamp
+                    last = recent.get(user_id)
+                    if last is None or timestamp - last >= self.cooldown:
+                        if self.is_spam(user_id, message):
+                            state["suppressed"] = state.get("suppressed", 0) + 1
+                        else:
+                            recent[user_id] = timestamp
+                            grant = grants.setdefault(user_id, [0, 0, 0])
+                            grant[0] += message_xp(self.guild_id, message)
+                            grant[1] += 1
+                            grant[2] = timestamp
+                            state["granted"] += 1
+                
+                if channel_id in streams:
+                    await self._next(streams, heap, channel_id)
+                if since_commit >= BACKFILL_BATCH:
+                    self._commit(grants, recent, last_timestamp)
+                    since_commit = 0
+                    # Live-XP und Befehle zwischen den Batches laufen lassen
+                    await asyncio.sleep(0)
+            
+            state["done"] = True
+        finally:
+            # Auch bei Abbruch den bisherigen Stand sichern
+            self._commit(grants, recent, last_timestamp)
+        
+        print(f"Backfill {self.guild_id}: {self.processed:,} Nachrichten, {self.throughput():,.0f} Nachrichten/s")
+        if self.report_channel is not None:
+            embed = discord.Embed(
+                title="✅ XP-Backfill abgeschlossen",
+                description=f"**Nachrichten:** {state['messages']:,}\n"
+                           f"**XP-Vergaben:** {state['granted']:,}\n"
+                           f"**Als Spam verworfen:** {state.get('suppressed', 0):,}\n"
+                           f"**Durchsatz:** {self.throughput():,.0f} Nachrichten/s",
+                color=COLORS["green"]
+            )
+            try:
+                await self.report_channel.send(embed=embed)
+            except discord.HTTPException:
+                pass
 
 class Level(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        self.xp_buffer = XPAccumulator()
+        self.announcements = AnnouncementQueue()
+        self.render_cache = RenderCache()
+        self.global_leaderboard = GlobalLeaderboard()
+        self.voice = VoiceTracker()
+        self.role_rewards = RoleRewardQueue(bot)
+        self.backfills = {}  # guild_id -> HistoryBackfill
+        self.transfers = set()  # guild_ids mit laufendem Export/Import
+        register_level_listener(self.render_cache.on_level_change)
+        register_level_listener(self.global_leaderboard.on_level_change)
+        register_level_listener(self.role_rewards.on_level_change)
+        self._xp_task = None
+        self._voice_task = None
+        self._archive_task = None
+    
+    async def cog_load(self):
+        """Startet die gebündelte XP-Vergabe (Nachrichten und Sprachzeit)"""
+        self._xp_task = asyncio.create_task(self._xp_worker())
+        self._voice_task = asyncio.create_task(self._voice_worker())
+        self._archive_task = asyncio.create_task(self._archive_worker())
+        self.role_rewards.start()
+        if self.bot.is_ready():
+            for guild in self.bot.guilds:
+                self.voice.seed(guild)
+    
+    async def cog_unload(self):
+        """Stoppt die Worker, schreibt gepufferte XP und Sprachzeit gut und verschickt wartende Level-Ups"""
+        if self._xp_task:
+            self._xp_task.cancel()
+        if self._voice_task:
+            self._voice_task.cancel()
+        if self._archive_task:
+            self._archive_task.cancel()
+        tasks = [backfill.task for backfill in self.backfills.values() if backfill.task and not backfill.task.done()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await self.flush_xp()
+        self.flush_voice()
+        await self.announcements.close()
+        await self.role_rewards.close()
+        unregister_level_listener(self.render_cache.on_level_change)
+        unregister_level_listener(self.global_leaderboard.on_level_change)
+        unregister_level_listener(self.role_rewards.on_level_change)
+    
+    async def _xp_worker(self):
+        """Schreibt die gepufferten XP in festen Intervallen gut"""
+        while True:
+            await asyncio.sleep(self.xp_buffer.interval)
+            try:
+                await self.flush_xp()
+            except Exception as e:
+                print(f"Fehler bei der XP-Vergabe: {e}")
+    
+    async def flush_xp(self):
+        """Verarbeitet die gepufferten Nachrichten und verschickt Level-Ups"""
+        for message, user_data in self.xp_buffer.drain():
+            self.announce_level_up(message, user_data)
+    
+    async def _voice_worker(self):
+        """Schreibt die Sprachzeit in festen Intervallen gut"""
+        while True:
+            await asyncio.sleep(self.voice.interval)
+            try:
+                self.flush_voice()
+            except Exception as e:
+                print(f"Fehler bei der Sprach-XP-Vergabe: {e}")
+    
+    async def _archive_worker(self):
+        """Verschiebt regelmäßig inaktive User ins Archiv"""
+        while True:
+            await asyncio.sleep(COLD_SWEEP_INTERVAL)
+            for guild_id in get_level_guilds():
+                try:
+                    archived = await archive_inactive_users(guild_id)
+                    if archived:
+                        print(f"Level-Archiv {guild_id}: {archived:,} inaktive User archiviert")
+                except Exception as e:
+                    print(f"Fehler beim Archivieren inaktiver User: {e}")
+    
+    def flush_voice(self):
+        """Schreibt die gesammelte Sprachzeit gut und verschickt Level-Ups"""
+        for member, channel, user_data in self.voice.drain():
+            self.announce(member.guild, member, channel, user_data)
     
     @app_commands.command(
         name="setup-level",
@@ -29,7 +953,7 @@ class Level(commands.Cog):
             await interaction.response.send_message(embed=embed, ephemeral=True)
             return
         
-        if setup_level_system(guild_id):
+        if setup_level_system(guild_id, interaction.id):
             # Setze Announcement-Channel wenn angegeben
             if announcement_channel:
                 set_announcement_channel(guild_id, str(announcement_channel.id))
@@ -248,13 +1172,12 @@ class Level(commands.Cog):
             await interaction.response.send_message(embed=embed, ephemeral=True)
             return
         
-        # Fortschritt zum nächsten Level berechnen
-        current_xp, needed_xp, percentage = get_progress_to_next_level(user_data["xp"])
+        # Fortschritt zum nächsten Level (gecacht bis sich die XP ändern)
+        current_xp, needed_xp, percentage, progress_bar = self.render_cache.progress(guild_id, user_id, user_data["xp"])
         
-        # Progress Bar erstellen
-        progress_bar_length = 20
-        filled_length = int((percentage / 100) * progress_bar_length)
-        progress_bar = "█" * filled_length + "░" * (progress_bar_length - filled_length)
+        # Platzierung aus dem Rang-Index (ohne den Server zu sortieren)
+        rank_info = get_user_rank(guild_id, user_id)
+        rank_text = f"**Platz:** {rank_info[0]:,} von {rank_info[1]:,}\n" if rank_info else ""
         
         embed = discord.Embed(
             title=f"🎮 Level von {interaction.user.display_name}",
@@ -264,7 +1187,8 @@ class Level(commands.Cog):
         
         embed.add_field(
             name="📊 Statistiken",
-            value=f"**Level:** {user_data['level']}\n"
+            value=f"{rank_text}"
+                  f"**Level:** {user_data['level']}\n"
                   f"**XP:** {user_data['xp']:,}\n"
                   f"**Nachrichten:** {user_data['messages']:,}",
             inline=True
@@ -305,23 +1229,18 @@ class Level(commands.Cog):
             await interaction.response.send_message(embed=embed, ephemeral=True)
             return
         
+        # Früh bestätigen, die Namen im Umfeld können REST-Anfragen brauchen
+        await interaction.response.defer()
+        
+        # Ohne Level-Daten ein leerer Datensatz (Level 0)
         user_data = get_user_level_data(guild_id, user_id)
-        if not user_data:
-            embed = discord.Embed(
-                title="❌ Keine Daten",
-                description=f"{user.display_name} hat noch keine Level-Daten!",
-                color=COLORS["orange"]
-            )
-            await interaction.response.send_message(embed=embed, ephemeral=True)
-            return
         
-        # Fortschritt zum nächsten Level berechnen
-        current_xp, needed_xp, percentage = get_progress_to_next_level(user_data["xp"])
+        # Fortschritt zum nächsten Level (gecacht bis sich die XP ändern)
+        current_xp, needed_xp, percentage, progress_bar = self.render_cache.progress(guild_id, user_id, user_data["xp"])
         
-        # Progress Bar erstellen
-        progress_bar_length = 20
-        filled_length = int((percentage / 100) * progress_bar_length)
-        progress_bar = "█" * filled_length + "░" * (progress_bar_length - filled_length)
+        # Platzierung aus dem Rang-Index (ohne den Server zu sortieren)
+        rank_info = get_user_rank(guild_id, user_id)
+        rank_text = f"**Platz:** {rank_info[0]:,} von {rank_info[1]:,}\n" if rank_info else ""
         
         embed = discord.Embed(
             title=f"🎮 Level von {user.display_name}",
@@ -331,7 +1250,8 @@ class Level(commands.Cog):
         
         embed.add_field(
             name="📊 Statistiken",
-            value=f"**Level:** {user_data['level']}\n"
+            value=f"{rank_text}"
+                  f"**Level:** {user_data['level']}\n"
                   f"**XP:** {user_data['xp']:,}\n"
                   f"**Nachrichten:** {user_data['messages']:,}",
             inline=True
@@ -352,7 +1272,23 @@ class Level(commands.Cog):
             inline=False
         )
         
-        await interaction.response.send_message(embed=embed)
+        # Umfeld in der Rangliste (2 Plätze darüber und darunter)
+        neighbours = get_users_around(guild_id, user_id, 2)
+        if neighbours:
+            names = await user_resolver.resolve(self.bot, interaction.guild, [entry_id for _, entry_id, _ in neighbours])
+            lines = []
+            for position, entry_id, entry_data in neighbours:
+                entry_user = names[int(entry_id)]
+                name = entry_user.display_name if entry_user is not None else f"Unbekannter User ({entry_id})"
+                line = f"**{position}.** {name} • {entry_data['xp']:,} XP"
+                lines.append(f"➤ {line}" if entry_id == user_id else line)
+            embed.add_field(
+                name="🏅 Umfeld",
+                value="\n".join(lines),
+                inline=False
+            )
+        
+        await interaction.followup.send(embed=embed)
     
     @app_commands.command(
         name="leaderboard",
@@ -371,7 +1307,16 @@ class Level(commands.Cog):
             await interaction.response.send_message(embed=embed, ephemeral=True)
             return
         
-        leaderboard_data = get_leaderboard(guild_id, 10)
+        # Früh bestätigen, das Auflösen der User kann REST-Anfragen brauchen
+        await interaction.response.defer()
+        
+        # Fertiges Embed aus dem Cache, solange sich die Top-K nicht geändert haben
+        cached_embed = self.render_cache.get_leaderboard(guild_id)
+        if cached_embed is not None:
+            await interaction.followup.send(embed=cached_embed)
+            return
+        
+        leaderboard_data = get_leaderboard(guild_id, LEADERBOARD_SIZE)
         
         if not leaderboard_data:
             embed = discord.Embed(
@@ -379,9 +1324,12 @@ class Level(commands.Cog):
                 description="Noch keine Level-Daten vorhanden!",
                 color=COLORS["blue"]
             )
-            await interaction.response.send_message(embed=embed)
+            await interaction.followup.send(embed=embed)
             return
         
+        # Alle User auf einmal auflösen (Cache zuerst, Rest parallel)
+        users = await user_resolver.resolve(self.bot, interaction.guild, [user_id for user_id, _ in leaderboard_data])
+        
         embed = discord.Embed(
             title="🏆 Server-Rangliste",
             description="Die Top 10 User nach XP",
@@ -393,11 +1341,11 @@ class Level(commands.Cog):
         
         leaderboard_text = ""
         for i, (user_id, user_data) in enumerate(leaderboard_data):
-            try:
-                user = await self.bot.fetch_user(int(user_id))
+            user = users[int(user_id)]
+            if user is not None:
                 username = user.display_name
                 avatar = user.display_avatar.url
-            except:
+            else:
                 username = f"Unbekannter User ({user_id})"
                 avatar = None
             
@@ -415,7 +1363,136 @@ class Level(commands.Cog):
             inline=False
         )
         
-        await interaction.response.send_message(embed=embed)
+        self.render_cache.store_leaderboard(guild_id, leaderboard_data, embed)
+        await interaction.followup.send(embed=embed)
+    
+    @app_commands.command(
+        name="leaderboard-week",
+        description="Zeigt die Top 10 User der letzten 7 Tage an"
+    )
+    async def leaderboard_week(self, interaction: discord.Interaction):
+        """Zeigt die Wochen-Rangliste an"""
+        await self.send_activity_leaderboard(interaction, 7, "🏆 Wochen-Rangliste", "Die Top 10 User nach XP der letzten 7 Tage")
+    
+    @app_commands.command(
+        name="leaderboard-month",
+        description="Zeigt die Top 10 User der letzten 30 Tage an"
+    )
+    async def leaderboard_month(self, interaction: discord.Interaction):
+        """Zeigt die Monats-Rangliste an"""
+        await self.send_activity_leaderboard(interaction, 30, "🏆 Monats-Rangliste", "Die Top 10 User nach XP der letzten 30 Tage")
+    
+    async def send_activity_leaderboard(self, interaction: discord.Interaction, days: int, title: str, description: str):
+        """Rangliste eines Zeitfensters aus den Tages-Buckets (ohne Nachrichten-Scan)"""
+        guild_id = str(interaction.guild_id)
+        
+        if not is_level_system_enabled(guild_id):
+            embed = discord.Embed(
+                title="❌ Level-System nicht aktiv",
+                description="Das Level-System ist in diesem Server nicht aktiviert!",
+                color=COLORS["red"]
+            )
+            await interaction.response.send_message(embed=embed, ephemeral=True)
+            return
+        
+        await interaction.response.defer()
+        
+        leaderboard_data = get_activity_leaderboard(guild_id, days, LEADERBOARD_SIZE)
+        
+        if not leaderboard_data:
+            embed = discord.Embed(
+                title=title,
+                description=f"In den letzten {days} Tagen wurden keine XP gesammelt!",
+                color=COLORS["blue"]
+            )
+            await interaction.followup.send(embed=embed)
+            return
+        
+        users = await user_resolver.resolve(self.bot, interaction.guild, [user_id for user_id, _ in leaderboard_data])
+        
+        embed = discord.Embed(
+            title=title,
+            description=description,
+            color=COLORS["violet"]
+        )
+        
+        medals = ["🥇", "🥈", "🥉", "4️⃣", "5️⃣", "6️⃣", "7️⃣", "8️⃣", "9️⃣", "🔟"]
+        
+        leaderboard_text = ""
+        for i, (user_id, xp) in enumerate(leaderboard_data):
+            user = users[int(user_id)]
+            username = user.display_name if user is not None else f"Unbekannter User ({user_id})"
+            medal = medals[i] if i < len(medals) else f"{i+1}."
+            leaderboard_text += f"{medal} **{username}** • {xp:,} XP\n"
+            
+            if i == 0 and user is not None:
+                embed.set_thumbnail(url=user.display_avatar.url)
+        
+        embed.add_field(
+            name="🏅 Rangliste",
+            value=leaderboard_text,
+            inline=False
+        )
+        
+        await interaction.followup.send(embed=embed)
+    
+    @app_commands.command(
+        name="leaderboard-global",
+        description="Zeigt die Top 10 über alle Server mit Level-System an"
+    )
+    @app_commands.describe(modus="server: bester Eintrag pro Server-Rangliste, summe: XP eines Users über alle Server addiert")
+    @app_commands.choices(modus=[
+        app_commands.Choice(name="Pro Server", value="server"),
+        app_commands.Choice(name="Summe", value="summe"),
+    ])
+    async def leaderboard_global(self, interaction: discord.Interaction, modus: str = "server"):
+        """Zeigt die serverübergreifende Rangliste an"""
+        await interaction.response.defer()
+        
+        if modus == "summe":
+            entries = [(None, user_id, xp) for user_id, xp in self.global_leaderboard.aggregate()]
+            description = "Die Top 10 User nach XP-Summe über alle Server"
+        else:
+            entries = self.global_leaderboard.top()
+            description = "Die Top 10 Einträge aller Server-Ranglisten"
+        
+        if not entries:
+            embed = discord.Embed(
+                title="🌍 Globale Rangliste",
+                description="Noch keine Level-Daten vorhanden!",
+                color=COLORS["blue"]
+            )
+            await interaction.followup.send(embed=embed)
+            return
+        
+        users = await user_resolver.resolve(self.bot, None, [user_id for _, user_id, _ in entries])
+        
+        embed = discord.Embed(
+            title="🌍 Globale Rangliste",
+            description=description,
+            color=COLORS["violet"]
+        )
+        
+        medals = ["🥇", "🥈", "🥉", "4️⃣", "5️⃣", "6️⃣", "7️⃣", "8️⃣", "9️⃣", "🔟"]
+        
+        leaderboard_text = ""
+        for i, (guild_id, user_id, xp) in enumerate(entries):
+            user = users[int(user_id)]
+            username = user.display_name if user is not None else f"Unbekannter User ({user_id})"
+            medal = medals[i] if i < len(medals) else f"{i+1}."
+            leaderboard_text += f"{medal} **{username}** • {xp:,} XP"
+            if guild_id is not None:
+                guild = self.bot.get_guild(int(guild_id))
+                leaderboard_text += f" • {guild.name if guild else guild_id}"
+            leaderboard_text += "\n"
+        
+        embed.add_field(
+            name="🏅 Rangliste",
+            value=leaderboard_text,
+            inline=False
+        )
+        
+        await interaction.followup.send(embed=embed)
     
     @app_commands.command(
         name="show-announcement",
@@ -483,60 +1560,911 @@ class Level(commands.Cog):
         if not message.guild:
             return
         
-        guild_id = str(message.guild.id)
-        user_id = str(message.author.id)
-        channel_id = str(message.channel.id)
+        # Prüfung und Vergabe laufen gebündelt im XP-Worker
+        self.xp_buffer.enqueue(message)
+    
+    @commands.Cog.listener()
+    async def on_voice_state_update(self, member, before, after):
+        """Event für Sprach-XP: schließt nur den laufenden Abschnitt ab"""
+        if member.bot:
+            return
+        self.voice.update(member, before, after)
+    
+    @commands.Cog.listener()
+    async def on_ready(self):
+        """Übernimmt User, die beim Start bereits in Sprach-Channels sind"""
+        for guild in self.bot.guilds:
+            self.voice.seed(guild)
+    
+    def announce_level_up(self, message, user_data: dict):
+        """Reiht die Level-Up-Benachrichtigung in die Queue des Ziel-Channels ein"""
+        self.announce(message.guild, message.author, message.channel, user_data)
+    
+    def announce(self, guild, member, fallback_channel, user_data: dict):
+        """Reiht ein Level-Up im Announcement-Channel ein (sonst im übergebenen Channel)"""
+        guild_id = str(guild.id)
+        
+        # Announcement-Channel oder (Fallback) aktueller Channel
+        channel = None
+        announcement_channel_id = get_announcement_channel(guild_id)
+        if announcement_channel_id:
+            try:
+                channel = guild.get_channel(int(announcement_channel_id))
+            except (TypeError, ValueError):
+                channel = None
+        if channel is None:
+            channel = fallback_channel
+        
+        self.announcements.enqueue(channel, member, user_data)
+    
+    @app_commands.command(
+        name="level-backfill",
+        description="Vergibt XP rückwirkend aus der Nachrichten-History (setzt einen abgebrochenen Lauf fort)"
+    )
+    @app_commands.describe(
+        seit="Nur für ältere Server: Datum, seit dem das Level-System aktiv ist (TT.MM.JJJJ)"
+    )
+    @app_commands.default_permissions(administrator=True)
+    async def level_backfill(self, interaction: discord.Interaction, seit: str = None):
+        """Startet oder setzt den History-Backfill im Hintergrund fort"""
+        guild_id = str(interaction.guild_id)
         
-        # Prüfe ob Level-System aktiviert ist
         if not is_level_system_enabled(guild_id):
+            embed = discord.Embed(
+                title="❌ Level-System nicht aktiv",
+                description="Richte zuerst das Level-System mit `/setup-level` ein!",
+                color=COLORS["red"]
+            )
+            await interaction.response.send_message(embed=embed, ephemeral=True)
             return
         
-        # Prüfe ob Channel blockiert ist
-        if is_channel_blocked(guild_id, channel_id):
+        running = self.backfills.get(guild_id)
+        if running and running.task and not running.task.done():
+            await interaction.response.send_message("Der Backfill läuft bereits! Status mit `/level-backfill-status`.", ephemeral=True)
             return
         
-        # Prüfe Cooldown
-        if not can_gain_xp(guild_id, user_id):
+        state = get_backfill_state(guild_id)
+        if state and state.get("done"):
+            await interaction.response.send_message("Der Backfill wurde für diesen Server bereits abgeschlossen.", ephemeral=True)
             return
         
-        # Zufällige XP zwischen 1-15
-        xp_gained = random.randint(1, 15)
-        
-        # XP hinzufügen und prüfen ob Level-Up
-        level_up = add_xp_to_user(guild_id, user_id, xp_gained)
+        setup_id = get_level_setup_id(guild_id)
+        if setup_id is None:
+            # Server von vor der Speicherung des Einrichtungszeitpunkts: ohne Angabe würden
+            # alle live gewerteten Nachrichten ein zweites Mal XP geben
+            try:
+                since = datetime.strptime(seit, "%d.%m.%Y") if seit else None
+            except ValueError:
+                since = None
+            if since is None:
+                embed = discord.Embed(
+                    title="❌ Einrichtungsdatum unbekannt",
+                    description="Für diesen Server ist nicht gespeichert, seit wann das Level-System aktiv ist.\n"
+                               "Gib das Datum mit `/level-backfill seit:TT.MM.JJJJ` an - nur ältere Nachrichten "
+                               "werden nachträglich gewertet, neuere haben bereits XP gegeben.",
+                    color=COLORS["red"]
+                )
+                await interaction.response.send_message(embed=embed, ephemeral=True)
+                return
+            setup_id = discord.utils.time_snowflake(since.astimezone())
+            set_level_setup_id(guild_id, setup_id)
+        # Nachrichten nach der Einrichtung hat on_message bereits gewertet
+        cutoff = min(setup_id, interaction.id)
+        
+        resumed = state is not None
+        if not resumed:
+            state = {"cutoff": cutoff, "positions": {}, "recent": {}, "messages": 0, "granted": 0, "suppressed": 0, "done": False}
+        else:
+            # Ältere Checkpoints hatten den Start-Befehl als Grenze
+            state["cutoff"] = min(state["cutoff"], cutoff)
         
-        if level_up:
-            # Level-Up Benachrichtigung
-            user_data = get_user_level_data(guild_id, user_id)
-            new_level = user_data["level"]
+        backfill = HistoryBackfill(interaction.guild, state, interaction.channel)
+        backfill.task = asyncio.create_task(backfill.run())
+        self.backfills[guild_id] = backfill
+        
+        embed = discord.Embed(
+            title="⏳ XP-Backfill fortgesetzt" if resumed else "⏳ XP-Backfill gestartet",
+            description=f"Die History von **{len(backfill.channels())} Channels** wird im Hintergrund ausgewertet.\n"
+                       f"Bereits verarbeitet: **{state['messages']:,}** Nachrichten\n\n"
+                       f"Status mit `/level-backfill-status`.",
+            color=COLORS["blue"]
+        )
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+    
+    @app_commands.command(
+        name="level-backfill-status",
+        description="Zeigt den Fortschritt des XP-Backfills an"
+    )
+    @app_commands.default_permissions(administrator=True)
+    async def level_backfill_status(self, interaction: discord.Interaction):
+        """Zeigt Fortschritt und Durchsatz des History-Backfills an"""
+        guild_id = str(interaction.guild_id)
+        state = get_backfill_state(guild_id)
+        backfill = self.backfills.get(guild_id)
+        
+        if state is None and backfill is None:
+            await interaction.response.send_message("Für diesen Server lief noch kein Backfill.", ephemeral=True)
+            return
+        if backfill is not None:
+            state = backfill.state
+        
+        if state.get("done"):
+            status = "✅ Abgeschlossen"
+        elif backfill and backfill.task and not backfill.task.done():
+            status = "⏳ Läuft"
+        else:
+            status = "⏸️ Unterbrochen (mit `/level-backfill` fortsetzen)"
+        
+        embed = discord.Embed(
+            title="📥 XP-Backfill",
+            description=f"**Status:** {status}\n"
+                       f"**Nachrichten:** {state['messages']:,}\n"
+                       f"**XP-Vergaben:** {state['granted']:,}\n"
+                       f"**Als Spam verworfen:** {state.get('suppressed', 0):,}\n"
+                       f"**Channels mit Checkpoint:** {len(state['positions']):,}",
+            color=COLORS["blue"]
+        )
+        if backfill is not None:
+            embed.add_field(
+                name="⚡ Durchsatz",
+                value=f"{backfill.processed:,} Nachrichten in diesem Lauf\n"
+                      f"{backfill.throughput():,.0f} Nachrichten/s",
+                inline=False
+            )
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+    
+    @app_commands.command(
+        name="level-backfill-stop",
+        description="Hält den XP-Backfill an (Fortsetzen mit /level-backfill)"
+    )
+    @app_commands.default_permissions(administrator=True)
+    async def level_backfill_stop(self, interaction: discord.Interaction):
+        """Hält den History-Backfill an, der Checkpoint bleibt erhalten"""
+        backfill = self.backfills.get(str(interaction.guild_id))
+        if backfill is None or backfill.task is None or backfill.task.done():
+            await interaction.response.send_message("Es läuft kein Backfill.", ephemeral=True)
+            return
+        backfill.task.cancel()
+        await asyncio.gather(backfill.task, return_exceptions=True)
+        await interaction.response.send_message(
+            f"Backfill angehalten nach **{backfill.state['messages']:,}** Nachrichten. Fortsetzen mit `/level-backfill`.",
+            ephemeral=True
+        )
+    
+    @app_commands.command(
+        name="level-export",
+        description="Exportiert alle Level-Daten des Servers als Datei"
+    )
+    @app_commands.describe(format="JSONL (eine Zeile pro User) oder CSV")
+    @app_commands.choices(format=[
+        app_commands.Choice(name="JSONL", value="jsonl"),
+        app_commands.Choice(name="CSV", value="csv"),
+    ])
+    @app_commands.default_permissions(administrator=True)
+    async def level_export(self, interaction: discord.Interaction, format: str = "jsonl"):
+        """Schreibt die User blockweise in eine temporäre Datei und schickt sie als Anhang"""
+        guild_id = str(interaction.guild_id)
+        
+        if not is_level_system_enabled(guild_id):
+            embed = discord.Embed(
+                title="❌ Level-System nicht aktiv",
+                description="Richte zuerst das Level-System mit `/setup-level` ein!",
+                color=COLORS["red"]
+            )
+            await interaction.response.send_message(embed=embed, ephemeral=True)
+            return
+        if guild_id in self.transfers:
+            await interaction.response.send_message("Es läuft bereits ein Export oder Import!", ephemeral=True)
+            return
+        
+        self.transfers.add(guild_id)
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        handle, path = tempfile.mkstemp(suffix=f".{format}")
+        try:
+            start = time.perf_counter()
+            with open(handle, "w", encoding="utf-8", newline="") as file:
+                for rows in export_level_users(guild_id, file, format):
+                    # Zwischen zwei Blöcken kommen Events und Befehle durch
+                    await asyncio.sleep(0)
+            duration = time.perf_counter() - start
+            
+            size = os.path.getsize(path)
+            if size > interaction.guild.filesize_limit:
+                embed = discord.Embed(
+                    title="❌ Export zu groß",
+                    description=f"Die Datei ist **{size / 1024 / 1024:.1f} MB** groß, Discord erlaubt hier "
+                               f"**{interaction.guild.filesize_limit / 1024 / 1024:.0f} MB**.\n"
+                               f"Exportiere direkt auf dem Server mit `python storage.py export {guild_id} <datei>`.",
+                    color=COLORS["red"]
+                )
+                await interaction.followup.send(embed=embed, ephemeral=True)
+                return
             
             embed = discord.Embed(
-                title="🎉 Level-Up!",
-                description=f"**{message.author.display_name}** ist auf Level **{new_level}** aufgestiegen!",
+                title="📤 Level-Export",
+                description=f"**{rows:,}** User in {duration:.1f}s exportiert.\n"
+                           f"Wieder einlesen mit `/level-import`.",
                 color=COLORS["green"]
             )
-            embed.set_thumbnail(url=message.author.display_avatar.url)
+            await interaction.followup.send(
+                embed=embed,
+                file=discord.File(path, filename=f"levels-{guild_id}.{format}"),
+                ephemeral=True
+            )
+        finally:
+            self.transfers.discard(guild_id)
+            os.remove(path)
+    
+    @app_commands.command(
+        name="level-import",
+        description="Importiert Level-Daten aus einer JSONL- oder CSV-Datei"
+    )
+    @app_commands.describe(
+        datei="Datei aus /level-export (Spalten: user_id, xp, optional messages, last_message_time)",
+        modus="Vorhandene Daten überschreiben oder XP und Nachrichten addieren"
+    )
+    @app_commands.choices(modus=[
+        app_commands.Choice(name="Überschreiben", value="replace"),
+        app_commands.Choice(name="Addieren", value="add"),
+    ])
+    @app_commands.default_permissions(administrator=True)
+    async def level_import(self, interaction: discord.Interaction, datei: discord.Attachment, modus: str = "replace"):
+        """Lädt die Datei gestreamt herunter und importiert sie blockweise"""
+        guild_id = str(interaction.guild_id)
+        
+        if not is_level_system_enabled(guild_id):
+            embed = discord.Embed(
+                title="❌ Level-System nicht aktiv",
+                description="Richte zuerst das Level-System mit `/setup-level` ein!",
+                color=COLORS["red"]
+            )
+            await interaction.response.send_message(embed=embed, ephemeral=True)
+            return
+        if guild_id in self.transfers:
+            await interaction.response.send_message("Es läuft bereits ein Export oder Import!", ephemeral=True)
+            return
+        
+        self.transfers.add(guild_id)
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        fmt = guess_format(datei.filename)
+        handle, path = tempfile.mkstemp(suffix=f".{fmt}")
+        try:
+            # Attachment.read() würde die ganze Datei in den Speicher laden
+            with open(handle, "wb") as file:
+                async with aiohttp.ClientSession() as session:
+                    async with session.get(datei.url) as response:
+                        response.raise_for_status()
+                        async for chunk in response.content.iter_chunked(DOWNLOAD_CHUNK):
+                            file.write(chunk)
+            
+            start = time.perf_counter()
+            with open(path, encoding="utf-8-sig", newline="") as file:
+                for state in import_level_users(guild_id, file, fmt, modus):
+                    await asyncio.sleep(0)
+            duration = time.perf_counter() - start
+        except (aiohttp.ClientError, ValueError) as e:
+            print(f"Fehler beim Level-Import: {e}")
+            embed = discord.Embed(
+                title="❌ Import fehlgeschlagen",
+                description=f"Die Datei konnte nicht gelesen werden: `{e}`",
+                color=COLORS["red"]
+            )
+            await interaction.followup.send(embed=embed, ephemeral=True)
+            return
+        finally:
+            self.transfers.discard(guild_id)
+            os.remove(path)
+        
+        embed = discord.Embed(
+            title="📥 Level-Import abgeschlossen",
+            description=f"**{state['imported']:,}** User importiert "
+                       f"({'addiert' if modus == 'add' else 'überschrieben'}), "
+                       f"**{state['skipped']:,}** Zeilen übersprungen.",
+            color=COLORS["green"] if not state["skipped"] else COLORS["orange"]
+        )
+        embed.add_field(
+            name="Durchsatz",
+            value=f"{state['rows']:,} Zeilen in {duration:.1f}s ({state['rows'] / max(duration, 1e-9):,.0f} Zeilen/s)",
+            inline=False
+        )
+        if state["errors"]:
             embed.add_field(
-                name="📊 Neue Statistiken",
-                value=f"**Level:** {new_level}\n"
-                      f"**XP:** {user_data['xp']:,}\n"
-                      f"**Nachrichten:** {user_data['messages']:,}",
+                name="Fehler (Auszug)",
+                value="\n".join(state["errors"])[:1024],
+                inline=False
+            )
+        await interaction.followup.send(embed=embed, ephemeral=True)
+    
+    @app_commands.command(
+        name="level-stats",
+        description="Zeigt interne Statistiken des Level-Systems an"
+    )
+    @app_commands.default_permissions(administrator=True)
+    async def level_stats(self, interaction: discord.Interaction):
+        """Zeigt Puffer- und Queue-Statistiken des Level-Systems an"""
+        xp_stats = self.xp_buffer.stats
+        announce_stats = self.announcements.stats
+        
+        embed = discord.Embed(
+            title="📈 Level-System Statistiken",
+            color=COLORS["blue"]
+        )
+        embed.add_field(
+            name="⏳ XP-Puffer",
+            value=f"**Wartend:** {len(self.xp_buffer):,}\n"
+                  f"**Nachrichten:** {xp_stats['queued']:,}\n"
+                  f"**XP vergeben:** {xp_stats['granted']:,}\n"
+                  f"**Cooldown:** {xp_stats['cooldown']:,}\n"
+                  f"**Batches:** {xp_stats['batches']:,}",
+            inline=True
+        )
+        embed.add_field(
+            name="📢 Level-Up Queue",
+            value=f"**Wartend:** {self.announcements.depth():,}\n"
+                  f"**Eingereiht:** {announce_stats['queued']:,}\n"
+                  f"**Zusammengefasst:** {announce_stats['merged']:,}\n"
+                  f"**Verworfen:** {announce_stats['dropped']:,}\n"
+                  f"**Nachrichten:** {announce_stats['sent']:,} ({announce_stats['announced']:,} Level-Ups)\n"
+                  f"**Fehler:** {announce_stats['failed']:,}",
+            inline=True
+        )
+        spam_stats = self.xp_buffer.spam.stats
+        embed.add_field(
+            name="🛡️ Spam-Filter",
+            value=f"**Gemerkte User:** {len(self.xp_buffer.spam):,}\n"
+                  f"**Geprüft:** {spam_stats['checked']:,}\n"
+                  f"**Zu kurz:** {spam_stats['short']:,} / **Duplikat:** {spam_stats['duplicate']:,}\n"
+                  f"**Verdrängt (LRU):** {spam_stats['evicted']:,}",
+            inline=True
+        )
+        reward_stats = self.role_rewards.stats
+        embed.add_field(
+            name="🎖️ Level-Rollen",
+            value=f"**Wartend:** {self.role_rewards.depth():,}\n"
+                  f"**Eingereiht:** {reward_stats['queued']:,} / **Zusammengefasst:** {reward_stats['merged']:,}\n"
+                  f"**Geändert:** {reward_stats['changed']:,} / **Unverändert:** {reward_stats['unchanged']:,}\n"
+                  f"**Nicht gefunden:** {reward_stats['missing']:,} / **Fehler:** {reward_stats['failed']:,}",
+            inline=True
+        )
+        voice_stats = self.voice.stats
+        embed.add_field(
+            name="🎙️ Sprachzeit",
+            value=f"**Aktiv:** {len(self.voice):,}\n"
+                  f"**Beigetreten:** {voice_stats['joins']:,} / **Verlassen:** {voice_stats['leaves']:,}\n"
+                  f"**Minuten gutgeschrieben:** {voice_stats['minutes']:,}\n"
+                  f"**Schreibvorgänge:** {voice_stats['writes']:,} in {voice_stats['batches']:,} Ticks",
+            inline=True
+        )
+        storage_stats = get_persistence_stats()["storage"]
+        if "cold" in storage_stats:
+            embed.add_field(
+                name="🧊 Archiv (inaktive User)",
+                value=f"**Archiviert (geladene Server):** {storage_stats['cold']:,}\n"
+                      f"**Verschoben:** {storage_stats['archived']:,} / **Zurückgeholt:** {storage_stats['thawed']:,}\n"
+                      f"**Archiv-Dateien gelesen:** {storage_stats['chunk_loads']:,}",
                 inline=True
             )
-            
-            # Sende Benachrichtigung in Announcement-Channel oder aktuellen Channel
-            announcement_channel_id = get_announcement_channel(guild_id)
-            if announcement_channel_id:
-                try:
-                    channel = message.guild.get_channel(int(announcement_channel_id))
-                    if channel:
-                        await channel.send(embed=embed)
-                except:
-                    # Fallback: Sende in aktuellen Channel
-                    await message.channel.send(embed=embed)
+        render_stats = self.render_cache.stats
+        embed.add_field(
+            name="🗂️ Render-Cache",
+            value=f"**Leaderboard:** {render_stats['leaderboard_hits']:,} Treffer / {render_stats['leaderboard_misses']:,} Fehlgriffe "
+                  f"({render_stats['leaderboard_invalidations']:,} invalidiert)\n"
+                  f"**Fortschritt:** {render_stats['progress_hits']:,} Treffer / {render_stats['progress_misses']:,} Fehlgriffe "
+                  f"({render_stats['progress_invalidations']:,} invalidiert)",
+            inline=False
+        )
+        
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+    
+    @app_commands.command(
+        name="level-curve",
+        description="Ändert die Level-Kurve (alle Level werden neu berechnet)"
+    )
+    @app_commands.describe(
+        typ="quadratic (100·L²), linear, mee6 oder table",
+        wert="quadratic: Faktor, linear: XP pro Level, table: XP-Schwellen ab Level 1 (Leerzeichen getrennt)"
+    )
+    @app_commands.choices(typ=[
+        app_commands.Choice(name="Quadratisch", value="quadratic"),
+        app_commands.Choice(name="Linear", value="linear"),
+        app_commands.Choice(name="MEE6", value="mee6"),
+        app_commands.Choice(name="Eigene Tabelle", value="table"),
+    ])
+    @app_commands.default_permissions(administrator=True)
+    async def level_curve(self, interaction: discord.Interaction, typ: str, wert: str = None):
+        """Setzt die Level-Kurve des Servers und berechnet alle Level neu"""
+        guild_id = str(interaction.guild_id)
+        
+        if not is_level_system_enabled(guild_id):
+            embed = discord.Embed(
+                title="❌ Level-System nicht aktiv",
+                description="Richte zuerst das Level-System mit `/setup-level` ein!",
+                color=COLORS["red"]
+            )
+            await interaction.response.send_message(embed=embed, ephemeral=True)
+            return
+        
+        config = {"type": typ}
+        try:
+            if wert:
+                values = [int(item) for item in wert.replace(",", " ").split()]
+                if typ == "quadratic":
+                    config["factor"] = values[0]
+                elif typ == "linear":
+                    config["step"] = values[0]
+                elif typ == "table":
+                    config["thresholds"] = values
+            set_xp_curve(guild_id, config)
+        except (ValueError, IndexError) as e:
+            embed = discord.Embed(
+                title="❌ Ungültige Kurve",
+                description=f"Die Kurve konnte nicht gesetzt werden: {e}",
+                color=COLORS["red"]
+            )
+            await interaction.response.send_message(embed=embed, ephemeral=True)
+            return
+        
+        curve = get_xp_curve(guild_id)
+        examples = [level for level in (1, 5, 10, 25, 50, 100) if level <= curve.max_level]
+        description = f"**Typ:** {typ}\nAlle Level dieses Servers wurden neu berechnet."
+        if get_reward_table(guild_id):
+            description += "\nDie Level-Rollen werden im Hintergrund abgeglichen (`/level-rewards`)."
+        embed = discord.Embed(
+            title="✅ Level-Kurve geändert!",
+            description=description,
+            color=COLORS["green"]
+        )
+        embed.add_field(
+            name="📊 Benötigte XP",
+            value="\n".join(f"**Level {level}:** {curve.xp_for_level(level):,} XP" for level in examples),
+            inline=False
+        )
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+    
+    @app_commands.command(
+        name="level-xp-range",
+        description="Ändert die XP pro Nachricht (Minimum und Maximum)"
+    )
+    @app_commands.default_permissions(administrator=True)
+    async def level_xp_range(self, interaction: discord.Interaction, minimum: int, maximum: int):
+        """Setzt den xp_range des Servers"""
+        guild_id = str(interaction.guild_id)
+        
+        if not is_level_system_enabled(guild_id):
+            embed = discord.Embed(
+                title="❌ Level-System nicht aktiv",
+                description="Richte zuerst das Level-System mit `/setup-level` ein!",
+                color=COLORS["red"]
+            )
+        elif set_xp_range(guild_id, minimum, maximum):
+            embed = discord.Embed(
+                title="✅ XP pro Nachricht geändert!",
+                description=f"Nachrichten geben jetzt **{minimum}-{maximum} XP**.",
+                color=COLORS["green"]
+            )
+        else:
+            embed = discord.Embed(
+                title="❌ Ungültiger Bereich",
+                description="Das Minimum muss mindestens 0 und höchstens so groß wie das Maximum sein!",
+                color=COLORS["red"]
+            )
+        
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+    
+    @app_commands.command(
+        name="xp-spamfilter",
+        description="Schaltet den Spam-Filter für XP um (zu kurze Nachrichten und Duplikate)"
+    )
+    @app_commands.describe(
+        aktiv="Spam-Filter an oder aus",
+        mindestlaenge="Mindestlänge ohne Leerzeichen und Zeichen-Wiederholungen (0-100)",
+        toleranz="Ähnlichkeit für Duplikate: abweichende Bits von 64 (0 = nur identisch, max. 16)"
+    )
+    @app_commands.default_permissions(administrator=True)
+    async def xp_spamfilter(self, interaction: discord.Interaction, aktiv: bool, mindestlaenge: int = None, toleranz: int = None):
+        """Setzt die Spam-Filter-Einstellungen des Servers"""
+        guild_id = str(interaction.guild_id)
+        
+        if not is_level_system_enabled(guild_id):
+            embed = discord.Embed(
+                title="❌ Level-System nicht aktiv",
+                description="Richte zuerst das Level-System mit `/setup-level` ein!",
+                color=COLORS["red"]
+            )
+        elif set_spam_filter(guild_id, aktiv, mindestlaenge, toleranz):
+            settings = get_spam_filter(guild_id)
+            if aktiv:
+                description = (f"Nachrichten unter **{settings['min_length']} Zeichen** und Beinahe-Duplikate "
+                               f"der letzten {SPAM_HISTORY} Nachrichten (Toleranz **{settings['distance']} Bits**) "
+                               f"geben keine XP mehr.")
             else:
-                # Sende in aktuellen Channel wenn kein Announcement-Channel gesetzt
-                await message.channel.send(embed=embed)
+                description = "Alle Nachrichten außerhalb des Cooldowns geben wieder XP."
+            embed = discord.Embed(
+                title=f"✅ Spam-Filter {'aktiviert' if aktiv else 'deaktiviert'}!",
+                description=description,
+                color=COLORS["green"]
+            )
+        else:
+            embed = discord.Embed(
+                title="❌ Ungültige Werte",
+                description="Die Mindestlänge muss zwischen 0 und 100, die Toleranz zwischen 0 und 16 liegen!",
+                color=COLORS["red"]
+            )
+        
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+    
+    @app_commands.command(
+        name="xp-multiplier-channel",
+        description="Setzt einen XP-Multiplikator für einen Channel (1 = entfernen)"
+    )
+    @app_commands.default_permissions(administrator=True)
+    async def xp_multiplier_channel(self, interaction: discord.Interaction, channel: discord.TextChannel, multiplikator: float):
+        """Setzt den XP-Multiplikator eines Channels"""
+        guild_id = str(interaction.guild_id)
+        
+        if not is_level_system_enabled(guild_id):
+            embed = discord.Embed(
+                title="❌ Level-System nicht aktiv",
+                description="Richte zuerst das Level-System mit `/setup-level` ein!",
+                color=COLORS["red"]
+            )
+            await interaction.response.send_message(embed=embed, ephemeral=True)
+            return
+        
+        await self.save_multiplier_rule(
+            interaction,
+            lambda: set_channel_multiplier(guild_id, str(channel.id), multiplikator),
+            f"{channel.mention} gibt jetzt **×{multiplikator:g}** XP." if multiplikator != 1 else f"Multiplikator für {channel.mention} entfernt."
+        )
+    
+    @app_commands.command(
+        name="xp-multiplier-role",
+        description="Setzt einen XP-Multiplikator für eine Rolle (1 = entfernen)"
+    )
+    @app_commands.default_permissions(administrator=True)
+    async def xp_multiplier_role(self, interaction: discord.Interaction, rolle: discord.Role, multiplikator: float):
+        """Setzt den XP-Multiplikator einer Rolle (bei mehreren Rollen zählt die höchste)"""
+        guild_id = str(interaction.guild_id)
+        
+        if not is_level_system_enabled(guild_id):
+            embed = discord.Embed(
+                title="❌ Level-System nicht aktiv",
+                description="Richte zuerst das Level-System mit `/setup-level` ein!",
+                color=COLORS["red"]
+            )
+            await interaction.response.send_message(embed=embed, ephemeral=True)
+            return
+        
+        await self.save_multiplier_rule(
+            interaction,
+            lambda: set_role_multiplier(guild_id, str(rolle.id), multiplikator),
+            f"{rolle.mention} gibt jetzt **×{multiplikator:g}** XP." if multiplikator != 1 else f"Multiplikator für {rolle.mention} entfernt."
+        )
+    
+    @app_commands.command(
+        name="xp-multiplier-window",
+        description="Fügt ein Zeitfenster mit XP-Multiplikator hinzu (z.B. Event-Abende)"
+    )
+    @app_commands.describe(
+        tage="Wochentage, z.B. \"sa so\" oder \"alle\"",
+        start="Beginn (HH:MM)",
+        ende="Ende (HH:MM, vor dem Beginn = über Mitternacht)",
+        multiplikator="Faktor, z.B. 2 für doppelte XP"
+    )
+    @app_commands.default_permissions(administrator=True)
+    async def xp_multiplier_window(self, interaction: discord.Interaction, tage: str, start: str, ende: str, multiplikator: float):
+        """Fügt ein wöchentliches Zeitfenster mit XP-Multiplikator hinzu"""
+        guild_id = str(interaction.guild_id)
+        
+        if not is_level_system_enabled(guild_id):
+            embed = discord.Embed(
+                title="❌ Level-System nicht aktiv",
+                description="Richte zuerst das Level-System mit `/setup-level` ein!",
+                color=COLORS["red"]
+            )
+            await interaction.response.send_message(embed=embed, ephemeral=True)
+            return
+        
+        if tage.strip().lower() == "alle":
+            days = list(range(7))
+        else:
+            days = sorted({WEEKDAYS.get(day[:2]) for day in tage.lower().replace(",", " ").split()} - {None})
+        if not days:
+            embed = discord.Embed(
+                title="❌ Keine Wochentage",
+                description="Gib die Tage als `mo di mi do fr sa so` oder `alle` an!",
+                color=COLORS["red"]
+            )
+            await interaction.response.send_message(embed=embed, ephemeral=True)
+            return
+        
+        await self.save_multiplier_rule(
+            interaction,
+            lambda: add_xp_window(guild_id, days, start, ende, multiplikator),
+            f"Zeitfenster {start}-{ende} gibt jetzt **×{multiplikator:g}** XP."
+        )
+    
+    @app_commands.command(
+        name="xp-multiplier-window-remove",
+        description="Entfernt ein Zeitfenster (Nummer aus /xp-multipliers)"
+    )
+    @app_commands.default_permissions(administrator=True)
+    async def xp_multiplier_window_remove(self, interaction: discord.Interaction, nummer: int):
+        """Entfernt ein Zeitfenster mit XP-Multiplikator"""
+        guild_id = str(interaction.guild_id)
+        
+        if not is_level_system_enabled(guild_id):
+            embed = discord.Embed(
+                title="❌ Level-System nicht aktiv",
+                description="Richte zuerst das Level-System mit `/setup-level` ein!",
+                color=COLORS["red"]
+            )
+            await interaction.response.send_message(embed=embed, ephemeral=True)
+            return
+        
+        if remove_xp_window(guild_id, nummer - 1):
+            embed = discord.Embed(
+                title="✅ Zeitfenster entfernt!",
+                description=f"Zeitfenster **#{nummer}** wurde entfernt.",
+                color=COLORS["green"]
+            )
+        else:
+            embed = discord.Embed(
+                title="❌ Unbekanntes Zeitfenster",
+                description=f"Es gibt kein Zeitfenster **#{nummer}**!",
+                color=COLORS["red"]
+            )
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+    
+    @app_commands.command(
+        name="xp-multipliers",
+        description="Zeigt alle XP-Multiplikatoren dieses Servers an"
+    )
+    @app_commands.default_permissions(administrator=True)
+    async def xp_multipliers(self, interaction: discord.Interaction):
+        """Listet die XP-Multiplikatoren des Servers auf"""
+        guild_id = str(interaction.guild_id)
+        
+        if not is_level_system_enabled(guild_id):
+            embed = discord.Embed(
+                title="❌ Level-System nicht aktiv",
+                description="Richte zuerst das Level-System mit `/setup-level` ein!",
+                color=COLORS["red"]
+            )
+            await interaction.response.send_message(embed=embed, ephemeral=True)
+            return
+        
+        config = get_xp_multipliers(guild_id)
+        day_names = list(WEEKDAYS)
+        
+        embed = discord.Embed(
+            title="✖️ XP-Multiplikatoren",
+            description="Channel-, Rollen- und Zeit-Faktoren werden multipliziert, bei mehreren Rollen zählt die höchste.",
+            color=COLORS["blue"]
+        )
+        embed.add_field(
+            name="💬 Channels",
+            value="\n".join(f"<#{channel_id}>: ×{value:g}" for channel_id, value in config["channels"].items()) or "Keine",
+            inline=False
+        )
+        embed.add_field(
+            name="🎭 Rollen",
+            value="\n".join(f"<@&{role_id}>: ×{value:g}" for role_id, value in config["roles"].items()) or "Keine",
+            inline=False
+        )
+        embed.add_field(
+            name="🕒 Zeitfenster",
+            value="\n".join(
+                f"**#{i}** {' '.join(day_names[day] for day in window['days'])} "
+                f"{window['start']}-{window['end']}: ×{window['multiplier']:g}"
+                for i, window in enumerate(config["windows"], start=1)
+            ) or "Keine",
+            inline=False
+        )
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+    
+    async def save_multiplier_rule(self, interaction: discord.Interaction, save, success_text: str):
+        """Speichert eine Multiplikator-Regel und meldet ungültige Werte"""
+        try:
+            save()
+        except ValueError as e:
+            embed = discord.Embed(
+                title="❌ Ungültige Regel",
+                description=str(e),
+                color=COLORS["red"]
+            )
+            await interaction.response.send_message(embed=embed, ephemeral=True)
+            return
+        
+        embed = discord.Embed(
+            title="✅ XP-Multiplikator gespeichert!",
+            description=success_text,
+            color=COLORS["green"]
+        )
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+    
+    @app_commands.command(
+        name="level-reward",
+        description="Vergibt eine Rolle ab einem Level"
+    )
+    @app_commands.default_permissions(administrator=True)
+    async def level_reward(self, interaction: discord.Interaction, level: int, rolle: discord.Role):
+        """Setzt die Belohnungs-Rolle für ein Level"""
+        guild_id = str(interaction.guild_id)
+        
+        if not is_level_system_enabled(guild_id):
+            embed = discord.Embed(
+                title="❌ Level-System nicht aktiv",
+                description="Richte zuerst das Level-System mit `/setup-level` ein!",
+                color=COLORS["red"]
+            )
+            await interaction.response.send_message(embed=embed, ephemeral=True)
+            return
+        
+        if set_level_reward(guild_id, level, str(rolle.id)):
+            embed = discord.Embed(
+                title="✅ Level-Belohnung gespeichert!",
+                description=f"Ab **Level {level}** gibt es {rolle.mention}.\n"
+                            f"Bestehende Members erhalten die Rolle mit `/level-rewards-sync`.",
+                color=COLORS["green"]
+            )
+            if rolle >= interaction.guild.me.top_role:
+                embed.add_field(
+                    name="⚠️ Achtung",
+                    value="Die Rolle liegt über der Bot-Rolle und kann nicht vergeben werden!",
+                    inline=False
+                )
+        else:
+            embed = discord.Embed(
+                title="❌ Ungültiges Level",
+                description="Das Level muss mindestens 1 sein!",
+                color=COLORS["red"]
+            )
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+    
+    @app_commands.command(
+        name="level-reward-remove",
+        description="Entfernt die Rollen-Belohnung eines Levels"
+    )
+    @app_commands.default_permissions(administrator=True)
+    async def level_reward_remove(self, interaction: discord.Interaction, level: int):
+        """Entfernt eine Level-Belohnung (vergebene Rollen bleiben bestehen)"""
+        guild_id = str(interaction.guild_id)
+        
+        if not is_level_system_enabled(guild_id):
+            embed = discord.Embed(
+                title="❌ Level-System nicht aktiv",
+                description="Richte zuerst das Level-System mit `/setup-level` ein!",
+                color=COLORS["red"]
+            )
+            await interaction.response.send_message(embed=embed, ephemeral=True)
+            return
+        
+        if set_level_reward(guild_id, level, None):
+            embed = discord.Embed(
+                title="✅ Level-Belohnung entfernt!",
+                description=f"Für **Level {level}** wird keine Rolle mehr vergeben.",
+                color=COLORS["green"]
+            )
+        else:
+            embed = discord.Embed(
+                title="❌ Keine Belohnung",
+                description=f"Für **Level {level}** ist keine Rolle eingetragen!",
+                color=COLORS["red"]
+            )
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+    
+    @app_commands.command(
+        name="level-rewards-mode",
+        description="Legt fest, ob Members alle erreichten Level-Rollen behalten"
+    )
+    @app_commands.default_permissions(administrator=True)
+    async def level_rewards_mode(self, interaction: discord.Interaction, stapeln: bool):
+        """Stapeln (alle Rollen behalten) oder nur die höchste erreichte Rolle"""
+        guild_id = str(interaction.guild_id)
+        
+        if not is_level_system_enabled(guild_id):
+            embed = discord.Embed(
+                title="❌ Level-System nicht aktiv",
+                description="Richte zuerst das Level-System mit `/setup-level` ein!",
+                color=COLORS["red"]
+            )
+            await interaction.response.send_message(embed=embed, ephemeral=True)
+            return
+        
+        set_reward_stacking(guild_id, stapeln)
+        embed = discord.Embed(
+            title="✅ Modus gespeichert!",
+            description=("Members behalten alle erreichten Level-Rollen." if stapeln
+                         else "Members behalten nur die höchste erreichte Level-Rolle.")
+                        + "\nBestehende Members werden mit `/level-rewards-sync` angepasst.",
+            color=COLORS["green"]
+        )
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+    
+    @app_commands.command(
+        name="level-rewards",
+        description="Zeigt die Level-Belohnungen und den Stand des Abgleichs an"
+    )
+    async def level_rewards(self, interaction: discord.Interaction):
+        """Listet die Level-Rollen des Servers auf"""
+        guild_id = str(interaction.guild_id)
+        
+        if not is_level_system_enabled(guild_id):
+            embed = discord.Embed(
+                title="❌ Level-System nicht aktiv",
+                description="Richte zuerst das Level-System mit `/setup-level` ein!",
+                color=COLORS["red"]
+            )
+            await interaction.response.send_message(embed=embed, ephemeral=True)
+            return
+        
+        rewards = get_level_rewards(guild_id)
+        table = get_reward_table(guild_id)
+        embed = discord.Embed(
+            title="🎖️ Level-Belohnungen",
+            description="\n".join(f"**Level {level}:** <@&{role_id}>" for level, role_id in rewards.items())
+                        or "Noch keine Belohnungen eingerichtet!",
+            color=COLORS["blue"]
+        )
+        embed.add_field(name="Modus", value="Stapeln" if table.stack else "Nur höchste Rolle", inline=True)
+        job = self.role_rewards.jobs.get(guild_id)
+        if job is not None:
+            embed.add_field(name="Abgleich", value=self.format_reward_job(job), inline=True)
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+    
+    @app_commands.command(
+        name="level-rewards-sync",
+        description="Gleicht die Level-Rollen aller Members ab"
+    )
+    @app_commands.default_permissions(administrator=True)
+    async def level_rewards_sync(self, interaction: discord.Interaction):
+        """Gleicht alle Members ab und zeigt den Fortschritt an"""
+        guild_id = str(interaction.guild_id)
+        
+        if not is_level_system_enabled(guild_id):
+            embed = discord.Embed(
+                title="❌ Level-System nicht aktiv",
+                description="Richte zuerst das Level-System mit `/setup-level` ein!",
+                color=COLORS["red"]
+            )
+            await interaction.response.send_message(embed=embed, ephemeral=True)
+            return
+        
+        if not get_reward_table(guild_id):
+            embed = discord.Embed(
+                title="❌ Keine Belohnungen",
+                description="Richte zuerst Level-Rollen mit `/level-reward` ein!",
+                color=COLORS["red"]
+            )
+            await interaction.response.send_message(embed=embed, ephemeral=True)
+            return
+        
+        await interaction.response.defer(ephemeral=True)
+        job = self.role_rewards.reconcile(guild_id)
+        
+        # Fortschritt alle 5 Sekunden aktualisieren (Interaktionen laufen nach 15 Minuten ab)
+        deadline = time.monotonic() + 14 * 60
+        while True:
+            embed = discord.Embed(
+                title="🔄 Level-Rollen abgleichen",
+                description=self.format_reward_job(job),
+                color=COLORS["green"] if job["finished"] else COLORS["blue"]
+            )
+            await interaction.edit_original_response(embed=embed)
+            if job["finished"] or time.monotonic() > deadline or self.role_rewards.jobs.get(guild_id) is not job:
+                break
+            await asyncio.sleep(5)
+    
+    @staticmethod
+    def format_reward_job(job: dict) -> str:
+        """Formatiert den Fortschritt eines Rollen-Abgleichs"""
+        percentage = job["done"] / job["total"] * 100 if job["total"] else 100
+        end = job["finished"] or time.monotonic()
+        status = "✅ Fertig" if job["finished"] else "⏳ Läuft"
+        return (f"{status}: **{job['done']:,} / {job['total']:,}** ({percentage:.0f}%)\n"
+                f"**Geändert:** {job['changed']:,} / **Fehler:** {job['failed']:,}\n"
+                f"**Dauer:** {end - job['started']:.0f}s")
     
     @app_commands.command(
         name="block-channels",
@@ -573,24 +2501,25 @@ class Level(commands.Cog):
             await interaction.response.send_message(embed=embed, ephemeral=True)
             return
         
-        # Blockiere alle Channels
-        blocked_channels = []
-        already_blocked = []
+        # Gültige Channels auflösen
+        valid_channels = {}
         invalid_channels = []
         
-        for channel_id in channel_ids:
+        for channel_id in dict.fromkeys(channel_ids):
             try:
                 channel = interaction.guild.get_channel(int(channel_id))
-                if channel:
-                    if block_channel_for_xp(guild_id, channel_id):
-                        blocked_channels.append(channel)
-                    else:
-                        already_blocked.append(channel)
-                else:
-                    invalid_channels.append(channel_id)
-            except:
+            except ValueError:
+                channel = None
+            if channel:
+                valid_channels[channel_id] = channel
+            else:
                 invalid_channels.append(channel_id)
         
+        # Blockiere alle Channels in einem Schritt (einmal speichern)
+        outcomes = block_channels_for_xp(guild_id, valid_channels)
+        blocked_channels = [valid_channels[channel_id] for channel_id, changed in outcomes.items() if changed]
+        already_blocked = [valid_channels[channel_id] for channel_id, changed in outcomes.items() if not changed]
+        
         # Erstelle Response Embed
         embed = discord.Embed(
             title="🚫 Channel-Blocking Ergebnis",
@@ -658,24 +2587,25 @@ class Level(commands.Cog):
             await interaction.response.send_message(embed=embed, ephemeral=True)
             return
         
-        # Entblockiere alle Channels
-        unblocked_channels = []
-        not_blocked = []
+        # Gültige Channels auflösen
+        valid_channels = {}
         invalid_channels = []
         
-        for channel_id in channel_ids:
+        for channel_id in dict.fromkeys(channel_ids):
             try:
                 channel = interaction.guild.get_channel(int(channel_id))
-                if channel:
-                    if unblock_channel_for_xp(guild_id, channel_id):
-                        unblocked_channels.append(channel)
-                    else:
-                        not_blocked.append(channel)
-                else:
-                    invalid_channels.append(channel_id)
-            except:
+            except ValueError:
+                channel = None
+            if channel:
+                valid_channels[channel_id] = channel
+            else:
                 invalid_channels.append(channel_id)
         
+        # Entblockiere alle Channels in einem Schritt (einmal speichern)
+        outcomes = unblock_channels_for_xp(guild_id, valid_channels)
+        unblocked_channels = [valid_channels[channel_id] for channel_id, changed in outcomes.items() if changed]
+        not_blocked = [valid_channels[channel_id] for channel_id, changed in outcomes.items() if not changed]
+        
         # Erstelle Response Embed
         embed = discord.Embed(
             title="✅ Channel-Unblocking Ergebnis",
@@ -771,15 +2701,14 @@ class Level(commands.Cog):
             response = await self.bot.wait_for('message', timeout=30.0, check=check)
             
             if response.content.lower() == 'ja':
-                # Hole alle Text-Channels des Servers
-                all_text_channels = [channel for channel in interaction.guild.text_channels]
-                
-                # Blockiere alle außer den erlaubten
-                blocked_count = 0
-                for channel in all_text_channels:
-                    if str(channel.id) not in allowed_channel_ids:
-                        if block_channel_for_xp(guild_id, str(channel.id)):
-                            blocked_count += 1
+                # Blockiere alle Text-Channels außer den erlaubten in einem Schritt
+                allowed = set(allowed_channel_ids)
+                to_block = [
+                    str(channel.id) for channel in interaction.guild.text_channels
+                    if str(channel.id) not in allowed
+                ]
+                outcomes = block_channels_for_xp(guild_id, to_block)
+                blocked_count = sum(outcomes.values())
                 
                 # Bestätigung
                 confirm_embed = discord.Embed(
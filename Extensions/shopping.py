@@ -35,23 +35,18 @@ class Shopping(commands.Cog):
         if interaction.guild_id not in ALLOWED_GUILDS["shopping"]:
             await interaction.response.send_message("Du hast keine Berechtigung, diesen Befehl auszuführen.", ephemeral=True)
             return
-        data["shopping"]["Profiles"].append({
-            'author': interaction.user.name, 
-            'task': task
-        })
-        save_shopping_list()
+        add_list_item("shopping", interaction.user.name, task)
         
         embed = create_shopping_embed()
         await interaction.response.send_message(embed=embed)
         
         # Speichere die neue Nachricht-ID
         message = await interaction.original_response()
-        if data["shopping"]["Last Message ID"] == 0:
-            data["shopping"]["Last Message ID"] = message.id
-            shopping_dump()
+        if get_list_message_id("shopping") == 0:
+            set_list_message_id("shopping", message.id)
         else:
             try:
-                old_message_id = data["shopping"]["Last Message ID"]
+                old_message_id = get_list_message_id("shopping")
                 old_message = await interaction.channel.fetch_message(old_message_id)
                 await old_message.delete()
             except discord.NotFound:
@@ -61,8 +56,7 @@ class Shopping(commands.Cog):
             except Exception as e:
                 print(f"Unerwarteter Fehler: {e}")
             finally:
-                data["shopping"]["Last Message ID"] = message.id
-                shopping_dump()
+                set_list_message_id("shopping", message.id)
 
     @app_commands.command(
         name="ashop",
@@ -72,16 +66,14 @@ class Shopping(commands.Cog):
         if interaction.guild_id not in ALLOWED_GUILDS["shopping"]:
             await interaction.response.send_message("Du hast keine Berechtigung, diesen Befehl auszuführen.", ephemeral=True)
             return
-        if 0 <= task_id < len(data["shopping"]["Profiles"]):
-            data["shopping"]["Profiles"].pop(task_id)
-            save_shopping_list()
+        if remove_list_item("shopping", task_id):
             
             embed = create_shopping_embed()
             await interaction.response.send_message(embed=embed)
             
             # Update die Nachricht-ID und lösche die alte
             message = await interaction.original_response()
-            old_message_id = data["shopping"]["Last Message ID"]
+            old_message_id = get_list_message_id("shopping")
             try:
                 old_message = await interaction.channel.fetch_message(old_message_id)
                 await old_message.delete()
@@ -91,8 +83,7 @@ class Shopping(commands.Cog):
                 print("Keine Berechtigung zum Löschen der Nachricht")
             except Exception as e:
                 print(f"Unerwarteter Fehler beim Löschen: {e}")
-            data["shopping"]["Last Message ID"] = message.id
-            shopping_dump()
+            set_list_message_id("shopping", message.id)
         else:
             await interaction.response.send_message(
                 f"Ungültige ID: {task_id}", 
@@ -24,7 +24,7 @@ Berechtigungssystem:
 - Ticket-Ersteller können nur eigene Tickets schließen
 
 Logging:
-- Alle Aktionen werden in ticket_logs.json gespeichert
+- Alle Aktionen werden in ticket_logs.json gespeichert (im I/O-Thread, blockiert den Event-Loop nicht)
 - Format: {timestamp, action, user_id, ticket_id, details}
 
 Cooldown:
@@ -85,7 +85,7 @@ class CooldownManager:
             del self.cooldowns[user_id]
 
 def log_ticket_action(action: str, user_id: int, user_name: str, ticket_id: int, details: str):
-    """Loggt eine Ticket-Aktion in die Log-Datei"""
+    """Loggt eine Ticket-Aktion in die Log-Datei (Schreiben läuft im I/O-Thread)"""
     log_entry = {
         "timestamp": datetime.utcnow().isoformat(),
         "action": action,
@@ -95,6 +95,10 @@ def log_ticket_action(action: str, user_id: int, user_name: str, ticket_id: int,
         "details": details
     }
     
+    return submit_io(_append_ticket_log, log_entry)
+
+def _append_ticket_log(log_entry: dict):
+    """Hängt einen Eintrag an ticket_logs.json an (läuft im I/O-Thread)"""
     try:
         with open('ticket_logs.json', 'r+') as f:
             logs = json.load(f)
@@ -156,8 +160,9 @@ class TicketControlButtons(discord.ui.View):
                 return
             
             # Ändere Kanal-Berechtigungen, the cake is a lie
-            ticket_owner = interaction.guild.get_member(ticket_data["Owner_ID"])
-            await interaction.channel.set_permissions(ticket_owner, read_messages=False)
+            ticket_owner = await user_resolver.resolve_one(interaction.client, interaction.guild, ticket_data["Owner_ID"])
+            if isinstance(ticket_owner, discord.Member):
+                await interaction.channel.set_permissions(ticket_owner, read_messages=False)
         
             # Wähle die richtige Archiv-Kategorie basierend auf dem Ticket-Typ
             if ticket_data["Type"] == "🚫 Entbannungsantrag":
@@ -179,7 +184,7 @@ class TicketControlButtons(discord.ui.View):
             close_embed = discord.Embed(
                 title="Ticket Geschlossen",
                 description=f"Ticket wurde von {interaction.user.mention} geschlossen.\n"
-                           f"Ursprünglicher Ersteller: {ticket_owner.mention}\n"
+                           f"Ursprünglicher Ersteller: <@{ticket_data['Owner_ID']}>\n"
                            f"Ticket-Typ: {ticket_data['Type']}\n"
                            f"Erstellt am: {ticket_data['Created']}",
                 color=COLORS["red"]
@@ -363,10 +368,7 @@ class TicketButtons(discord.ui.View):
             message = await channel.send(embed=embed, view=TicketControlButtons())
             await channel.send(f"{interaction.guild.get_role(1028682945810137188).mention}")
             # Speichere die Message-ID
-            ticket_data = get_ticket_data(channel.id)
-            if ticket_data:
-                ticket_data["message_id"] = message.id
-                dump()  # Speichere die Änderungen
+            set_ticket_field(channel.id, "message_id", message.id)
 
             # Logging nach erfolgreicher Erstellung
             log_ticket_action(
@@ -12,7 +12,7 @@ Befehle:
 /todo_delete - Aufgabe löschen
 
 Datenstruktur:
-- Aufgaben werden in data.json unter "todo.Profiles" gespeichert
+- Aufgaben liegen im Speicher-Backend (data.json unter "todo.Profiles" oder SQLite)
 - Jede Aufgabe hat einen Autor und eine Beschreibung
 """
 
@@ -30,23 +30,20 @@ class ToDo(commands.Cog):
         if interaction.guild_id not in ALLOWED_GUILDS["todo"]:
             await interaction.response.send_message("Du hast keine Berechtigung, diesen Befehl auszuführen.", ephemeral=True)
             return
-        data["todo"]["Profiles"].append({'author': interaction.user.name, 'task': task})
-        save_todo_list()
+        add_list_item("todo", interaction.user.name, task)
         
         embed = create_embed()
         maf = await interaction.channel.send(embed=embed)
         id = maf.id
         
-        if data["todo"]["Last Message ID"] == 0:
-            data["todo"]["Last Message ID"] = id
-            dump()
+        if get_list_message_id("todo") == 0:
+            set_list_message_id("todo", id)
         else:
             try:
-                message_id = data["todo"]["Last Message ID"]
+                message_id = get_list_message_id("todo")
                 msg = await interaction.channel.fetch_message(message_id)
                 await msg.delete()
-                data["todo"]["Last Message ID"] = id
-                dump()
+                set_list_message_id("todo", id)
             except discord.NotFound:
                 await interaction.response.send_message("Die Nachricht wurde bereits gelöscht.", ephemeral=True)
             except discord.Forbidden:
@@ -61,24 +58,20 @@ class ToDo(commands.Cog):
         if interaction.guild_id not in ALLOWED_GUILDS["todo"]:
             await interaction.response.send_message("Du hast keine Berechtigung, diesen Befehl auszuführen.", ephemeral=True)
             return
-        if 0 <= task_id < len(data["todo"]["Profiles"]):
-            data["todo"]["Profiles"].pop(task_id)
-            save_todo_list()
+        if remove_list_item("todo", task_id):
             
             embed = create_embed()
             maf = await interaction.channel.send(embed=embed)
             id = maf.id
             
             try:
-                message_id = data["todo"]["Last Message ID"]
+                message_id = get_list_message_id("todo")
                 msg = await interaction.channel.fetch_message(message_id)
                 await msg.delete()
-                data["todo"]["Last Message ID"] = id
-                dump()
+                set_list_message_id("todo", id)
                 await interaction.response.send_message("Aufgabe gelöscht!", ephemeral=True)
             except:
-                data["todo"]["Last Message ID"] = id
-                dump()
+                set_list_message_id("todo", id)
                 await interaction.response.send_message("Die zu löschende Nachricht konnte nicht gefunden werden.", ephemeral=True)
         else:
             await interaction.response.send_message(f"Ungültige ID: {task_id}", ephemeral=True)
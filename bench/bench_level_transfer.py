@@ -0,0 +1,116 @@
+"""
+Durchsatz-Benchmark für Export/Import der Level-Daten eines Servers
+
+Erzeugt eine Export-Datei mit synthetischen Usern, importiert sie mit
+import_level_users in einen leeren Server, schreibt die Partition
+(flush_data), exportiert sie wieder mit export_level_users und vergleicht
+die Zeilenzahl. Alles läuft in einem Temp-Verzeichnis mit einer
+Dummy-Konfiguration (config.py mit Tokens wird nicht gebraucht).
+
+Verwendung: python bench/bench_level_transfer.py [zeilen] [jsonl|csv] [replace|add]
+(Standard: 1000000 Zeilen, jsonl, replace)
+"""
+
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import types
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+GUILD_ID = "1"
+
+
+def install_config():
+    """Dummy-Konfiguration: Write-Behind ohne Zwischen-Flushes, damit nur der Import gemessen wird"""
+    config = types.ModuleType("config")
+    config.BOT_CONFIG = {"prefix": "!", "beta": True, "application_id": 0, "token": "", "test_token": ""}
+    config.DISCORD_IDS = {}
+    config.COLORS = {"violet": 0x8A2BE2, "red": 0xFF0000, "green": 0x00FF00, "blue": 0x0000FF, "orange": 0xFFA500}
+    config.SYSTEM_CONFIG = {
+        "data": "data.json",
+        "FILEPATH": "data.json",
+        "BACKUP_PATH": "backup",
+        "PERSISTENCE_MODE": "write_behind",
+        "FLUSH_INTERVAL": 3600,
+        "FLUSH_MAX_CHANGES": 10 ** 9,
+    }
+    config.ALLOWED_GUILDS = {"level": []}
+    sys.modules["config"] = config
+
+
+def write_input(path: str, rows: int, fmt: str, seed: int = 3):
+    """Schreibt rows User im Export-Format (IDs wie Snowflakes)"""
+    rng = random.Random(seed)
+    with open(path, "w", encoding="utf-8", newline="") as file:
+        if fmt == "csv":
+            file.write("user_id,xp,level,messages,last_message_time\n")
+        for index in range(rows):
+            user_id = (rng.randrange(1 << 40) << 22) + index
+            xp = rng.randint(0, 500_000)
+            messages = rng.randint(0, 5000)
+            last = 1_700_000_000 + rng.randint(0, 10 ** 7)
+            if fmt == "csv":
+                file.write(f"{user_id},{xp},0,{messages},{last}\n")
+            else:
+                file.write(json.dumps({"user_id": str(user_id), "xp": xp, "level": 0,
+                                       "messages": messages, "last_message_time": last}) + "\n")
+
+
+def peak_rss() -> str:
+    if resource is None:
+        return "?"
+    return f"{resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MB"
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    fmt = sys.argv[2] if len(sys.argv) > 2 else "jsonl"
+    mode = sys.argv[3] if len(sys.argv) > 3 else "replace"
+    install_config()
+    os.chdir(tempfile.mkdtemp(prefix="bench-transfer-"))
+
+    source = f"input.{fmt}"
+    start = time.perf_counter()
+    write_input(source, rows, fmt)
+    print(f"{rows:,} Zeilen ({fmt}, {os.path.getsize(source) / 2 ** 20:.0f} MB) erzeugt in {time.perf_counter() - start:.1f}s")
+
+    import functions
+    functions.setup_level_system(GUILD_ID)
+    start = time.perf_counter()
+    with open(source, encoding="utf-8-sig", newline="") as file:
+        for state in functions.import_level_users(GUILD_ID, file, fmt, mode):
+            pass
+    imported = time.perf_counter() - start
+    functions.flush_data()
+    flushed = time.perf_counter() - start
+    print(f"Import:  {imported:6.2f}s ({state['rows'] / imported:,.0f} Zeilen/s), "
+          f"mit Flush {flushed:6.2f}s ({state['rows'] / flushed:,.0f} Zeilen/s), "
+          f"{state['imported']:,} importiert, {state['skipped']:,} übersprungen, Peak-RSS {peak_rss()}")
+
+    target = f"export.{fmt}"
+    start = time.perf_counter()
+    exported = 0
+    with open(target, "w", encoding="utf-8", newline="") as file:
+        for exported in functions.export_level_users(GUILD_ID, file, fmt):
+            pass
+    duration = time.perf_counter() - start
+    print(f"Export:  {duration:6.2f}s ({exported / duration:,.0f} Zeilen/s), "
+          f"{os.path.getsize(target) / 2 ** 20:.0f} MB, Peak-RSS {peak_rss()}")
+
+    if exported != state["imported"]:
+        print(f"Fehler: {exported:,} exportiert, aber {state['imported']:,} importiert")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
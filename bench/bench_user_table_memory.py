@@ -0,0 +1,96 @@
+"""
+Speicher-Benchmark: User-Datensätze als Dict-of-Dicts gegenüber UserTable
+
+Schreibt dieselben synthetischen User (18-stellige IDs) einmal im alten
+Format {"user_id": {"xp", "level", "messages", "last_message_time"}} und
+einmal spaltenweise als UserTable nach JSON, lädt beide Partitionen wie
+beim Start und misst mit tracemalloc den danach belegten Speicher, dazu
+die Größe des JSON und die Ladezeit.
+
+Verwendung: python bench/bench_user_table_memory.py [anzahl_user] [seed]
+(Standard: 100000 User)
+"""
+
+import gc
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from leveling import UserTable
+
+
+def make_users(count: int, seed: int) -> list:
+    """Erzeugt (user_id, datensatz) wie im Level-System (IDs als Strings)"""
+    rng = random.Random(seed)
+    users = []
+    for index in range(count):
+        user_id = str((rng.randrange(1 << 40) << 22) + index)
+        xp = rng.randint(0, 500_000)
+        users.append((user_id, {
+            "xp": xp,
+            "level": int((xp / 100) ** 0.5),
+            "messages": rng.randint(0, 5000),
+            "last_message_time": 1_700_000_000 + rng.randint(0, 10 ** 7),
+        }))
+    return users
+
+
+def build_table(users: list) -> UserTable:
+    table = UserTable()
+    for user_id, record in users:
+        table.set(user_id, record)
+    return table
+
+
+def measure(load, payload: str) -> tuple:
+    """Lädt eine Partition aus JSON wie beim Start, gibt (Objekt, belegte Bytes) zurück"""
+    gc.collect()
+    tracemalloc.start()
+    result = load(json.loads(payload))
+    gc.collect()
+    used, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, used
+
+
+def load_time(load, payload: str, repeat: int = 3) -> float:
+    """Beste Ladezeit aus repeat Läufen (ohne tracemalloc, das bremst stark)"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        load(json.loads(payload))
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    seed = int(sys.argv[2]) if len(sys.argv) > 2 else 1
+    users = make_users(count, seed)
+
+    dict_json = json.dumps(dict(users))
+    table_json = json.dumps(build_table(users).to_json())
+    dicts, dict_bytes = measure(lambda raw: raw, dict_json)
+    table, table_bytes = measure(UserTable.from_json, table_json)
+    assert len(table) == len(dicts) == count
+    for user_id, record in users[:1000]:
+        assert table.get(user_id) == dicts[user_id]
+    rows = [
+        ("dict-of-dicts", dict_bytes, len(dict_json), load_time(lambda raw: raw, dict_json)),
+        ("UserTable", table_bytes, len(table_json), load_time(UserTable.from_json, table_json)),
+    ]
+
+    print(f"{count:,} User (Python {sys.version.split()[0]})")
+    print(f"{'Format':<15}{'Speicher':>12}{'JSON':>12}{'Laden':>10}")
+    for name, used, size, duration in rows:
+        print(f"{name:<15}{used / 2 ** 20:>9.1f} MB{size / 2 ** 20:>9.1f} MB{duration:>9.2f}s")
+    print(f"Ersparnis: {1 - table_bytes / dict_bytes:.0%} Speicher, {1 - len(table_json) / len(dict_json):.0%} JSON")
+
+
+if __name__ == "__main__":
+    main()
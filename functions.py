@@ -24,13 +24,28 @@ Wichtige Hinweise:
 - Alle Daten werden in data.json gespeichert
 - Automatische Backup-Erstellung bei Änderungen
 - Thread-safe Datenbankzugriffe
+- Write-Behind: Änderungen werden gesammelt von einem Hintergrund-Thread
+  geschrieben (PERSISTENCE_MODE, FLUSH_INTERVAL, FLUSH_MAX_CHANGES)
+- Level-, Ticket- und Listen-Daten laufen über ein austauschbares Speicher-Backend
+  (STORAGE_BACKEND "json" oder "sqlite", siehe storage.py)
+- Dateizugriffe aus Cogs laufen über einen eigenen I/O-Thread
+  (submit_io, write_json_file, write_json_async, flush_data_async)
+- User-IDs werden über user_resolver aufgelöst (Cache zuerst, fehlende
+  User parallel per REST, Ergebnisse mit TTL gecacht)
 """
 
-import json, os, discord
+import json, os, discord, atexit, time, asyncio, queue, marshal
+from concurrent.futures import Future
+from itertools import islice
 from config import BOT_CONFIG, DISCORD_IDS, COLORS, SYSTEM_CONFIG, ALLOWED_GUILDS
 from discord.ext import commands
-from threading import Lock
+from threading import Lock, RLock, Event, Thread
 from datetime import datetime
+from leveling import XPCurve, XPRules, RewardTable, DEFAULT_CURVE, threshold_top
+from storage import (
+    new_user_record, open_database, migrate_json_to_sqlite, write_level_rows, read_level_rows,
+    ShardedLevelStore, JsonTicketStore, JsonListStore, SQLiteLevelStore, SQLiteTicketStore, SQLiteListStore, LIST_NAMES
+)
 
 # Globale Variablen
 data = SYSTEM_CONFIG["data"]
@@ -38,6 +53,21 @@ FILEPATH = SYSTEM_CONFIG["FILEPATH"]
 BACKUP_PATH = SYSTEM_CONFIG["BACKUP_PATH"]
 
 _file_lock = Lock()  # Erstellt eine Sperre
+_data_lock = RLock()  # Hält Änderung + Journal-Eintrag bzw. Snapshot + Rotation atomar
+
+# Persistenz-Modus:
+# "write_behind" - Änderungen markieren die Datenbank nur als "dirty",
+#                  ein Hintergrund-Thread schreibt gesammelt (Standard)
+# "journal"      - Jede Änderung wird als kleiner Eintrag an data.journal
+#                  angehängt, ein Compactor faltet das Journal periodisch
+#                  in einen neuen Snapshot (data.json)
+# "direct"       - Jede Änderung stößt sofort einen Schreibvorgang im I/O-Thread an
+PERSISTENCE_MODE = SYSTEM_CONFIG.get("PERSISTENCE_MODE", "write_behind")
+FLUSH_INTERVAL = SYSTEM_CONFIG.get("FLUSH_INTERVAL", 5.0)        # Sekunden zwischen zwei Flushes
+FLUSH_MAX_CHANGES = SYSTEM_CONFIG.get("FLUSH_MAX_CHANGES", 100)  # Sofort-Flush ab N Änderungen
+JOURNAL_PATH = SYSTEM_CONFIG.get("JOURNAL_PATH", "data.journal")
+JOURNAL_COMPACT_RECORDS = SYSTEM_CONFIG.get("JOURNAL_COMPACT_RECORDS", 5000)  # Compaction ab N Einträgen
+JOURNAL_COMPACT_INTERVAL = SYSTEM_CONFIG.get("JOURNAL_COMPACT_INTERVAL", 300)  # Spätestens nach N Sekunden
 
 # ====== DATENBANK-SETUP ======
 if os.path.isfile("data.json"):
@@ -47,7 +77,7 @@ if os.path.isfile("data.json"):
 else:
     data = {
         "Last ID": 0,           # Letzte vergebene ID
-        "Tickets": [],          # Liste für Support-Tickets
+        "Tickets": {},          # Support-Tickets nach Channel-ID
         "ticket_config": {      # Ticket-Konfiguration
             "message_id": None,
         },
@@ -83,63 +113,518 @@ else:
         print("Created Database: Data")
 
 # ====== GRUNDLEGENDE FUNKTIONEN ======
-def dump():
-    """Speichert die aktuellen Daten in die JSON-Datei"""
+_state_lock = Lock()      # Schützt Dirty-Zähler und Statistiken
+_flush_event = Event()    # Weckt den Flusher vorzeitig auf
+_stop_event = Event()     # Beendet den Flusher
+_flusher_thread = None
+_pending_changes = 0      # Änderungen seit dem letzten Flush
+_main_dirty = False       # data.json selbst hat sich geändert (nicht nur Level-Partitionen)
+_direct_write_queued = False  # Modus "direct": Schreibauftrag wartet im I/O-Thread
+
+_journal_file = None      # Offenes Journal (Append-Modus)
+_journal_seq = 0          # Laufende Nummer des letzten Journal-Eintrags
+_journal_records = 0      # Einträge seit der letzten Compaction
+_last_compaction = time.monotonic()
+
+_persistence_stats = {
+    "changes": 0,           # Anzahl dump()-Aufrufe
+    "flushes": 0,           # Tatsächliche Schreibvorgänge
+    "coalesced": 0,         # Eingesparte Schreibvorgänge
+    "journal_records": 0,   # Angehängte Journal-Einträge
+    "replayed": 0,          # Beim Start nachgespielte Journal-Einträge
+    "flush_time_total": 0.0,
+    "last_flush_ms": 0.0,
+    "max_flush_ms": 0.0,
+}
+
+def _write_file_atomic(path: str, payload):
+    """Schreibt eine Datei über eine Temp-Datei + os.replace (nie halb geschrieben)
+
+    payload ist ein String oder ein Iterable von Teilstücken (siehe _render_snapshot).
+    """
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as file:
+        if isinstance(payload, str):
+            file.write(payload)
+        else:
+            for piece in payload:
+                file.write(piece)
+    os.replace(tmp_path, path)
+
+# ====== I/O-THREAD ======
+# Alle Schreibzugriffe aus dem Event-Loop landen in dieser Queue und werden
+# nacheinander (in Reihenfolge) von einem eigenen Thread ausgeführt.
+_io_queue = queue.Queue()
+_io_thread = None
+_io_lock = Lock()
+
+def _io_loop():
+    """I/O-Thread: führt eingereihte Dateizugriffe nacheinander aus"""
+    while True:
+        job = _io_queue.get()
+        if job is None:
+            break
+        future, func, args = job
+        if not future.set_running_or_notify_cancel():
+            continue
+        try:
+            future.set_result(func(*args))
+        except BaseException as e:
+            print(f"Fehler im I/O-Thread: {e}")
+            future.set_exception(e)
+
+def submit_io(func, *args) -> Future:
+    """Führt func(*args) im I/O-Thread aus und gibt ein Future zurück"""
+    global _io_thread
+    with _io_lock:
+        if _io_thread is None:
+            _io_thread = Thread(target=_io_loop, name="data-io", daemon=True)
+            _io_thread.start()
+    future = Future()
+    _io_queue.put((future, func, args))
+    return future
+
+def write_json_file(path: str, obj, indent=None) -> Future:
+    """Serialisiert obj sofort (konsistenter Stand) und schreibt es atomar im I/O-Thread"""
+    return submit_io(_write_file_atomic, path, json.dumps(obj, indent=indent))
+
+async def write_json_async(path: str, obj, indent=None):
+    """Wie write_json_file, wartet aber ohne den Event-Loop zu blockieren"""
+    await asyncio.wrap_future(write_json_file(path, obj, indent))
+
+def _stop_io():
+    """Arbeitet die I/O-Queue ab und beendet den I/O-Thread"""
+    global _io_thread
+    with _io_lock:
+        thread, _io_thread = _io_thread, None
+    if thread is not None:
+        _io_queue.put(None)
+        thread.join()
+
+JSON_CHUNK_SIZE = SYSTEM_CONFIG.get("JSON_CHUNK_SIZE", 1000)  # Einträge pro Serialisierungs-Häppchen
+
+def _iter_snapshot(obj, depth: int):
+    """Kopiert obj als Folge unveränderlicher Teilstücke (marshal) und gibt zwischen den Häppchen den GIL frei
+
+    Teilstücke sind fertiger JSON-Text (Klammern, Schlüssel) oder
+    (art, bytes) mit art "value", "dict" (Liste von Paaren) bzw. "list".
+    marshal.dumps ist ein Vielfaches schneller als json.dumps, die Kopie
+    unter _data_lock ist dadurch kurz.
+    """
+    if isinstance(obj, dict) and depth > 1:
+        yield "{"
+        for i, (key, value) in enumerate(obj.items()):
+            yield ("" if i == 0 else ", ") + json.dumps(key) + ": "
+            yield from _iter_snapshot(value, depth - 1)
+        yield "}"
+    elif isinstance(obj, (dict, list)) and len(obj) > JSON_CHUNK_SIZE:
+        # Große Dicts/Listen (z.B. Tickets) stückweise kopieren
+        is_dict = isinstance(obj, dict)
+        items = iter(obj.items() if is_dict else obj)
+        yield "{" if is_dict else "["
+        while True:
+            chunk = list(islice(items, JSON_CHUNK_SIZE))
+            if not chunk:
+                break
+            yield ("dict" if is_dict else "list", marshal.dumps(chunk))
+            time.sleep(0)
+        yield "}" if is_dict else "]"
+    else:
+        yield ("value", marshal.dumps(obj))
+
+def _snapshot_chunked(obj) -> list:
+    """Unveränderliche Kopie von obj für _render_snapshot (nur unter _data_lock aufrufen)
+
+    Der C-Encoder gibt den GIL während eines json.dumps-Aufrufs nicht frei.
+    Bei einer großen data.json würde der Event-Loop dadurch trotz I/O-Thread
+    für die gesamte Dauer stehen, und unter _data_lock würde jedes commit()
+    so lange warten. Unter der Sperre wird deshalb nur stückweise mit
+    marshal kopiert, das eigentliche JSON entsteht danach ohne Sperre.
+    """
+    return list(_iter_snapshot(obj, 2))
+
+def _render_snapshot(snapshot: list):
+    """Liefert den JSON-Text einer Kopie aus _snapshot_chunked in Teilstücken (ohne Sperre)"""
+    first = True
+    for piece in snapshot:
+        if isinstance(piece, str):
+            first = piece in ("{", "[")
+            yield piece
+            continue
+        kind, raw = piece
+        value = marshal.loads(raw)
+        if kind == "value":
+            yield json.dumps(value)
+        else:
+            # Einträge eines großen Dicts/einer Liste ohne die äußeren Klammern anhängen
+            text = json.dumps(dict(value) if kind == "dict" else value)[1:-1]
+            yield text if first else ", " + text
+            first = False
+        time.sleep(0)
+
+def _rotate_journal() -> bool:
+    """Verschiebt das aktuelle Journal nach *.old (nur unter _data_lock aufrufen)"""
+    global _journal_file, _journal_records
+    if _journal_file is not None:
+        _journal_file.close()
+        _journal_file = None
+    _journal_records = 0
+    if not os.path.isfile(JOURNAL_PATH):
+        return os.path.isfile(f"{JOURNAL_PATH}.old")
+    if os.path.isfile(f"{JOURNAL_PATH}.old"):
+        # Ein vorheriger Snapshot ist fehlgeschlagen -> alte Einträge behalten
+        with open(JOURNAL_PATH, encoding="utf-8") as src, open(f"{JOURNAL_PATH}.old", "a", encoding="utf-8") as dst:
+            dst.write(src.read())
+        os.remove(JOURNAL_PATH)
+    else:
+        os.replace(JOURNAL_PATH, f"{JOURNAL_PATH}.old")
+    return True
+
+def _journal_active() -> bool:
+    """Prüft ob noch nicht gefaltete Journal-Einträge existieren"""
+    return _journal_records > 0 or os.path.isfile(JOURNAL_PATH) or os.path.isfile(f"{JOURNAL_PATH}.old")
+
+def _write_data():
+    """Schreibt den aktuellen Stand sofort (Snapshot / Compaction)
+
+    Geschrieben werden die geänderten Level-Partitionen und - falls nötig -
+    data.json. Das alte Journal wird erst gelöscht, wenn alles geschrieben ist.
+    """
+    global _pending_changes, _main_dirty, _last_compaction
+    start = time.perf_counter()
     with _file_lock:
+        shard_ids = []
+        write_main = False
+        with _state_lock:
+            pending = _pending_changes
+            _pending_changes = 0
         try:
-            with open("data.json", "w") as file:
-                json.dump(data, file, indent=4)
-        except IOError as e:
-            print(f"Fehler beim Speichern: {e}")
-            raise
+            with _data_lock:
+                write_main = _main_dirty
+                _main_dirty = False
+                rotated = False
+                if _journal_active():
+                    # Snapshot merkt sich bis wohin das Journal enthalten ist
+                    data["Journal Seq"] = _journal_seq
+                    rotated = _rotate_journal()
+                    write_main = True
+                shards = _levels.collect_dirty()
+                shard_ids = [guild_id for guild_id, _, _ in shards]
+                # Änderungen laufen über commit() und warten auf _data_lock -> konsistenter
+                # Stand. Unter der Sperre wird nur kopiert, serialisiert wird danach
+                snapshot = _snapshot_chunked(data) if write_main else None
+            for _, path, shard_payload in shards:
+                _write_file_atomic(path, shard_payload)
+            if snapshot is not None:
+                _write_file_atomic("data.json", _render_snapshot(snapshot))
         except Exception as e:
-            print(f"Unerwarteter Fehler: {e}")
+            print(f"Fehler beim Speichern: {e}")
+            _levels.finish_write(shard_ids, False)
+            with _state_lock:
+                if write_main:
+                    _main_dirty = True
+                # Zähler zurückgeben, damit _needs_flush() / flush_data() erneut schreiben
+                # (mind. 1: eine fehlgeschlagene Compaction hatte evtl. keine Änderungen gezählt)
+                _pending_changes += max(pending, 1)
             raise
+        _levels.finish_write(shard_ids, True)
+        if rotated:
+            # Erst nach erfolgreichem Snapshot ist das alte Journal überflüssig
+            os.remove(f"{JOURNAL_PATH}.old")
+        _last_compaction = time.monotonic()
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    with _state_lock:
+        _persistence_stats["flushes"] += 1
+        _persistence_stats["coalesced"] += max(pending - 1, 0)
+        _persistence_stats["flush_time_total"] += elapsed_ms
+        _persistence_stats["last_flush_ms"] = elapsed_ms
+        _persistence_stats["max_flush_ms"] = max(_persistence_stats["max_flush_ms"], elapsed_ms)
+
+def _needs_flush() -> bool:
+    """Prüft ob der Flusher schreiben bzw. das Journal kompaktieren soll"""
+    if _pending_changes:
+        return True
+    if _journal_records >= JOURNAL_COMPACT_RECORDS:
+        return True
+    return _journal_records > 0 and time.monotonic() - _last_compaction >= JOURNAL_COMPACT_INTERVAL
+
+def _flusher_loop():
+    """Hintergrund-Thread: schreibt gesammelte Änderungen periodisch weg"""
+    while not _stop_event.is_set():
+        _flush_event.wait(FLUSH_INTERVAL)
+        _flush_event.clear()
+        if _needs_flush():
+            try:
+                _write_data()
+            except Exception:
+                # Fehler wurde bereits ausgegeben, nächster Versuch im nächsten Intervall
+                pass
+
+def _start_flusher():
+    """Startet den Write-Behind Flusher (einmalig)"""
+    global _flusher_thread
+    if _flusher_thread is None:
+        _flusher_thread = Thread(target=_flusher_loop, name="data-flusher", daemon=True)
+        _flusher_thread.start()
+
+def dump():
+    """Speichert die aktuellen Daten in die JSON-Datei
+
+    Im Write-Behind und Journal Modus wird nur eine Änderung vorgemerkt, der
+    Flusher schreibt spätestens nach FLUSH_INTERVAL Sekunden bzw.
+    FLUSH_MAX_CHANGES Änderungen.
+    """
+    global _main_dirty
+    _main_dirty = True
+    _mark_pending()
+
+def _mark_pending():
+    """Zählt eine Änderung und stößt je nach Modus das Schreiben an"""
+    global _pending_changes, _direct_write_queued
+    with _state_lock:
+        _pending_changes += 1
+        _persistence_stats["changes"] += 1
+        pending = _pending_changes
+    if PERSISTENCE_MODE == "direct":
+        # Schreiben im I/O-Thread, solange noch ein Schreibauftrag wartet wird keiner nachgereicht
+        with _state_lock:
+            if _direct_write_queued:
+                return
+            _direct_write_queued = True
+        submit_io(_direct_write)
+        return
+    _start_flusher()
+    if pending >= FLUSH_MAX_CHANGES:
+        _flush_event.set()
+
+def _direct_write():
+    """Schreibauftrag im Modus "direct" (läuft im I/O-Thread)"""
+    global _direct_write_queued
+    with _state_lock:
+        _direct_write_queued = False
+    try:
+        _write_data()
+    except Exception:
+        # Niemand wartet auf dieses Future: Die Änderungen bleiben vorgemerkt und werden
+        # mit der nächsten Änderung bzw. spätestens von shutdown_persistence() geschrieben
+        pass
+
+def _journal_append(record: dict):
+    """Hängt einen Eintrag an das Journal an (nur unter _data_lock aufrufen)"""
+    global _journal_file, _journal_seq, _journal_records
+    _journal_seq += 1
+    record["seq"] = _journal_seq
+    if _journal_file is None:
+        _journal_file = open(JOURNAL_PATH, "a", encoding="utf-8")
+    _journal_file.write(json.dumps(record, separators=(",", ":")) + "\n")
+    _journal_file.flush()
+    _journal_records += 1
+    with _state_lock:
+        _persistence_stats["journal_records"] += 1
+    _start_flusher()
+    if _journal_records >= JOURNAL_COMPACT_RECORDS:
+        _flush_event.set()
+
+# Operationen, die nur eine Level-Partition betreffen (nicht data.json)
+LEVEL_OPS = {"guild_create", "guild_set", "user", "block", "unblock", "block_many", "unblock_many", "curve_set", "activity", "cold_freeze", "user_many"}
+# Operationen, die über den Ticket-Store (inkl. Indizes) laufen
+TICKET_OPS = {"ticket_create", "ticket_kill", "ticket_set"}
+# Operationen auf den Listen (Einkaufsliste, Todo-Liste)
+LIST_OPS = {"list_push", "list_pop"}
+
+def _apply_change(record: dict):
+    """Wendet eine Änderung auf die Daten an (live und beim Journal-Replay)"""
+    op = record["op"]
+    if op in LEVEL_OPS:
+        _levels.apply(record)
+    elif op == "set" and record["path"][0] == "levels" and len(record["path"]) > 1:
+        # Journal-Einträge aus der Zeit vor den Level-Partitionen
+        if len(record["path"]) == 2:
+            config = {key: value for key, value in record["value"].items() if key != "users"}
+            _levels.apply({"op": "guild_create", "guild": record["path"][1], "config": config})
+        else:
+            _levels.apply({"op": "guild_set", "guild": record["path"][1], "key": record["path"][2], "value": record["value"]})
+    elif op == "set":
+        target = data
+        for key in record["path"][:-1]:
+            target = target[key]
+        target[record["path"][-1]] = record["value"]
+    elif op in TICKET_OPS:
+        _tickets.apply(record)
+    elif op in LIST_OPS:
+        _lists.apply(record)
+    else:
+        raise ValueError(f"Unbekannte Journal-Operation: {op}")
+
+def commit(op: str, **fields):
+    """Führt eine Änderung aus und persistiert sie
+
+    Im Journal-Modus wird nur ein kleiner Eintrag angehängt (Kosten unabhängig
+    von der Datenbankgröße), sonst wird dump() aufgerufen.
+    """
+    record = {"op": op, **fields}
+    with _data_lock:
+        _apply_change(record)
+        if PERSISTENCE_MODE == "journal":
+            _journal_append(record)
+            return
+    if op in LEVEL_OPS:
+        # Nur die betroffene Level-Partition wird neu geschrieben
+        _mark_pending()
+    else:
+        dump()
+
+def _replay_journal(force_snapshot: bool = False):
+    """Spielt beim Start Journal-Einträge ein, die neuer als der Snapshot sind"""
+    global _journal_seq
+    snapshot_seq = data.get("Journal Seq", 0)
+    _journal_seq = snapshot_seq
+    replayed = 0
+    for path in (f"{JOURNAL_PATH}.old", JOURNAL_PATH):
+        if not os.path.isfile(path):
+            continue
+        with open(path, encoding="utf-8") as file:
+            for line in file:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # Abgebrochener letzter Eintrag (Absturz beim Schreiben)
+                    break
+                if record["seq"] <= snapshot_seq:
+                    continue
+                _apply_change(record)
+                _journal_seq = max(_journal_seq, record["seq"])
+                replayed += 1
+    if replayed or _journal_active():
+        print(f"Replayed Journal: {replayed} Einträge")
+        _persistence_stats["replayed"] = replayed
+        force_snapshot = True
+    if force_snapshot:
+        # Nachgespielte bzw. migrierte Daten sofort in einen frischen Snapshot falten
+        global _main_dirty
+        _main_dirty = True
+        _write_data()
+
+def flush_data():
+    """Schreibt alle vorgemerkten Änderungen sofort in die Datei"""
+    if _pending_changes or _journal_records:
+        _write_data()
+
+async def flush_data_async():
+    """Wie flush_data, das Schreiben läuft aber im I/O-Thread"""
+    await asyncio.wrap_future(submit_io(flush_data))
+
+def shutdown_persistence():
+    """Stoppt Flusher und I/O-Thread und schreibt ausstehende Änderungen (beim Beenden)"""
+    _stop_event.set()
+    _flush_event.set()
+    _stop_io()
+    flush_data()
+
+def get_persistence_stats() -> dict:
+    """Gibt Statistiken zum Speichern zurück (Flushes, eingesparte Writes, Dauer)"""
+    with _state_lock:
+        stats = dict(_persistence_stats)
+        stats["pending"] = _pending_changes
+    stats["mode"] = PERSISTENCE_MODE
+    stats["journal_pending"] = _journal_records
+    stats["storage"] = _levels.stats()
+    stats["avg_flush_ms"] = stats["flush_time_total"] / stats["flushes"] if stats["flushes"] else 0.0
+    return stats
+
+atexit.register(shutdown_persistence)
 
 def lib():
     """Gibt die aktuelle Datenbank zurück"""
     return data
 
 
+_migrated = False  # Format wurde beim Start umgestellt -> sofort neuen Snapshot schreiben
+
 # Prüfe ob levels existiert, falls nicht erstelle es
 if "levels" not in data:
     data["levels"] = {}
-    dump()
+    _migrated = True
+
+# Tickets als Dict nach Channel-ID statt Liste (Zugriff in O(1))
+if isinstance(data["Tickets"], list):
+    data["Tickets"] = {str(ticket["ID"]): ticket for ticket in data["Tickets"]}
+    _migrated = True
+
+
+# ====== SPEICHER-BACKEND ======
+# "json"   - Level-Daten als Partition pro Server in LEVELS_PATH, Tickets und Listen in data.json (Standard)
+# "sqlite" - Level, Tickets und Listen liegen in SQLITE_PATH (siehe storage.py)
+STORAGE_BACKEND = SYSTEM_CONFIG.get("STORAGE_BACKEND", "json")
+SQLITE_PATH = SYSTEM_CONFIG.get("SQLITE_PATH", "data.sqlite3")
+LEVELS_PATH = SYSTEM_CONFIG.get("LEVELS_PATH", "levels")
+LEVEL_CACHE_GUILDS = SYSTEM_CONFIG.get("LEVEL_CACHE_GUILDS", 50)  # Max. geladene Server (LRU)
+
+if STORAGE_BACKEND == "sqlite":
+    _db = open_database(SQLITE_PATH)
+    _sqlite_migration = None
+    if data["levels"] or data["Tickets"] or any(
+        data[name]["Profiles"] or data[name]["Last Message ID"] for name in LIST_NAMES
+    ):
+        # Einmalige Migration der bisherigen JSON-Daten, vor dem Anlegen der Stores
+        # (SQLiteLevelStore liest die Server-Konfigurationen beim Erzeugen)
+        if not os.path.isfile("data.json.pre-sqlite"):
+            with open("data.json.pre-sqlite", "w") as file:
+                json.dump(data, file)
+        _sqlite_migration = migrate_json_to_sqlite(data, _db)
+    _levels = SQLiteLevelStore(_db)
+    _tickets = SQLiteTicketStore(_db)
+    _lists = SQLiteListStore(_db)
+    if _sqlite_migration is not None:
+        commit("set", path=["levels"], value={})
+        commit("set", path=["Tickets"], value={})
+        for list_name in LIST_NAMES:
+            commit("set", path=[list_name], value={"Profiles": [], "Last Message ID": 0})
+        guilds, users, tickets, items = _sqlite_migration
+        print(f"Migrated Database: {guilds} Server, {users} User, {tickets} Tickets, {items} Listen-Einträge -> {SQLITE_PATH}")
+else:
+    _levels = ShardedLevelStore(LEVELS_PATH, commit, _data_lock, LEVEL_CACHE_GUILDS)
+    _tickets = JsonTicketStore(data, commit)
+    _lists = JsonListStore(data, commit)
+    if data["levels"]:
+        # Einmalige Aufteilung des alten data["levels"] in Partitionen pro Server
+        _levels.adopt(data["levels"])
+        print(f"Migrated Database: {len(data['levels'])} Server -> {LEVELS_PATH}/")
+        data["levels"] = {}
+        _migrated = True
+
+atexit.register(_levels.close)
+
+# Änderungen aus dem Journal nachspielen, die noch nicht im Snapshot sind
+_replay_journal(force_snapshot=_migrated)
 
 
 # ====== TICKET-SYSTEM FUNKTIONEN ======
 def is_ticket(channel_id):
     """Prüft, ob ein Channel ein Ticket ist"""
-    for ticket in data["Tickets"]:
-        if ticket["ID"] == channel_id:
-            return True
-    return False
+    return _tickets.get(channel_id) is not None
 
 def find_ticket_index(channel_id):
-    """Findet den Index eines Tickets in der Liste"""
-    for index, ticket in enumerate(data["Tickets"]):
-        if ticket["ID"] == channel_id:
-            return index
-    return False
+    """Gibt den Schlüssel eines Tickets in data["Tickets"] zurück (False wenn keins)"""
+    if not is_ticket(channel_id):
+        return False
+    return str(channel_id)
 
 def ticket_check(user_id, channel_id):
     """Prüft, ob ein Benutzer der Besitzer eines Tickets ist"""
-    for ticket in data["Tickets"]:
-        if ticket["ID"] == channel_id:
-            return ticket["Owner_ID"] == user_id
-    return False
+    ticket = _tickets.get(channel_id)
+    if ticket is None:
+        return False
+    return ticket["Owner_ID"] == user_id
 
 def kill_ticket(channel_id):
     """Löscht ein Ticket aus der Datenbank"""
-    index = find_ticket_index(channel_id)
-    if index is not False:
-        data["Tickets"].pop(index)
-        dump()
+    if is_ticket(channel_id):
+        _tickets.kill(channel_id)
 
 def max_tickets(user_id):
     """Prüft, ob ein Benutzer das Ticket-Limit erreicht hat (max. 3)"""
-    count = sum(1 for ticket in data["Tickets"] if int(ticket["Owner_ID"]) == int(user_id))
-    return count < 3
+    return _tickets.count_by_owner(user_id) < 3
 
 # ====== DISCORD.PY COG SETUP ======
 class functions(commands.Cog):
@@ -159,13 +644,11 @@ def create_ticket(channel_id, owner_id, ticket_type):
         "Type": ticket_type,
         "Created": str(get_timestamp())
     }
-    data["Tickets"].append(ticket)
-    dump()
+    _tickets.create(ticket)
 
 def save_ticket_message(message_id):
     """Speichert die Ticket-Message ID"""
-    data["ticket_config"]["message_id"] = message_id
-    dump()
+    commit("set", path=["ticket_config", "message_id"], value=message_id)
 
 def get_ticket_message():
     """Gibt die gespeicherte Ticket-Message ID zurück"""
@@ -173,17 +656,19 @@ def get_ticket_message():
 
 def get_ticket_owner(channel_id):
     """Gibt die Owner ID eines Tickets zurück"""
-    for ticket in data["Tickets"]:
-        if ticket["ID"] == channel_id:
-            return ticket["Owner_ID"]
-    return None
+    ticket = _tickets.get(channel_id)
+    if ticket is None:
+        return None
+    return ticket["Owner_ID"]
 
 def get_ticket_data(channel_id):
     """Gibt alle Ticket-Daten zurück"""
-    for ticket in data["Tickets"]:
-        if ticket["ID"] == channel_id:
-            return ticket
-    return None
+    return _tickets.get(channel_id)
+
+def set_ticket_field(channel_id, key: str, value):
+    """Setzt ein einzelnes Feld eines Tickets (z.B. message_id)"""
+    if is_ticket(channel_id):
+        _tickets.set_field(channel_id, key, value)
 
 # ====== SHOPPING-SYSTEM FUNKTIONEN ======
 def save_shopping_list():
@@ -197,7 +682,7 @@ def shopping_dump():
 def create_shopping_embed():
     """Erstellt ein Embed für die Einkaufsliste"""
     embed = discord.Embed(title="Einkaufsliste", color=COLORS["violet"], timestamp=get_timestamp())
-    for i, item in enumerate(data["shopping"]["Profiles"]):
+    for i, item in enumerate(get_list_items("shopping")):
         embed.add_field(
             name=f"{i}. {item['task']}", 
             value=f"Hinzugefügt von: {item['author']}", 
@@ -205,8 +690,29 @@ def create_shopping_embed():
         )
     return embed
 
-# Hilfsvariablen für einfacheren Zugriff
-shopping_data = data["shopping"]
+# ====== LISTEN-FUNKTIONEN (Shopping & Todo) ======
+def get_list_items(list_name: str) -> list:
+    """Gibt die Einträge einer Liste zurück ("shopping" oder "todo")"""
+    return _lists.items(list_name)
+
+def add_list_item(list_name: str, author: str, task: str):
+    """Fügt einen Eintrag zu einer Liste hinzu ("shopping" oder "todo")"""
+    _lists.push(list_name, {"author": author, "task": task})
+
+def remove_list_item(list_name: str, index: int) -> bool:
+    """Entfernt einen Eintrag aus einer Liste, gibt False bei ungültigem Index zurück"""
+    if not 0 <= index < len(_lists.items(list_name)):
+        return False
+    _lists.pop(list_name, index)
+    return True
+
+def get_list_message_id(list_name: str) -> int:
+    """Gibt die ID der zuletzt gesendeten Listen-Nachricht zurück (0 wenn keine)"""
+    return _lists.get_message_id(list_name)
+
+def set_list_message_id(list_name: str, message_id: int):
+    """Speichert die ID der zuletzt gesendeten Listen-Nachricht"""
+    _lists.set_message_id(list_name, message_id)
 
 # ====== TODO-SYSTEM FUNKTIONEN ======
 def save_todo_list():
@@ -216,7 +722,7 @@ def save_todo_list():
 def create_embed():
     """Erstellt ein Embed für die Todo-Liste"""
     embed = discord.Embed(title="Todo-Liste", color=COLORS["violet"], timestamp=get_timestamp())
-    for i, item in enumerate(data["todo"]["Profiles"]):
+    for i, item in enumerate(get_list_items("todo")):
         embed.add_field(
             name=f"{i}. {item['task']}", 
             value=f"Hinzugefügt von: {item['author']}", 
@@ -224,158 +730,677 @@ def create_embed():
         )
     return embed
 
-# Hilfsvariable für einfacheren Zugriff
-todo_data = data["todo"]
-
 def get_timestamp() -> datetime:
     """Gibt den aktuellen Timestamp zurück"""
     return datetime.now()
 
+# ====== USER-AUFLÖSUNG ======
+USER_CACHE_TTL = SYSTEM_CONFIG.get("USER_CACHE_TTL", 300)               # Sekunden
+USER_FETCH_CONCURRENCY = SYSTEM_CONFIG.get("USER_FETCH_CONCURRENCY", 5)  # Parallele REST-Anfragen
+
+class UserResolver:
+    """Löst User-IDs für Anzeigen (Name, Avatar, Mention) auf
+    
+    Reihenfolge: guild.get_member -> client.get_user -> TTL-Cache. Nur was
+    dann noch fehlt, wird per REST geholt - alle fehlenden IDs gleichzeitig,
+    höchstens USER_FETCH_CONCURRENCY Anfragen parallel. Auch "nicht
+    gefunden" wird gecacht, damit gelöschte Accounts nicht bei jedem
+    Aufruf erneut angefragt werden.
+    """
+    
+    def __init__(self, ttl: float = USER_CACHE_TTL, concurrency: int = USER_FETCH_CONCURRENCY):
+        self.ttl = ttl
+        self.concurrency = concurrency
+        self._cache = {}  # (guild_id, user_id) -> (Ablaufzeit, Member/User oder None)
+        self.stats = {"cached": 0, "fetched": 0, "not_found": 0}
+    
+    def _lookup(self, client, guild, user_id: int):
+        """Sucht einen User ohne REST-Anfrage, gibt (gefunden, User) zurück"""
+        if guild is not None:
+            member = guild.get_member(user_id)
+            if member is not None:
+                return True, member
+        # Vor dem TTL-Cache, damit ein gecachtes "nicht gefunden" keinen inzwischen bekannten User verdeckt
+        user = client.get_user(user_id)
+        if user is not None:
+            return True, user
+        entry = self._cache.get((guild.id if guild is not None else 0, user_id))
+        if entry is not None and entry[0] > time.monotonic():
+            return True, entry[1]
+        return False, None
+    
+    async def _fetch(self, client, guild, user_id: int, semaphore):
+        """Holt einen User per REST (als Member wenn möglich)"""
+        async with semaphore:
+            user = None
+            try:
+                if guild is not None:
+                    user = await guild.fetch_member(user_id)
+            except discord.HTTPException:
+                user = None
+            if user is None:
+                try:
+                    user = await client.fetch_user(user_id)
+                except discord.HTTPException:
+                    user = None
+        self.stats["fetched" if user is not None else "not_found"] += 1
+        return user_id, user
+    
+    def _prune(self):
+        """Entfernt abgelaufene Einträge"""
+        now = time.monotonic()
+        for key in [key for key, (expires, _) in self._cache.items() if expires <= now]:
+            del self._cache[key]
+    
+    async def resolve(self, client, guild, user_ids) -> dict:
+        """Gibt {user_id: Member/User oder None} für alle user_ids zurück"""
+        result = {}
+        missing = []
+        for user_id in dict.fromkeys(int(user_id) for user_id in user_ids):
+            found, user = self._lookup(client, guild, user_id)
+            if found:
+                result[user_id] = user
+                self.stats["cached"] += 1
+            else:
+                missing.append(user_id)
+        
+        if missing:
+            semaphore = asyncio.Semaphore(self.concurrency)
+            fetched = await asyncio.gather(*(self._fetch(client, guild, user_id, semaphore) for user_id in missing))
+            if len(self._cache) > 1000:
+                self._prune()
+            expires = time.monotonic() + self.ttl
+            guild_key = guild.id if guild is not None else 0
+            for user_id, user in fetched:
+                self._cache[(guild_key, user_id)] = (expires, user)
+                result[user_id] = user
+        return result
+    
+    async def resolve_one(self, client, guild, user_id):
+        """Löst eine einzelne User-ID auf (None wenn unbekannt)"""
+        return (await self.resolve(client, guild, [user_id]))[int(user_id)]
+
+user_resolver = UserResolver()
+
 # ====== LEVEL-SYSTEM FUNKTIONEN ======
-def setup_level_system(guild_id: str):
-    """Richtet das Level-System für einen Server ein"""
-    if guild_id not in data["levels"]:
-        data["levels"][guild_id] = {
+SPAM_MIN_LENGTH = SYSTEM_CONFIG.get("SPAM_MIN_LENGTH", 5)  # Mindestlänge (normalisiert) für XP
+SPAM_DISTANCE = SYSTEM_CONFIG.get("SPAM_DISTANCE", 10)     # Max. abweichende SimHash-Bits für ein Duplikat
+COLD_AFTER_DAYS = SYSTEM_CONFIG.get("COLD_AFTER_DAYS", 90)  # Inaktive User nach N Tagen archivieren (0 = nie)
+IMPORT_BATCH = SYSTEM_CONFIG.get("IMPORT_BATCH", 5000)      # Zeilen pro Commit bei Export/Import
+IMPORT_MAX_ERRORS = 10  # Gemerkte Fehlermeldungen pro Import
+
+_level_listeners = []  # Callbacks (guild_id, user_id, alter_datensatz, neuer_datensatz)
+_curves = {}           # guild_id -> (Kurven-Konfiguration, XPCurve)
+_rules = {}            # guild_id -> (Multiplikator-Konfiguration, XPRules)
+_rewards = {}          # guild_id -> ((Belohnungen, stapeln), RewardTable)
+
+def register_level_listener(callback):
+    """Registriert einen Callback, der bei jeder Änderung eines User-Datensatzes aufgerufen wird
+    
+    Betrifft eine Änderung alle User eines Servers (z.B. neue Level-Kurve),
+    wird der Callback einmal mit user_id, alter_datensatz und
+    neuer_datensatz = None aufgerufen.
+    """
+    if callback not in _level_listeners:
+        _level_listeners.append(callback)
+
+def unregister_level_listener(callback):
+    """Entfernt einen mit register_level_listener registrierten Callback"""
+    if callback in _level_listeners:
+        _level_listeners.remove(callback)
+
+def _notify_level_listeners(guild_id: str, user_id, old_record, record):
+    """Ruft alle Level-Listener auf (Fehler einzelner Listener werden nur geloggt)"""
+    for callback in _level_listeners:
+        try:
+            callback(guild_id, user_id, old_record, record)
+        except Exception as e:
+            print(f"Fehler im Level-Listener: {e}")
+
+def get_xp_curve(guild_id: str = None) -> XPCurve:
+    """Gibt die Level-Kurve eines Servers zurück (Schwellen werden einmal pro Konfiguration berechnet)"""
+    guild = _levels.get_guild(guild_id) if guild_id is not None else None
+    config = guild.get("xp_curve", DEFAULT_CURVE) if guild is not None else DEFAULT_CURVE
+    cached = _curves.get(guild_id)
+    if cached is not None and cached[0] is config:
+        return cached[1]
+    curve = XPCurve.from_config(config)
+    _curves[guild_id] = (config, curve)
+    return curve
+
+def set_xp_curve(guild_id: str, config: dict) -> bool:
+    """Setzt die Level-Kurve eines Servers und berechnet alle Level in einem Durchlauf neu
+    
+    Ungültige Konfigurationen lösen einen ValueError aus, bevor etwas
+    gespeichert wird.
+    """
+    if _levels.get_guild(guild_id) is None:
+        return False
+    
+    XPCurve.from_config(config)
+    _levels.set_curve(guild_id, config)
+    _curves.pop(guild_id, None)
+    _notify_level_listeners(guild_id, None, None, None)
+    return True
+
+def get_xp_rules(guild_id: str) -> XPRules:
+    """Gibt die kompilierten XP-Multiplikatoren eines Servers zurück
+    
+    Neu übersetzt wird nur, wenn sich guild["xp_multipliers"] geändert hat.
+    """
+    guild = _levels.get_guild(guild_id)
+    config = guild.get("xp_multipliers") if guild is not None else None
+    cached = _rules.get(guild_id)
+    if cached is not None and cached[0] is config:
+        return cached[1]
+    rules = XPRules(config)
+    _rules[guild_id] = (config, rules)
+    return rules
+
+def get_xp_multipliers(guild_id: str) -> dict:
+    """Gibt die Multiplikator-Konfiguration eines Servers zurück"""
+    guild = _levels.get_guild(guild_id)
+    config = (guild.get("xp_multipliers") if guild is not None else None) or {}
+    return {
+        "channels": dict(config.get("channels", {})),
+        "roles": dict(config.get("roles", {})),
+        "windows": list(config.get("windows", []))
+    }
+
+def _save_xp_multipliers(guild_id: str, config: dict) -> bool:
+    """Prüft und speichert eine neue Multiplikator-Konfiguration (ValueError bei ungültigen Regeln)"""
+    if _levels.get_guild(guild_id) is None:
+        return False
+    XPRules(config)
+    _levels.set_guild_value(guild_id, "xp_multipliers", config)
+    return True
+
+def set_channel_multiplier(guild_id: str, channel_id: str, multiplier: float) -> bool:
+    """Setzt den XP-Multiplikator eines Channels (1.0 entfernt die Regel)"""
+    config = get_xp_multipliers(guild_id)
+    if multiplier == 1:
+        config["channels"].pop(channel_id, None)
+    else:
+        config["channels"][channel_id] = multiplier
+    return _save_xp_multipliers(guild_id, config)
+
+def set_role_multiplier(guild_id: str, role_id: str, multiplier: float) -> bool:
+    """Setzt den XP-Multiplikator einer Rolle (1.0 entfernt die Regel)"""
+    config = get_xp_multipliers(guild_id)
+    if multiplier == 1:
+        config["roles"].pop(role_id, None)
+    else:
+        config["roles"][role_id] = multiplier
+    return _save_xp_multipliers(guild_id, config)
+
+def add_xp_window(guild_id: str, days: list, start: str, end: str, multiplier: float) -> bool:
+    """Fügt ein Zeitfenster mit XP-Multiplikator hinzu (days: 0 = Montag ... 6 = Sonntag)"""
+    config = get_xp_multipliers(guild_id)
+    config["windows"].append({"days": days, "start": start, "end": end, "multiplier": multiplier})
+    return _save_xp_multipliers(guild_id, config)
+
+def remove_xp_window(guild_id: str, index: int) -> bool:
+    """Entfernt ein Zeitfenster, gibt False bei ungültigem Index zurück"""
+    config = get_xp_multipliers(guild_id)
+    if not 0 <= index < len(config["windows"]):
+        return False
+    config["windows"].pop(index)
+    return _save_xp_multipliers(guild_id, config)
+
+def get_reward_table(guild_id: str) -> RewardTable:
+    """Gibt die Rollen-Belohnungen eines Servers zurück (neu aufgebaut nur nach Änderungen)"""
+    guild = _levels.get_guild(guild_id)
+    if guild is None:
+        return RewardTable()
+    rewards = guild.get("level_rewards")
+    stack = guild.get("level_rewards_stack", True)
+    cached = _rewards.get(guild_id)
+    if cached is not None and cached[0][0] is rewards and cached[0][1] == stack:
+        return cached[1]
+    table = RewardTable(rewards, stack)
+    _rewards[guild_id] = ((rewards, stack), table)
+    return table
+
+def get_level_rewards(guild_id: str) -> dict:
+    """Gibt die Rollen-Belohnungen als {level: role_id} zurück (sortiert nach Level)"""
+    guild = _levels.get_guild(guild_id)
+    rewards = (guild.get("level_rewards") if guild is not None else None) or {}
+    return {int(level): role_id for level, role_id in sorted(rewards.items(), key=lambda item: int(item[0]))}
+
+def set_level_reward(guild_id: str, level: int, role_id: str = None) -> bool:
+    """Setzt die Belohnungs-Rolle für ein Level (None entfernt sie)"""
+    guild = _levels.get_guild(guild_id)
+    if guild is None or level < 1:
+        return False
+    rewards = dict(guild.get("level_rewards") or {})
+    if role_id is None:
+        if rewards.pop(str(level), None) is None:
+            return False
+    else:
+        rewards[str(level)] = role_id
+    _levels.set_guild_value(guild_id, "level_rewards", rewards)
+    return True
+
+def set_reward_stacking(guild_id: str, stack: bool) -> bool:
+    """Legt fest, ob Members alle erreichten Rollen behalten (True) oder nur die höchste"""
+    if _levels.get_guild(guild_id) is None:
+        return False
+    _levels.set_guild_value(guild_id, "level_rewards_stack", stack)
+    return True
+
+def iter_level_users(guild_id: str):
+    """Iteriert über (user_id, datensatz) aller User eines Servers"""
+    if _levels.get_guild(guild_id) is None:
+        return iter(())
+    return _levels.iter_users(guild_id)
+
+def iter_ranked_levels(guild_id: str, min_level: int = 0):
+    """Iteriert über (user_id, level) absteigend nach XP, nur User ab min_level (liest nur den Rang-Index)"""
+    if _levels.get_guild(guild_id) is None:
+        return
+    curve = get_xp_curve(guild_id)
+    min_xp = curve.xp_for_level(min_level)
+    for user_id, xp in _levels.iter_ranked(guild_id):
+        if xp < min_xp:
+            return
+        yield user_id, curve.level_for(xp)
+
+def get_level_xp_many(guild_id: str, user_ids: list) -> dict:
+    """Gibt {user_id: xp} für alle User aus user_ids mit Level-Daten zurück"""
+    if _levels.get_guild(guild_id) is None:
+        return {}
+    return _levels.get_xp_many(guild_id, user_ids)
+
+def get_xp_range(guild_id: str) -> tuple:
+    """Gibt (min, max) XP pro Nachricht eines Servers zurück"""
+    guild = _levels.get_guild(guild_id)
+    if guild is None:
+        return 1, 15
+    low, high = guild.get("xp_range", (1, 15))
+    return low, high
+
+def set_xp_range(guild_id: str, low: int, high: int) -> bool:
+    """Setzt die XP pro Nachricht eines Servers (False bei ungültigem Bereich)"""
+    if _levels.get_guild(guild_id) is None or not 0 <= low <= high:
+        return False
+    _levels.set_guild_value(guild_id, "xp_range", [low, high])
+    return True
+
+def get_spam_filter(guild_id: str) -> dict:
+    """Gibt die Spam-Filter-Einstellungen eines Servers zurück (standardmäßig aus)"""
+    guild = _levels.get_guild(guild_id)
+    config = (guild.get("spam_filter") if guild is not None else None) or {}
+    return {
+        "enabled": config.get("enabled", False),
+        "min_length": config.get("min_length", SPAM_MIN_LENGTH),
+        "distance": config.get("distance", SPAM_DISTANCE)
+    }
+
+def set_spam_filter(guild_id: str, enabled: bool, min_length: int = None, distance: int = None) -> bool:
+    """Schaltet den Spam-Filter um, nicht angegebene Werte bleiben erhalten (False bei ungültigen Werten)"""
+    if _levels.get_guild(guild_id) is None:
+        return False
+    config = get_spam_filter(guild_id)
+    config["enabled"] = enabled
+    if min_length is not None:
+        config["min_length"] = min_length
+    if distance is not None:
+        config["distance"] = distance
+    if not 0 <= config["min_length"] <= 100 or not 0 <= config["distance"] <= 16:
+        return False
+    _levels.set_guild_value(guild_id, "spam_filter", config)
+    return True
+
+def setup_level_system(guild_id: str, setup_id: int = None):
+    """Richtet das Level-System für einen Server ein
+
+    setup_id: Snowflake des Einrichtungszeitpunkts (z.B. die ID der
+    /setup-level Interaktion, Standard: jetzt). Neuere Nachrichten vergibt
+    on_message, /level-backfill wertet nur ältere aus.
+    """
+    if _levels.get_guild(guild_id) is None:
+        _levels.create_guild(guild_id, {
             "enabled": True,
+            "setup_id": setup_id or discord.utils.time_snowflake(discord.utils.utcnow()),
             "announcement_channel": None,
             "xp_cooldown": 30,  # Sekunden
             "xp_range": [1, 15],  # Min-Max XP pro Nachricht
-            "blocked_channels": [],  # Blockierte Channels für XP
-            "users": {}
-        }
-        dump()
+            "xp_curve": dict(DEFAULT_CURVE),  # Level-Kurve (siehe leveling.XPCurve)
+            "blocked_channels": []  # Blockierte Channels für XP
+        })
         return True
     return False
 
+def get_level_setup_id(guild_id: str):
+    """Gibt den Snowflake der Einrichtung zurück (None bei Servern von vor dieser Angabe)"""
+    guild = _levels.get_guild(guild_id)
+    return guild.get("setup_id") if guild is not None else None
+
+def set_level_setup_id(guild_id: str, setup_id: int) -> bool:
+    """Setzt den Einrichtungszeitpunkt nachträglich (nur für ältere Server ohne Angabe)"""
+    if _levels.get_guild(guild_id) is None or get_level_setup_id(guild_id) is not None:
+        return False
+    _levels.set_guild_value(guild_id, "setup_id", setup_id)
+    return True
+
 def is_level_system_enabled(guild_id: str) -> bool:
     """Prüft ob das Level-System für einen Server aktiviert ist"""
-    return guild_id in data["levels"] and data["levels"][guild_id]["enabled"]
+    guild = _levels.get_guild(guild_id)
+    return guild is not None and guild["enabled"]
 
 def get_user_level_data(guild_id: str, user_id: str):
-    """Gibt die Level-Daten eines Users zurück"""
-    if guild_id not in data["levels"]:
+    """Gibt die Level-Daten eines Users zurück (leerer Datensatz ohne Speichern, wenn unbekannt)"""
+    if _levels.get_guild(guild_id) is None:
         return None
     
-    if user_id not in data["levels"][guild_id]["users"]:
-        data["levels"][guild_id]["users"][user_id] = {
-            "xp": 0,
-            "level": 0,
-            "messages": 0,
-            "last_message_time": 0
-        }
-        dump()
-    
-    return data["levels"][guild_id]["users"][user_id]
+    return _levels.get_user(guild_id, user_id) or new_user_record()
 
 def add_xp_to_user(guild_id: str, user_id: str, xp_amount: int):
     """Fügt XP einem User hinzu und gibt True zurück wenn Level-Up"""
     if not is_level_system_enabled(guild_id):
         return False
     
-    user_data = get_user_level_data(guild_id, user_id)
-    if not user_data:
-        return False
+    level_ups = add_xp_bulk(guild_id, {user_id: (xp_amount, 1, int(datetime.now().timestamp()))})
     
-    old_level = user_data["level"]
-    user_data["xp"] += xp_amount
-    user_data["messages"] += 1
-    user_data["last_message_time"] = int(datetime.now().timestamp())
+    # True wenn Level-Up
+    return bool(level_ups)
+
+def add_xp_bulk(guild_id: str, grants: dict, timestamp: int = None) -> list:
+    """Schreibt gesammelte XP mehrerer User auf einmal gut
     
-    # Level berechnen: Level = sqrt(XP/100)
-    new_level = int((user_data["xp"] / 100) ** 0.5)
-    user_data["level"] = new_level
+    grants: {user_id: (xp, nachrichten, last_message_time)}
+    timestamp: Zeitpunkt für die Tages-Buckets, wenn die XP nicht aus
+    Nachrichten stammen (z.B. Sprachzeit mit nachrichten = 0 und
+    last_message_time = 0, damit der Text-Cooldown unberührt bleibt)
+    Gibt die Level-Ups als Liste von (user_id, altes_level, neuer_datensatz) zurück.
+    """
+    if not is_level_system_enabled(guild_id):
+        return []
     
-    dump()
+    curve = get_xp_curve(guild_id)
+    current = _levels.get_users(guild_id, list(grants))
+    old_records = {}
+    records = {}
+    level_ups = []
+    activity = []
+    for user_id, (xp_amount, messages, last_message_time) in grants.items():
+        user_data = current.get(user_id) or new_user_record()
+        new_xp = user_data["xp"] + xp_amount
+        
+        # Kompletter neuer Datensatz -> Journal-Replay ist idempotent
+        record = {
+            "xp": new_xp,
+            "level": curve.level_for(new_xp),
+            "messages": user_data["messages"] + messages,
+            "last_message_time": max(last_message_time, user_data["last_message_time"])
+        }
+        old_records[user_id] = user_data
+        records[user_id] = record
+        
+        if record["level"] > user_data["level"]:
+            level_ups.append((user_id, user_data["level"], record))
+        if xp_amount:
+            day = int(timestamp if timestamp is not None else last_message_time) // 86400
+            activity.append((user_id, day, xp_amount))
     
-    # True wenn Level-Up
-    return new_level > old_level
+    # Alle User des Batches als eine Änderung (SQLite: eine Transaktion)
+    if records:
+        _levels.set_users(guild_id, records)
+        for user_id, record in records.items():
+            _notify_level_listeners(guild_id, user_id, old_records[user_id], record)
+    
+    # Tages-Buckets für Wochen-/Monats-Ranglisten, ein Eintrag pro Batch
+    if activity:
+        _levels.add_activity(guild_id, activity)
+    
+    return level_ups
+
+async def archive_inactive_users(guild_id: str) -> int:
+    """Verschiebt User ohne Aktivität seit COLD_AFTER_DAYS Tagen ins Archiv
+    
+    Das Archiv wird im I/O-Thread geschrieben, erst danach verschwinden die
+    User aus den aktiven Daten. Rang, Ranglisten und get_user_level_data()
+    zählen archivierte User weiter mit. Gibt die Anzahl der archivierten
+    User zurück (0 beim SQLite-Backend, dort liegen die Daten ohnehin auf
+    der Platte).
+    """
+    if not COLD_AFTER_DAYS or _levels.get_guild(guild_id) is None:
+        return 0
+    before = int(datetime.now().timestamp()) - COLD_AFTER_DAYS * 86400
+    plan = _levels.prepare_archive(guild_id, before)
+    if plan is None:
+        return 0
+    await asyncio.wrap_future(submit_io(_levels.write_archive, plan))
+    return _levels.commit_archive(plan)
+
+def export_level_users(guild_id: str, file, fmt: str = "jsonl"):
+    """Schreibt alle User eines Servers zeilenweise als JSONL oder CSV in file
+
+    Generator: liefert nach jedem Block von IMPORT_BATCH Zeilen die Anzahl
+    der bisher geschriebenen Zeilen, damit der Aufrufer zwischendurch den
+    Event-Loop freigeben kann. Es liegt nie mehr als ein Block im Speicher.
+    """
+    rows = iter_level_users(guild_id)
+    total = 0
+    while True:
+        batch = list(islice(rows, IMPORT_BATCH))
+        if not batch:
+            break
+        total += write_level_rows(batch, file, fmt, header=not total)
+        yield total
+    if not total:
+        write_level_rows((), file, fmt)
+        yield total
+
+def import_level_users(guild_id: str, file, fmt: str = "jsonl", mode: str = "replace", batch_size: int = IMPORT_BATCH):
+    """Liest User aus einer Export-Datei und speichert sie blockweise
+
+    mode "replace" überschreibt vorhandene Datensätze, "add" addiert XP und
+    Nachrichten auf die vorhandenen Werte. Ungültige Zeilen werden
+    übersprungen (die ersten IMPORT_MAX_ERRORS Meldungen werden gemerkt),
+    Level werden mit der Kurve des Servers neu berechnet. Jeder Block ist
+    eine einzige Änderung.
+
+    Generator: liefert nach jedem Block den Zwischenstand
+    {"rows", "imported", "skipped", "errors"}, der letzte ist das Ergebnis.
+    """
+    if not is_level_system_enabled(guild_id):
+        raise ValueError("Level-System ist nicht aktiv")
+    if mode not in ("replace", "add"):
+        raise ValueError(f"Unbekannter Import-Modus: {mode}")
+
+    curve = get_xp_curve(guild_id)
+    state = {"rows": 0, "imported": 0, "skipped": 0, "errors": []}
+
+    def store(batch: dict):
+        if mode == "add":
+            for user_id, existing in _levels.get_users(guild_id, list(batch)).items():
+                record = batch[user_id]
+                record["xp"] += existing["xp"]
+                record["messages"] += existing["messages"]
+                record["last_message_time"] = max(record["last_message_time"], existing["last_message_time"])
+        for record in batch.values():
+            record["level"] = curve.level_for(record["xp"])
+        _levels.set_users(guild_id, batch)
+        state["imported"] += len(batch)
+
+    batch = {}
+    try:
+        for line_no, user_id, record in read_level_rows(file, fmt):
+            state["rows"] += 1
+            if user_id is None:
+                state["skipped"] += 1
+                if len(state["errors"]) < IMPORT_MAX_ERRORS:
+                    state["errors"].append(f"Zeile {line_no}: {record}")
+                continue
+            previous = batch.get(user_id)
+            if previous is not None and mode == "add":
+                # Mehrfache Zeilen eines Users werden wie getrennte Importe addiert
+                record["xp"] += previous["xp"]
+                record["messages"] += previous["messages"]
+                record["last_message_time"] = max(record["last_message_time"], previous["last_message_time"])
+            batch[user_id] = record
+            if len(batch) >= batch_size:
+                store(batch)
+                batch = {}
+                yield state
+        if batch:
+            store(batch)
+        yield state
+    finally:
+        if state["imported"]:
+            # Ein Server-weites Signal statt einer Meldung pro User (Caches, Rollen)
+            _notify_level_listeners(guild_id, None, None, None)
+
+def get_backfill_state(guild_id: str):
+    """Gibt den gespeicherten Stand eines History-Backfills zurück (None wenn keiner lief)"""
+    return data.get("level_backfill", {}).get(guild_id)
+
+def save_backfill_state(guild_id: str, state: dict):
+    """Speichert den Stand eines History-Backfills (Checkpoint)"""
+    if "level_backfill" not in data:
+        commit("set", path=["level_backfill"], value={})
+    commit("set", path=["level_backfill", guild_id], value=state)
 
 def get_leaderboard(guild_id: str, limit: int = 10):
     """Gibt die Top User eines Servers zurück"""
-    if guild_id not in data["levels"]:
+    if _levels.get_guild(guild_id) is None:
         return []
+    return _levels.top_users(guild_id, limit)
+
+def get_level_guilds() -> list:
+    """Gibt alle Server aus ALLOWED_GUILDS["level"] mit aktivem Level-System zurück"""
+    return [
+        str(guild_id) for guild_id in ALLOWED_GUILDS.get("level", [])
+        if is_level_system_enabled(str(guild_id))
+    ]
+
+def get_global_aggregate(guild_ids: list, limit: int = 10) -> tuple:
+    """Top User nach XP-Summe über mehrere Server
     
-    users = data["levels"][guild_id]["users"]
-    sorted_users = sorted(users.items(), key=lambda x: x[1]["xp"], reverse=True)
-    return sorted_users[:limit]
+    Gibt ([(user_id, summe), ...], gelesene Einträge) zurück. Die
+    Ranglisten der Server werden nur so tief gelesen, wie es der
+    Threshold-Algorithmus verlangt (siehe leveling.threshold_top).
+    """
+    return threshold_top({guild_id: _levels.iter_ranked(guild_id) for guild_id in guild_ids}, _levels.get_xp_many, limit)
+
+def get_activity_leaderboard(guild_id: str, days: int, limit: int = 10) -> list:
+    """Gibt die Top User der letzten days Tage als (user_id, xp) zurück (aus den Tages-Buckets)"""
+    if _levels.get_guild(guild_id) is None:
+        return []
+    today = int(datetime.now().timestamp()) // 86400
+    return _levels.top_activity(guild_id, today, days, limit)
+
+def get_user_rank(guild_id: str, user_id: str):
+    """Gibt (Platz, Anzahl User) eines Users zurück (None ohne Level-Daten)"""
+    if _levels.get_guild(guild_id) is None:
+        return None
+    return _levels.rank_of(guild_id, user_id)
+
+def get_users_around(guild_id: str, user_id: str, radius: int = 2) -> list:
+    """Gibt die User rund um einen User als (platz, user_id, user_data) zurück"""
+    if _levels.get_guild(guild_id) is None:
+        return []
+    return _levels.users_around(guild_id, user_id, radius)
 
 def can_gain_xp(guild_id: str, user_id: str) -> bool:
     """Prüft ob ein User XP bekommen kann (Cooldown)"""
-    if guild_id not in data["levels"]:
+    guild = _levels.get_guild(guild_id)
+    if guild is None:
         return False
     
-    if user_id not in data["levels"][guild_id]["users"]:
+    user_data = _levels.get_user(guild_id, user_id)
+    if user_data is None:
         return True
     
-    user_data = data["levels"][guild_id]["users"][user_id]
-    cooldown = data["levels"][guild_id]["xp_cooldown"]
+    cooldown = guild["xp_cooldown"]
     current_time = int(datetime.now().timestamp())
     
     return (current_time - user_data["last_message_time"]) >= cooldown
 
-def get_xp_for_level(level: int) -> int:
-    """Berechnet die benötigten XP für ein Level"""
-    return int((level ** 2) * 100)
+def get_xp_for_level(level: int, guild_id: str = None) -> int:
+    """Berechnet die benötigten XP für ein Level (Kurve des Servers)"""
+    return get_xp_curve(guild_id).xp_for_level(level)
 
-def get_progress_to_next_level(xp: int) -> tuple:
+def get_progress_to_next_level(xp: int, guild_id: str = None) -> tuple:
     """Gibt Fortschritt zum nächsten Level zurück (current_xp, needed_xp, percentage)"""
-    current_level = int((xp / 100) ** 0.5)
-    current_level_xp = get_xp_for_level(current_level)
-    next_level_xp = get_xp_for_level(current_level + 1)
-    
-    xp_in_current_level = xp - current_level_xp
-    xp_needed_for_next = next_level_xp - current_level_xp
-    
-    percentage = (xp_in_current_level / xp_needed_for_next) * 100 if xp_needed_for_next > 0 else 100
-    
-    return xp_in_current_level, xp_needed_for_next, percentage
+    return get_xp_curve(guild_id).progress(xp)
 
 def set_announcement_channel(guild_id: str, channel_id: str):
     """Setzt den Announcement-Channel für Level-Ups"""
-    if guild_id not in data["levels"]:
+    if _levels.get_guild(guild_id) is None:
         return False
     
-    data["levels"][guild_id]["announcement_channel"] = channel_id
-    dump()
+    _levels.set_guild_value(guild_id, "announcement_channel", channel_id)
     return True
 
 def get_announcement_channel(guild_id: str):
     """Gibt den Announcement-Channel zurück"""
-    if guild_id not in data["levels"]:
+    guild = _levels.get_guild(guild_id)
+    if guild is None:
         return None
-    return data["levels"][guild_id]["announcement_channel"]
+    return guild["announcement_channel"]
+
+def block_channels_for_xp(guild_id: str, channel_ids) -> dict:
+    """Blockiert mehrere Channels für XP-Gewinn in einem Schritt
+    
+    Gibt {channel_id: True (neu blockiert) / False (war bereits blockiert)}
+    zurück, ein leeres Dict wenn das Level-System nicht eingerichtet ist.
+    Gespeichert wird nur einmal für alle Channels.
+    """
+    guild = _levels.get_guild(guild_id)
+    if guild is None:
+        return {}
+    
+    blocked = guild["blocked_channels"]
+    outcomes = {channel_id: channel_id not in blocked for channel_id in channel_ids}
+    changed = [channel_id for channel_id, changed in outcomes.items() if changed]
+    if changed:
+        _levels.block_channels(guild_id, changed)
+    return outcomes
+
+def unblock_channels_for_xp(guild_id: str, channel_ids) -> dict:
+    """Entblockiert mehrere Channels für XP-Gewinn in einem Schritt
+    
+    Gibt {channel_id: True (entblockiert) / False (war nicht blockiert)}
+    zurück, ein leeres Dict wenn das Level-System nicht eingerichtet ist.
+    """
+    guild = _levels.get_guild(guild_id)
+    if guild is None:
+        return {}
+    
+    blocked = guild["blocked_channels"]
+    outcomes = {channel_id: channel_id in blocked for channel_id in channel_ids}
+    changed = [channel_id for channel_id, changed in outcomes.items() if changed]
+    if changed:
+        _levels.unblock_channels(guild_id, changed)
+    return outcomes
 
 def block_channel_for_xp(guild_id: str, channel_id: str) -> bool:
     """Blockiert einen Channel für XP-Gewinn"""
-    if guild_id not in data["levels"]:
-        return False
-    
-    if channel_id not in data["levels"][guild_id]["blocked_channels"]:
-        data["levels"][guild_id]["blocked_channels"].append(channel_id)
-        dump()
-        return True
-    return False
+    return block_channels_for_xp(guild_id, [channel_id]).get(channel_id, False)
 
 def unblock_channel_for_xp(guild_id: str, channel_id: str) -> bool:
     """Entblockiert einen Channel für XP-Gewinn"""
-    if guild_id not in data["levels"]:
-        return False
-    
-    if channel_id in data["levels"][guild_id]["blocked_channels"]:
-        data["levels"][guild_id]["blocked_channels"].remove(channel_id)
-        dump()
-        return True
-    return False
+    return unblock_channels_for_xp(guild_id, [channel_id]).get(channel_id, False)
+
+def get_xp_cooldown(guild_id: str) -> int:
+    """Gibt den XP-Cooldown eines Servers in Sekunden zurück"""
+    guild = _levels.get_guild(guild_id)
+    if guild is None:
+        return 0
+    return guild["xp_cooldown"]
 
 def is_channel_blocked(guild_id: str, channel_id: str) -> bool:
     """Prüft ob ein Channel für XP blockiert ist"""
-    if guild_id not in data["levels"]:
+    guild = _levels.get_guild(guild_id)
+    if guild is None:
         return False
-    return channel_id in data["levels"][guild_id]["blocked_channels"]
+    return channel_id in guild["blocked_channels"]
 
 def get_blocked_channels(guild_id: str) -> list:
     """Gibt alle blockierten Channels eines Servers zurück"""
-    if guild_id not in data["levels"]:
+    guild = _levels.get_guild(guild_id)
+    if guild is None:
         return []
-    return data["levels"][guild_id]["blocked_channels"]
-
+    return sorted(guild["blocked_channels"])
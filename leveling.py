@@ -0,0 +1,923 @@
+"""
+Datenstrukturen und Algorithmen für das Level-System
+
+Diese Datei enthält die reinen Datenstrukturen (ohne Discord-Abhängigkeit),
+auf denen das Level-System in functions.py und storage.py aufbaut.
+
+1. RankIndex
+    - Sortierte Rangliste pro Server (nach XP absteigend)
+    - Top-K, Rang eines Users und Nachbarn in logarithmischer Zeit
+    - Wird bei jeder XP-Änderung inkrementell aktualisiert
+
+2. UserTable
+    - Kompakte Spalten-Speicherung der User-Datensätze eines Servers
+    - array('q') pro Feld + Map User-ID -> Zeile statt ein Dict pro User
+
+3. XPCurve
+    - Level-Kurve pro Server (quadratisch, linear, MEE6, eigene Tabelle)
+    - Vorberechnete Schwellen, XP -> Level per Binärsuche ohne Gleitkomma
+    - Neuberechnung aller Level eines Servers in einem Durchlauf
+
+4. ActivityWindow
+    - Tägliche XP-Buckets pro aktivem User als Ringpuffer (ACTIVITY_DAYS Tage)
+    - Grundlage für Wochen- und Monats-Ranglisten ohne Nachrichten-Scan
+    - Inaktive User werden entfernt, Speicher pro User ist fest begrenzt
+
+5. Serverübergreifende Rangliste
+    - merge_top: K-Wege-Merge der Top-K aller Server über einen Heap
+    - threshold_top: Top-K der XP-Summe pro User (Threshold-Algorithmus)
+
+6. XPRules
+    - XP-Multiplikatoren pro Channel, Rolle und Zeitfenster
+    - Einmal pro Konfiguration in Nachschlagetabellen übersetzt, Kosten pro
+      Nachricht unabhängig von der Anzahl der Regeln
+
+7. RewardTable
+    - Rollen-Belohnungen ab einem Level (gestapelt oder nur die höchste)
+    - Soll-Rollen per Binärsuche, Diff gegen die aktuellen Rollen eines Members
+
+8. SpamFilter
+    - Mindestlänge und Beinahe-Duplikate vor der XP-Vergabe
+    - Ring aus SimHash-Fingerabdrücken pro User, LRU über die aktiven User
+
+9. ColdIndex / TieredRanking
+    - Rangliste archivierter (inaktiver) User in zwei sortierten Arrays
+    - Gemeinsame Sicht auf aktive und archivierte User für Rang und Top-K
+"""
+
+import heapq
+import re
+import time
+from array import array
+from collections import OrderedDict
+from bisect import bisect_left, bisect_right, insort
+from functools import partial
+from itertools import compress, islice, repeat
+from operator import lt, ne
+
+USER_FIELDS = ("xp", "level", "messages", "last_message_time")
+
+CURVE_TYPES = ("quadratic", "linear", "mee6", "table")
+DEFAULT_CURVE = {"type": "quadratic", "factor": 100}
+MAX_LEVEL = 1000  # Höchstes Level der berechneten Kurven
+ACTIVITY_DAYS = 30  # Länge des Ringpuffers (längstes Ranglisten-Fenster)
+MINUTES_PER_WEEK = 7 * 24 * 60
+SPAM_HISTORY = 8  # Fingerabdrücke pro User
+SPAM_MAX_USERS = 10000  # Max. gemerkte User (LRU)
+SPAM_MAX_CHARS = 256  # Nur der Anfang einer Nachricht wird gehasht
+
+
+class RankIndex:
+    """Order-Statistics-Struktur über (XP, User-ID) eines Servers
+
+    Die Schlüssel (-xp, user_id) liegen sortiert in Blöcken von höchstens
+    2 * LOAD Einträgen, ein Fenwick-Baum über die Blocklängen liefert Rang
+    und Position.
+    """
+
+    LOAD = 512
+
+    def __init__(self, items=()):
+        """items: Iterable von (user_id, xp)"""
+        keys = sorted((-xp, int(user_id)) for user_id, xp in items)
+        self._lists = [keys[i:i + self.LOAD] for i in range(0, len(keys), self.LOAD)]
+        self._maxes = [block[-1] for block in self._lists]
+        self._len = len(keys)
+        self._build_tree()
+
+    def __len__(self):
+        return self._len
+
+    # ====== FENWICK-BAUM ÜBER BLOCKLÄNGEN ======
+    def _build_tree(self):
+        tree = [0] + [len(block) for block in self._lists]
+        for i in range(1, len(tree)):
+            parent = i + (i & -i)
+            if parent < len(tree):
+                tree[parent] += tree[i]
+        self._tree = tree
+
+    def _tree_add(self, block_index: int, delta: int):
+        i = block_index + 1
+        while i < len(self._tree):
+            self._tree[i] += delta
+            i += i & -i
+
+    def _prefix(self, block_index: int) -> int:
+        """Anzahl Einträge in allen Blöcken vor block_index"""
+        total = 0
+        i = block_index
+        while i > 0:
+            total += self._tree[i]
+            i -= i & -i
+        return total
+
+    def _locate(self, position: int) -> tuple:
+        """Findet (Block, Offset) für eine 0-basierte Position"""
+        block = 0
+        step = 1 << (len(self._tree).bit_length())
+        while step:
+            nxt = block + step
+            if nxt < len(self._tree) and self._tree[nxt] <= position:
+                block = nxt
+                position -= self._tree[nxt]
+            step >>= 1
+        return block, position
+
+    # ====== ÄNDERUNGEN ======
+    def _insert(self, key: tuple):
+        if not self._lists:
+            self._lists.append([key])
+            self._maxes.append(key)
+            self._len = 1
+            self._build_tree()
+            return
+        block_index = bisect_left(self._maxes, key)
+        if block_index == len(self._maxes):
+            block_index -= 1
+            self._lists[block_index].append(key)
+            self._maxes[block_index] = key
+        else:
+            insort(self._lists[block_index], key)
+        self._len += 1
+        if len(self._lists[block_index]) > 2 * self.LOAD:
+            # Block teilen, Fenwick-Baum neu aufbauen (selten)
+            block = self._lists[block_index]
+            self._lists[block_index:block_index + 1] = [block[:self.LOAD], block[self.LOAD:]]
+            self._maxes[block_index:block_index + 1] = [block[self.LOAD - 1], block[-1]]
+            self._build_tree()
+        else:
+            self._tree_add(block_index, 1)
+
+    def _remove(self, key: tuple) -> bool:
+        block_index = bisect_left(self._maxes, key)
+        if block_index == len(self._maxes):
+            return False
+        block = self._lists[block_index]
+        offset = bisect_left(block, key)
+        if offset == len(block) or block[offset] != key:
+            return False
+        del block[offset]
+        self._len -= 1
+        if not block:
+            del self._lists[block_index]
+            del self._maxes[block_index]
+            self._build_tree()
+        else:
+            self._maxes[block_index] = block[-1]
+            self._tree_add(block_index, -1)
+        return True
+
+    def update(self, user_id, old_xp, new_xp):
+        """Aktualisiert einen User (old_xp None = neuer User, new_xp None = entfernen)"""
+        if old_xp is not None:
+            self._remove((-old_xp, int(user_id)))
+        if new_xp is not None:
+            self._insert((-new_xp, int(user_id)))
+
+    # ====== ABFRAGEN ======
+    def rank(self, user_id, xp) -> int:
+        """Gibt den 1-basierten Rang eines Users zurück (0 wenn nicht enthalten)"""
+        key = (-xp, int(user_id))
+        block_index = bisect_left(self._maxes, key)
+        if block_index == len(self._maxes):
+            return 0
+        block = self._lists[block_index]
+        offset = bisect_left(block, key)
+        if offset == len(block) or block[offset] != key:
+            return 0
+        return self._prefix(block_index) + offset + 1
+
+    def count_before(self, user_id, xp) -> int:
+        """Anzahl der Einträge vor (xp, user_id), egal ob der User enthalten ist"""
+        key = (-xp, int(user_id))
+        block_index = bisect_left(self._maxes, key)
+        if block_index == len(self._maxes):
+            return self._len
+        return self._prefix(block_index) + bisect_left(self._lists[block_index], key)
+
+    def slice(self, start: int, stop: int) -> list:
+        """Gibt die Einträge der Positionen [start, stop) als (user_id, xp) zurück"""
+        start = max(start, 0)
+        stop = min(stop, self._len)
+        if start >= stop:
+            return []
+        block_index, offset = self._locate(start)
+        result = []
+        remaining = stop - start
+        while remaining > 0 and block_index < len(self._lists):
+            chunk = self._lists[block_index][offset:offset + remaining]
+            result.extend((str(user_id), -neg_xp) for neg_xp, user_id in chunk)
+            remaining -= len(chunk)
+            block_index += 1
+            offset = 0
+        return result
+
+    def top(self, limit: int) -> list:
+        """Gibt die Top-K als (user_id, xp) zurück"""
+        return self.slice(0, limit)
+
+    def around(self, user_id, xp, radius: int) -> list:
+        """Gibt die Nachbarn eines Users als (rang, user_id, xp) zurück"""
+        rank = self.rank(user_id, xp)
+        if not rank:
+            return []
+        start = max(rank - 1 - radius, 0)
+        entries = self.slice(start, rank + radius)
+        return [(start + i + 1, entry_user, entry_xp) for i, (entry_user, entry_xp) in enumerate(entries)]
+
+
+class UserTable:
+    """Spaltenbasierte User-Datensätze eines Servers
+
+    Die Werte liegen in je einem array('q') pro Feld. get() gibt eine Kopie
+    als Dict zurück, geschrieben wird ausschließlich über set().
+    """
+
+    def __init__(self):
+        self._rows = {}                  # int(user_id) -> Zeile
+        self._ids = array("q")           # Zeile -> int(user_id)
+        self._columns = {field: array("q") for field in USER_FIELDS}
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __contains__(self, user_id):
+        return int(user_id) in self._rows
+
+    def get(self, user_id):
+        """Gibt den Datensatz als Dict zurück (None wenn unbekannt)"""
+        row = self._rows.get(int(user_id))
+        if row is None:
+            return None
+        return {field: column[row] for field, column in self._columns.items()}
+
+    def xp_of(self, user_id):
+        """Gibt nur die XP eines Users zurück (None wenn unbekannt)"""
+        row = self._rows.get(int(user_id))
+        if row is None:
+            return None
+        return self._columns["xp"][row]
+
+    def set(self, user_id, record: dict):
+        """Legt einen User an oder überschreibt seinen Datensatz"""
+        key = int(user_id)
+        row = self._rows.get(key)
+        if row is None:
+            self._rows[key] = len(self._ids)
+            self._ids.append(key)
+            for field, column in self._columns.items():
+                column.append(int(record[field]))
+        else:
+            for field, column in self._columns.items():
+                column[row] = int(record[field])
+
+    def remove(self, user_id) -> bool:
+        """Entfernt einen User (letzte Zeile rückt in die Lücke)"""
+        key = int(user_id)
+        row = self._rows.pop(key, None)
+        if row is None:
+            return False
+        last = len(self._ids) - 1
+        if row != last:
+            moved = self._ids[last]
+            self._ids[row] = moved
+            self._rows[moved] = row
+            for column in self._columns.values():
+                column[row] = column[last]
+        self._ids.pop()
+        for column in self._columns.values():
+            column.pop()
+        return True
+
+    def remove_many(self, user_ids) -> int:
+        """Entfernt mehrere User in einem Durchlauf (Spalten werden per compress() neu aufgebaut)"""
+        drop = {int(user_id) for user_id in user_ids}.intersection(self._rows)
+        if not drop:
+            return 0
+        keep = [user_id not in drop for user_id in self._ids]
+        self._ids = array("q", compress(self._ids, keep))
+        for field, column in self._columns.items():
+            self._columns[field] = array("q", compress(column, keep))
+        self._rows = {user_id: row for row, user_id in enumerate(self._ids)}
+        return len(drop)
+
+    def items(self):
+        """Iteriert über (user_id, record)"""
+        columns = list(self._columns.items())
+        for row, user_id in enumerate(self._ids):
+            yield str(user_id), {field: column[row] for field, column in columns}
+
+    def inactive(self, before: int) -> list:
+        """Gibt die IDs aller User mit last_message_time vor before zurück (ein Durchlauf in C)"""
+        return list(compress(self._ids, map(lt, self._columns["last_message_time"], repeat(before))))
+
+    def iter_xp(self):
+        """Iteriert über (user_id, xp) ohne Dicts zu erzeugen"""
+        return zip(self._ids, self._columns["xp"])
+
+    def column(self, field: str) -> array:
+        """Gibt eine Spalte direkt zurück (für Bulk-Berechnungen)"""
+        return self._columns[field]
+
+    def recompute_levels(self, curve: "XPCurve") -> int:
+        """Ersetzt die Level-Spalte durch die Level der Kurve (ein Durchlauf über die XP-Spalte)
+
+        Gibt die Anzahl der User zurück, deren Level sich geändert hat.
+        """
+        levels = curve.levels_for(self._columns["xp"])
+        changed = sum(map(ne, levels, self._columns["level"]))
+        self._columns["level"] = levels
+        return changed
+
+    def copy(self) -> "UserTable":
+        """Unabhängige Kopie (Array-Kopien in C, für die Serialisierung ohne Sperre)"""
+        clone = UserTable.__new__(UserTable)
+        clone._rows = self._rows.copy()
+        clone._ids = self._ids[:]
+        clone._columns = {field: column[:] for field, column in self._columns.items()}
+        return clone
+
+    def to_json(self) -> dict:
+        """Serialisiert die Tabelle spaltenweise"""
+        result = {"ids": self._ids.tolist()}
+        for field, column in self._columns.items():
+            result[field] = column.tolist()
+        return result
+
+    @classmethod
+    def from_json(cls, raw) -> "UserTable":
+        """Lädt eine Tabelle aus dem Spalten- oder dem alten Dict-Format"""
+        table = cls()
+        if "ids" in raw:
+            table._ids = array("q", raw["ids"])
+            table._rows = {user_id: row for row, user_id in enumerate(table._ids)}
+            for field in USER_FIELDS:
+                table._columns[field] = array("q", raw[field])
+        else:
+            # Altes Format: {"user_id": {"xp": ..., "level": ..., ...}}
+            for user_id, record in raw.items():
+                table.set(user_id, {field: record.get(field, 0) for field in USER_FIELDS})
+        return table
+
+
+class XPCurve:
+    """Level-Kurve eines Servers
+
+    thresholds[L] sind die Gesamt-XP, ab denen Level L erreicht ist
+    (thresholds[0] == 0, streng steigend). Über dem letzten Eintrag bleibt
+    das Level konstant.
+
+    Konfiguration (guild["xp_curve"]):
+    - {"type": "quadratic", "factor": 100}   -> factor * L² (bisheriges Verhalten)
+    - {"type": "linear", "step": 100}        -> step * L
+    - {"type": "mee6"}                       -> Summe 5l² + 50l + 100 für l < L
+    - {"type": "table", "thresholds": [...]} -> eigene Schwellen ab Level 1
+    """
+
+    def __init__(self, thresholds, config: dict = None):
+        thresholds = [int(value) for value in thresholds]
+        if not thresholds or thresholds[0] != 0:
+            raise ValueError("Die Kurve muss bei 0 XP für Level 0 beginnen")
+        if any(a >= b for a, b in zip(thresholds, thresholds[1:])):
+            raise ValueError("Die XP-Schwellen müssen streng steigend sein")
+        self.config = config
+        self.thresholds = thresholds
+        # Ohne den Eintrag für Level 0 liefert bisect_right direkt das Level
+        self.level_for = partial(bisect_right, thresholds[1:])
+
+    @classmethod
+    def from_config(cls, config: dict = None) -> "XPCurve":
+        """Erstellt eine Kurve aus der Server-Konfiguration (ValueError bei ungültigen Werten)"""
+        config = config or DEFAULT_CURVE
+        kind = config.get("type")
+        if kind == "quadratic":
+            factor = int(config.get("factor", 100))
+            if factor <= 0:
+                raise ValueError("Der Faktor muss größer als 0 sein")
+            thresholds = [factor * level * level for level in range(MAX_LEVEL + 1)]
+        elif kind == "linear":
+            step = int(config.get("step", 100))
+            if step <= 0:
+                raise ValueError("Die Schrittweite muss größer als 0 sein")
+            thresholds = [step * level for level in range(MAX_LEVEL + 1)]
+        elif kind == "mee6":
+            thresholds = [0]
+            for level in range(MAX_LEVEL):
+                thresholds.append(thresholds[-1] + 5 * level * level + 50 * level + 100)
+        elif kind == "table":
+            thresholds = [0] + [int(value) for value in config.get("thresholds", ())]
+            if len(thresholds) < 2:
+                raise ValueError("Die Tabelle braucht mindestens eine Schwelle")
+        else:
+            raise ValueError(f"Unbekannter Kurventyp: {kind}")
+        return cls(thresholds, config)
+
+    @property
+    def max_level(self) -> int:
+        return len(self.thresholds) - 1
+
+    def xp_for_level(self, level: int) -> int:
+        """Gibt die Gesamt-XP zurück, ab denen ein Level erreicht ist"""
+        return self.thresholds[min(max(level, 0), self.max_level)]
+
+    def progress(self, xp: int) -> tuple:
+        """Gibt (xp_im_level, xp_bis_zum_nächsten, prozent) zurück"""
+        level = self.level_for(xp)
+        if level >= self.max_level:
+            return xp - self.thresholds[-1], 0, 100
+        current = self.thresholds[level]
+        needed = self.thresholds[level + 1] - current
+        return xp - current, needed, (xp - current) / needed * 100
+
+    def levels_for(self, xp_values) -> array:
+        """Berechnet die Level einer ganzen XP-Spalte in einem Durchlauf"""
+        return array("q", map(self.level_for, xp_values))
+
+
+class ActivityWindow:
+    """Rollierende XP-Zähler eines Servers aus täglichen Buckets
+
+    Pro aktivem User gibt es ein array('i') mit days + 1 Einträgen: Slot
+    (tag % days) enthält die XP dieses Tages, der letzte Eintrag den
+    letzten aktiven Tag. prune() entfernt User ohne Aktivität in den
+    letzten days Tagen.
+    """
+
+    def __init__(self, days: int = ACTIVITY_DAYS):
+        self.days = days
+        self._users = {}  # int(user_id) -> array('i'): days Buckets + letzter Tag
+
+    def __len__(self):
+        return len(self._users)
+
+    def add(self, user_id, day: int, xp: int):
+        """Bucht XP auf einen Tag (Tage älter als das Fenster werden ignoriert)"""
+        key = int(user_id)
+        days = self.days
+        buckets = self._users.get(key)
+        if buckets is None:
+            buckets = array("i", bytes(4 * days))
+            buckets.append(day)
+            self._users[key] = buckets
+        last = buckets[days]
+        if day > last:
+            # Slots der Tage zwischen letzter Aktivität und heute leeren
+            for skipped in range(last + 1, min(day, last + days) + 1):
+                buckets[skipped % days] = 0
+            buckets[days] = day
+        elif day <= last - days:
+            return
+        buckets[day % days] += xp
+
+    def last_day(self, user_id):
+        """Letzter Tag mit XP im Ringpuffer (None wenn der User nicht enthalten ist)"""
+        buckets = self._users.get(int(user_id))
+        return buckets[self.days] if buckets is not None else None
+
+    def total(self, user_id, today: int, window: int) -> int:
+        """Summe der XP eines Users in den letzten window Tagen (inkl. heute)"""
+        buckets = self._users.get(int(user_id))
+        if buckets is None:
+            return 0
+        return self._sum(buckets, today, window)
+
+    def _sum(self, buckets, today: int, window: int) -> int:
+        days = self.days
+        last = buckets[days]
+        first = max(today - min(window, days) + 1, last - days + 1)
+        stop = min(last, today)
+        if first > stop:
+            return 0
+        start, end = first % days, stop % days
+        if start <= end:
+            return sum(buckets[start:end + 1])
+        return sum(buckets[start:days]) + sum(buckets[:end + 1])
+
+    def top(self, today: int, window: int, limit: int) -> list:
+        """Gibt die Top-K des Fensters als (user_id, xp) zurück"""
+        totals = (
+            (self._sum(buckets, today, window), user_id)
+            for user_id, buckets in self._users.items()
+            if buckets[self.days] > today - window
+        )
+        best = heapq.nlargest(limit, ((xp, -user_id) for xp, user_id in totals if xp > 0))
+        return [(str(-neg_id), xp) for xp, neg_id in best]
+
+    def prune(self, today: int) -> int:
+        """Entfernt User ohne Aktivität im Ringpuffer, gibt die Anzahl zurück"""
+        stale = [user_id for user_id, buckets in self._users.items() if buckets[self.days] <= today - self.days]
+        for user_id in stale:
+            del self._users[user_id]
+        return len(stale)
+
+    def copy(self) -> "ActivityWindow":
+        """Unabhängige Kopie (add() ändert die Buckets in place)"""
+        clone = ActivityWindow(self.days)
+        clone._users = {user_id: buckets[:] for user_id, buckets in self._users.items()}
+        return clone
+
+    def to_json(self) -> dict:
+        return {"days": self.days, "users": {str(user_id): buckets.tolist() for user_id, buckets in self._users.items()}}
+
+    @classmethod
+    def from_json(cls, raw) -> "ActivityWindow":
+        window = cls(raw.get("days", ACTIVITY_DAYS) if raw else ACTIVITY_DAYS)
+        if raw:
+            window._users = {int(user_id): array("i", buckets) for user_id, buckets in raw["users"].items()}
+        return window
+
+
+def _ranked_keys(guild_id, entries):
+    """Sortierschlüssel (-xp, user_id, guild_id) für merge_top"""
+    for user_id, xp in entries:
+        yield -xp, int(user_id), guild_id
+
+
+def merge_top(rankings: dict, limit: int) -> list:
+    """Verschmilzt absteigend sortierte Ranglisten mehrerer Server
+
+    rankings: {guild_id: [(user_id, xp), ...]} (je mindestens die Top-K)
+    Gibt die globalen Top-K als (guild_id, user_id, xp) zurück.
+    """
+    streams = [_ranked_keys(guild_id, entries) for guild_id, entries in rankings.items()]
+    return [
+        (guild_id, str(user_id), -neg_xp)
+        for neg_xp, user_id, guild_id in islice(heapq.merge(*streams), limit)
+    ]
+
+
+def threshold_top(streams: dict, lookup, limit: int, max_page: int = 1024) -> tuple:
+    """Top-K der XP-Summe pro User über mehrere Server (Threshold-Algorithmus)
+
+    streams: {guild_id: Iterator über (user_id, xp), absteigend nach XP}
+    lookup(guild_id, user_ids): {user_id: xp} für die bekannten User eines Servers
+
+    Die Ranglisten werden reihum seitenweise gelesen (erste Seite K
+    Einträge, danach jeweils doppelt so viele bis max_page).
+
+    Gibt ([(user_id, summe), ...], gelesene Einträge) zurück.
+    """
+    streams = {guild_id: iter(stream) for guild_id, stream in streams.items()}
+    guild_ids = list(streams)
+    frontier = dict.fromkeys(guild_ids, 0)
+    seen = set()
+    best = []  # Min-Heap (summe, -user_id) der bisher besten K
+    reads = 0
+    page = max(limit, 1)
+    while streams:
+        found = {}  # user_id -> {guild_id: xp} aus den gelesenen Seiten
+        for guild_id in list(streams):
+            entries = list(islice(streams[guild_id], page))
+            if len(entries) < page:
+                del streams[guild_id]
+            frontier[guild_id] = entries[-1][1] if len(entries) == page else 0
+            reads += len(entries)
+            for user_id, xp in entries:
+                if user_id not in seen:
+                    found.setdefault(user_id, {})[guild_id] = xp
+        seen.update(found)
+        totals = {user_id: sum(values.values()) for user_id, values in found.items()}
+        for guild_id in guild_ids:
+            missing = [user_id for user_id, values in found.items() if guild_id not in values]
+            if missing:
+                for user_id, xp in lookup(guild_id, missing).items():
+                    totals[user_id] += xp
+        for user_id, total in totals.items():
+            item = (total, -int(user_id))
+            if len(best) < limit:
+                heapq.heappush(best, item)
+            elif item > best[0]:
+                heapq.heapreplace(best, item)
+        # Strikt größer: bei Gleichstand könnte ein ungelesener User mit kleinerer ID vorne liegen
+        if len(best) >= limit and best[0][0] > sum(frontier.values()):
+            break
+        page = min(page * 2, max_page)
+    ranking = sorted(best, reverse=True)
+    return [(str(-neg_id), total) for total, neg_id in ranking], reads
+
+
+def _parse_minute(value: str) -> int:
+    """Wandelt "HH:MM" in die Minute des Tages um"""
+    hours, minutes = (int(part) for part in value.split(":"))
+    if not (0 <= hours <= 24 and 0 <= minutes < 60) or hours * 60 + minutes > 1440:
+        raise ValueError(f"Ungültige Uhrzeit: {value}")
+    return hours * 60 + minutes
+
+
+def _parse_multiplier(value) -> float:
+    multiplier = float(value)
+    if not 0 < multiplier <= 100:
+        raise ValueError(f"Ungültiger Multiplikator: {value} (erlaubt: größer 0 bis 100)")
+    return multiplier
+
+
+class XPRules:
+    """Kompilierte XP-Multiplikatoren eines Servers
+
+    multiplier() multipliziert die Faktoren für Channel, Rollen und
+    Zeitfenster. Bei mehreren passenden Rollen oder überlappenden Fenstern
+    zählt jeweils der höchste Faktor.
+
+    Konfiguration:
+    {"channels": {"<id>": 2.0}, "roles": {"<id>": 1.5},
+     "windows": [{"days": [5, 6], "start": "18:00", "end": "23:00", "multiplier": 2.0}]}
+    days: 0 = Montag ... 6 = Sonntag, Uhrzeiten in lokaler Zeit des Bots.
+    Liegt end vor start, reicht das Fenster über Mitternacht.
+    """
+
+    def __init__(self, config: dict = None):
+        config = config or {}
+        self.config = config
+        self.channels = {int(channel_id): _parse_multiplier(value) for channel_id, value in config.get("channels", {}).items()}
+        self.roles = {int(role_id): _parse_multiplier(value) for role_id, value in config.get("roles", {}).items()}
+        self.role_ids = frozenset(self.roles)
+        self.week = None
+        windows = config.get("windows", [])
+        if windows:
+            week = array("f", bytes(4 * MINUTES_PER_WEEK))  # 0 = kein Fenster
+            for window in windows:
+                multiplier = _parse_multiplier(window["multiplier"])
+                start = _parse_minute(window["start"])
+                length = (_parse_minute(window["end"]) - start) % 1440 or 1440
+                for day in window.get("days", range(7)):
+                    if not 0 <= int(day) <= 6:
+                        raise ValueError(f"Ungültiger Wochentag: {day}")
+                    first = int(day) * 1440 + start
+                    for minute in range(first, first + length):
+                        index = minute % MINUTES_PER_WEEK
+                        week[index] = max(week[index], multiplier)
+            self.week = array("f", (value or 1.0 for value in week))
+
+    def __bool__(self):
+        return bool(self.channels or self.roles or self.week is not None)
+
+    def multiplier(self, channel_id: int, role_ids, timestamp: float) -> float:
+        """Gibt den Gesamt-Multiplikator für eine Nachricht zurück"""
+        factor = self.channels.get(channel_id, 1.0)
+        if self.role_ids:
+            matched = self.role_ids.intersection(role_ids)
+            if matched:
+                factor *= max(self.roles[role_id] for role_id in matched)
+        if self.week is not None:
+            local = time.localtime(timestamp)
+            factor *= self.week[local.tm_wday * 1440 + local.tm_hour * 60 + local.tm_min]
+        return factor
+
+
+class RewardTable:
+    """Level-Belohnungen eines Servers
+
+    rewards: {"<level>": "<role_id>"} aus guild["level_rewards"]. Mit stack
+    behält ein Member alle Rollen bis zu seinem Level, sonst nur die
+    höchste erreichte. Verwaltet werden ausschließlich die Rollen aus der
+    Tabelle, alle anderen Rollen eines Members bleiben unberührt.
+    """
+
+    def __init__(self, rewards: dict = None, stack: bool = True):
+        items = sorted((int(level), int(role_id)) for level, role_id in (rewards or {}).items())
+        self.levels = [level for level, _ in items]
+        self.roles = [role_id for _, role_id in items]
+        self.managed = frozenset(self.roles)
+        self.stack = stack
+
+    def __bool__(self):
+        return bool(self.levels)
+
+    def roles_for(self, level: int) -> set:
+        """Gibt die Soll-Rollen für ein Level zurück"""
+        index = bisect_right(self.levels, level)
+        if self.stack:
+            return set(self.roles[:index])
+        return {self.roles[index - 1]} if index else set()
+
+    def diff(self, level: int, role_ids) -> tuple:
+        """Gibt (hinzufügen, entfernen) als Sets von Rollen-IDs zurück"""
+        wanted = self.roles_for(level)
+        current = self.managed.intersection(role_ids)
+        return wanted - current, current - wanted
+
+
+_SPACES = re.compile(r"\s+")
+_REPEATS = re.compile(r"(.)\1+")
+_BIT_TABLES = [bytes((value >> bit) & 1 for value in range(256)) for bit in range(8)]  # Byte -> 1 wenn Bit gesetzt
+
+
+def normalize_content(content: str, max_chars: int = SPAM_MAX_CHARS) -> str:
+    """Kleinbuchstaben, ohne Leerzeichen, Zeichen-Wiederholungen zusammengefasst ("Hiiii  !!" -> "hi!")"""
+    return _REPEATS.sub(r"\1", _SPACES.sub("", content[:max_chars].lower()))
+
+
+def simhash(text: str) -> int:
+    """64-Bit-SimHash über die Zeichen-Trigramme eines Textes
+
+    Ähnliche Texte unterscheiden sich nur in wenigen Bits. Basiert auf
+    hash() und ist damit nur innerhalb eines Prozesses vergleichbar.
+    """
+    hashes = set(map(hash, zip(text, text[1:], text[2:]))) or {hash(text)}
+    raw = array("q", hashes).tobytes()
+    half = len(hashes) / 2
+    fingerprint = 0
+    for offset in range(8):
+        column = raw[offset::8]  # Byte offset aller Hashes
+        for bit, table in enumerate(_BIT_TABLES):
+            if column.translate(table).count(1) > half:
+                fingerprint |= 1 << (offset * 8 + bit)
+    return fingerprint
+
+
+class SpamFilter:
+    """Erkennt zu kurze Nachrichten und Beinahe-Duplikate pro User
+
+    Eine Nachricht gilt als Duplikat, wenn ihr SimHash höchstens distance
+    Bits von einer der letzten history Nachrichten abweicht. Ab max_users
+    wird der am längsten inaktive User vergessen.
+    """
+
+    def __init__(self, history: int = SPAM_HISTORY, max_users: int = SPAM_MAX_USERS, max_chars: int = SPAM_MAX_CHARS):
+        self.history = history
+        self.max_users = max_users
+        self.max_chars = max_chars
+        self._users = OrderedDict()  # (guild_id, user_id) -> array('Q'): Ring + Anzahl
+        self.stats = {"checked": 0, "short": 0, "duplicate": 0, "evicted": 0}
+
+    def __len__(self):
+        return len(self._users)
+
+    def check(self, guild_id, user_id, content: str, min_length: int, distance: int):
+        """Prüft eine Nachricht und merkt sich ihren Fingerabdruck
+
+        Gibt None (XP erlaubt), "short" oder "duplicate" zurück.
+        """
+        self.stats["checked"] += 1
+        text = normalize_content(content, self.max_chars)
+        if len(text) < min_length:
+            self.stats["short"] += 1
+            return "short"
+
+        fingerprint = simhash(text)
+        key = (int(guild_id), int(user_id))
+        history = self.history
+        ring = self._users.get(key)
+        if ring is None:
+            ring = array("Q", bytes(8 * (history + 1)))
+            self._users[key] = ring
+            if len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+                self.stats["evicted"] += 1
+        else:
+            self._users.move_to_end(key)
+
+        count = ring[history]
+        duplicate = any(
+            bin(fingerprint ^ ring[slot]).count("1") <= distance
+            for slot in range(min(count, history))
+        )
+        ring[count % history] = fingerprint
+        ring[history] = count + 1
+        if duplicate:
+            self.stats["duplicate"] += 1
+            return "duplicate"
+        return None
+
+
+
+class ColdIndex:
+    """Rangliste archivierter User
+
+    Hält ID und XP jedes archivierten Users, sortiert nach Rang und nach
+    User-ID.
+    """
+
+    def __init__(self, items=()):
+        """items: Iterable von (user_id, xp)"""
+        self._build([(int(user_id), xp) for user_id, xp in items])
+
+    def _build(self, entries: list):
+        entries.sort()
+        self._ids = array("q", [user_id for user_id, _ in entries])
+        self._xp = array("q", [xp for _, xp in entries])
+        ranked = sorted((-xp, user_id) for user_id, xp in entries)
+        self._rank_xp = array("q", [neg_xp for neg_xp, _ in ranked])
+        self._rank_ids = array("q", [user_id for _, user_id in ranked])
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __contains__(self, user_id):
+        return self.xp_of(user_id) is not None
+
+    def xp_of(self, user_id):
+        """Gibt die XP eines archivierten Users zurück (None wenn nicht enthalten)"""
+        key = int(user_id)
+        index = bisect_left(self._ids, key)
+        if index < len(self._ids) and self._ids[index] == key:
+            return self._xp[index]
+        return None
+
+    def items(self):
+        """Iteriert über (user_id, xp) als int, sortiert nach User-ID"""
+        return zip(self._ids, self._xp)
+
+    def copy(self) -> "ColdIndex":
+        """Unabhängige Kopie (Array-Kopien in C, für den I/O-Thread)"""
+        clone = ColdIndex.__new__(ColdIndex)
+        clone._ids, clone._xp = self._ids[:], self._xp[:]
+        clone._rank_xp, clone._rank_ids = self._rank_xp[:], self._rank_ids[:]
+        return clone
+
+    def add_many(self, items):
+        """Nimmt User auf (einmaliger Neuaufbau der Arrays)"""
+        entries = list(self.items())
+        entries.extend((int(user_id), xp) for user_id, xp in items)
+        self._build(entries)
+
+    def remove(self, user_id):
+        """Entfernt einen User, gibt seine XP zurück (None wenn nicht enthalten)"""
+        key = int(user_id)
+        index = bisect_left(self._ids, key)
+        if index == len(self._ids) or self._ids[index] != key:
+            return None
+        xp = self._xp[index]
+        del self._ids[index]
+        del self._xp[index]
+        position = self.count_before(key, xp)
+        del self._rank_xp[position]
+        del self._rank_ids[position]
+        return xp
+
+    def count_before(self, user_id, xp) -> int:
+        """Anzahl der Einträge vor (xp, user_id)"""
+        low = bisect_left(self._rank_xp, -xp)
+        high = bisect_right(self._rank_xp, -xp, low)
+        return bisect_left(self._rank_ids, int(user_id), low, high)
+
+    def slice(self, start: int, stop: int) -> list:
+        """Gibt die Einträge der Positionen [start, stop) als (user_id, xp) zurück"""
+        start = max(start, 0)
+        return [(str(user_id), -neg_xp) for neg_xp, user_id in zip(self._rank_xp[start:stop], self._rank_ids[start:stop])]
+
+    def to_json(self) -> dict:
+        return {"ids": self._ids.tolist(), "xp": self._xp.tolist()}
+
+    @classmethod
+    def from_json(cls, raw, exclude=()) -> "ColdIndex":
+        """Lädt den Index, User aus exclude (wieder aktiv) werden übersprungen"""
+        return cls((user_id, xp) for user_id, xp in zip(raw["ids"], raw["xp"]) if user_id not in exclude)
+
+
+def _ranking_key(entry: tuple) -> tuple:
+    user_id, xp = entry
+    return -xp, int(user_id)
+
+
+class TieredRanking:
+    """Gemeinsame Rangliste aus aktiven (RankIndex) und archivierten User (ColdIndex)
+
+    Jeder User liegt in genau einer der beiden Strukturen.
+    """
+
+    def __init__(self, hot: RankIndex, cold: ColdIndex):
+        self.hot = hot
+        self.cold = cold
+
+    def __len__(self):
+        return len(self.hot) + len(self.cold)
+
+    def rank(self, user_id, xp) -> int:
+        """Gibt den 1-basierten Rang eines Users zurück (0 wenn nicht enthalten)"""
+        if not self.hot.rank(user_id, xp) and self.cold.xp_of(user_id) != xp:
+            return 0
+        return self.hot.count_before(user_id, xp) + self.cold.count_before(user_id, xp) + 1
+
+    def slice(self, start: int, stop: int) -> list:
+        """Gibt die Einträge der Positionen [start, stop) als (user_id, xp) zurück"""
+        hot, cold = self.hot, self.cold
+        start = max(start, 0)
+        stop = min(stop, len(self))
+        if start >= stop:
+            return []
+        # Kleinstes i (Einträge aus hot), bei dem hot[i] nicht mehr vor cold[start - i - 1] liegt
+        low, high = max(0, start - len(cold)), min(start, len(hot))
+        while low < high:
+            middle = (low + high) // 2
+            if _ranking_key(hot.slice(middle, middle + 1)[0]) < _ranking_key(cold.slice(start - middle - 1, start - middle)[0]):
+                low = middle + 1
+            else:
+                high = middle
+        count = stop - start
+        merged = heapq.merge(hot.slice(low, low + count), cold.slice(start - low, start - low + count), key=_ranking_key)
+        return list(islice(merged, count))
+
+    def top(self, limit: int) -> list:
+        """Gibt die Top-K als (user_id, xp) zurück"""
+        return self.slice(0, limit)
+
+    def around(self, user_id, xp, radius: int) -> list:
+        """Gibt die Nachbarn eines Users als (rang, user_id, xp) zurück"""
+        rank = self.rank(user_id, xp)
+        if not rank:
+            return []
+        start = max(rank - 1 - radius, 0)
+        entries = self.slice(start, rank + radius)
+        return [(start + i + 1, entry_user, entry_xp) for i, (entry_user, entry_xp) in enumerate(entries)]
@@ -163,6 +163,9 @@ def main() -> NoReturn:
     except Exception as e:
         logger.critical(f"Bot konnte nicht gestartet werden: {str(e)}", exc_info=True)
         sys.exit(1)
+    finally:
+        # Ausstehende Write-Behind Änderungen sichern
+        shutdown_persistence()
 
 if __name__ == "__main__":
     main()
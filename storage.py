@@ -0,0 +1,1426 @@
+"""
+Speicher-Backends für Level-, Ticket- und Listen-Daten
+
+Die Funktionen in functions.py arbeiten nicht mehr direkt auf dem globalen
+data-Dict, sondern über eine kleine Speicher-Schnittstelle. Dadurch können
+Level, Tickets und die Listen (Einkaufsliste, Todo-Liste) wahlweise in
+data.json (Standard) oder in einer SQLite-Datenbank liegen.
+
+1. JSON-Backend
+    - Level-Daten als eine Datei pro Server (levels/<guild_id>.json)
+    - Lazy Loading und LRU-Verdrängung ungenutzter Server
+    - User-Datensätze spaltenweise als UserTable (altes Dict-Format wird gelesen)
+    - Tägliche XP-Buckets (Wochen-/Monats-Rangliste) als ActivityWindow in der Partition
+    - Inaktive User liegen gzip-komprimiert im Archiv (levels/<guild_id>.cold/)
+    - Tickets und Listen liegen weiterhin in data.json
+    - Änderungen laufen über commit() (Write-Behind / Journal)
+
+2. SQLite-Backend
+    - Tabellen levels (Index auf XP), tickets (Index auf Owner) und list_items
+    - Jede Änderung ist ein einzelnes UPSERT statt eines Datei-Rewrites
+    - Tägliche XP pro User in der Tabelle activity (alte Tage werden gelöscht)
+    - Nur die Server-Konfiguration liegt zusätzlich im Speicher
+
+3. Migration
+    - migrate_json_to_sqlite() überträgt Level, Tickets und Listen aus data.json
+    - Aufruf: python storage.py migrate [data.json] [data.sqlite3]
+
+4. Export / Import
+    - User eines Servers zeilenweise als JSONL oder CSV (write_level_rows, read_level_rows)
+    - Aufruf: python storage.py export|import <guild_id> <datei> (siehe unten)
+
+Auswahl über SYSTEM_CONFIG["STORAGE_BACKEND"] ("json" oder "sqlite").
+"""
+
+import csv
+import gzip
+import json
+import marshal
+import os
+import sqlite3
+import sys
+import time
+from abc import ABC, abstractmethod
+from collections import Counter, OrderedDict
+from typing import Iterator, Optional
+
+from leveling import RankIndex, UserTable, XPCurve, ActivityWindow, ColdIndex, TieredRanking, ACTIVITY_DAYS, DEFAULT_CURVE, USER_FIELDS
+
+COLD_CHUNKS = 64        # Archiv-Dateien pro Server (User verteilt nach Snowflake-Zeitstempel)
+COLD_CACHE_CHUNKS = 8   # Entpackte Archiv-Dateien im Speicher (LRU über alle Server)
+
+
+def _load_guild_config(guild: dict) -> dict:
+    """blocked_channels liegt im Speicher als Set (Prüfung in O(1)), in Dateien als Liste"""
+    guild["blocked_channels"] = set(guild.get("blocked_channels", ()))
+    return guild
+
+
+def _dump_guild_config(guild: dict) -> dict:
+    """Gegenstück zu _load_guild_config für die Serialisierung"""
+    return {**guild, "blocked_channels": sorted(guild["blocked_channels"])}
+
+
+def _guild_value(key: str, value):
+    """Wandelt einen einzelnen Konfigurationswert in die Speicherform um"""
+    return set(value) if key == "blocked_channels" else value
+
+
+def new_user_record() -> dict:
+    """Gibt einen leeren Level-Datensatz zurück"""
+    return {
+        "xp": 0,
+        "level": 0,
+        "messages": 0,
+        "last_message_time": 0
+    }
+
+
+# ====== SCHNITTSTELLEN ======
+class LevelStore(ABC):
+    """Schnittstelle für die Level-Daten aller Server"""
+
+    @abstractmethod
+    def get_guild(self, guild_id: str) -> Optional[dict]:
+        """Gibt die Server-Konfiguration zurück (None wenn nicht eingerichtet)"""
+
+    @abstractmethod
+    def create_guild(self, guild_id: str, config: dict):
+        """Legt einen Server mit Konfiguration an"""
+
+    @abstractmethod
+    def set_guild_value(self, guild_id: str, key: str, value):
+        """Ändert einen einzelnen Konfigurationswert"""
+
+    @abstractmethod
+    def block_channels(self, guild_id: str, channel_ids: list):
+        """Blockiert mehrere Channels für XP (eine Änderung)"""
+
+    @abstractmethod
+    def unblock_channels(self, guild_id: str, channel_ids: list):
+        """Entblockiert mehrere Channels für XP (eine Änderung)"""
+
+    @abstractmethod
+    def set_curve(self, guild_id: str, curve: dict):
+        """Setzt die Level-Kurve und berechnet alle Level des Servers neu (eine Änderung)"""
+
+    @abstractmethod
+    def get_user(self, guild_id: str, user_id: str) -> Optional[dict]:
+        """Gibt den Datensatz eines Users zurück (None wenn unbekannt)"""
+
+    @abstractmethod
+    def set_user(self, guild_id: str, user_id: str, record: dict):
+        """Speichert den kompletten Datensatz eines Users"""
+
+    @abstractmethod
+    def get_users(self, guild_id: str, user_ids: list) -> dict:
+        """Gibt {user_id: record} für alle bekannten User aus user_ids zurück"""
+
+    @abstractmethod
+    def set_users(self, guild_id: str, records: dict):
+        """Speichert mehrere komplette Datensätze {user_id: record} (eine Änderung)"""
+
+    @abstractmethod
+    def top_users(self, guild_id: str, limit: int) -> list:
+        """Gibt die Top-User als Liste von (user_id, record) zurück"""
+
+    @abstractmethod
+    def get_xp_many(self, guild_id: str, user_ids: list) -> dict:
+        """Gibt {user_id: xp} für alle bekannten User aus user_ids zurück"""
+
+    @abstractmethod
+    def iter_ranked(self, guild_id: str) -> Iterator[tuple]:
+        """Iteriert lazy über (user_id, xp) absteigend nach XP (seitenweise gelesen)"""
+
+    @abstractmethod
+    def add_activity(self, guild_id: str, entries: list):
+        """Bucht XP auf Tage, entries: Liste von (user_id, tag, xp) (eine Änderung)"""
+
+    @abstractmethod
+    def top_activity(self, guild_id: str, today: int, window: int, limit: int) -> list:
+        """Gibt die Top-User der letzten window Tage als (user_id, xp) zurück"""
+
+    @abstractmethod
+    def iter_users(self, guild_id: str) -> Iterator[tuple]:
+        """Iteriert über alle (user_id, record) eines Servers"""
+
+    @abstractmethod
+    def rank_of(self, guild_id: str, user_id: str) -> Optional[tuple]:
+        """Gibt (Platz, Anzahl User) zurück (None wenn der User keine Daten hat)"""
+
+    @abstractmethod
+    def users_around(self, guild_id: str, user_id: str, radius: int) -> list:
+        """Gibt die Nachbarn eines Users als (platz, user_id, record) zurück"""
+
+    def prepare_archive(self, guild_id: str, before: int):
+        """Sammelt User, die seit before (Zeitstempel) inaktiv sind, für das Archiv
+
+        Gibt None zurück, wenn nichts archiviert wird (Standard: Backends
+        ohne Archiv, deren Daten ohnehin nicht komplett im Speicher liegen).
+        """
+        return None
+
+    def write_archive(self, plan):
+        """Schreibt die gesammelten User ins Archiv (im I/O-Thread)"""
+        pass
+
+    def commit_archive(self, plan) -> int:
+        """Entfernt die archivierten User aus den aktiven Daten (eine Änderung)"""
+        return 0
+
+    def apply(self, record: dict):
+        """Wendet eine Level-Änderung aus dem Journal an"""
+        op = record["op"]
+        if op == "guild_create":
+            self.create_guild(record["guild"], record["config"])
+        elif op == "guild_set":
+            self.set_guild_value(record["guild"], record["key"], record["value"])
+        elif op == "user":
+            self.set_user(record["guild"], record["user"], record["data"])
+        elif op == "user_many":
+            self.set_users(record["guild"], record["users"])
+        elif op == "block":
+            self.block_channels(record["guild"], [record["channel"]])
+        elif op == "unblock":
+            self.unblock_channels(record["guild"], [record["channel"]])
+        elif op == "block_many":
+            self.block_channels(record["guild"], record["channels"])
+        elif op == "unblock_many":
+            self.unblock_channels(record["guild"], record["channels"])
+        elif op == "curve_set":
+            self.set_curve(record["guild"], record["curve"])
+        elif op == "activity":
+            self.add_activity(record["guild"], record["entries"])
+
+    def collect_dirty(self) -> list:
+        """Gibt geänderte Partitionen als (guild_id, Pfad, Inhalt) zurück"""
+        return []
+
+    def finish_write(self, guild_ids, success: bool):
+        """Wird nach dem Schreiben der Partitionen aufgerufen"""
+        pass
+
+    def stats(self) -> dict:
+        """Gibt Backend-Statistiken zurück"""
+        return {}
+
+    def close(self):
+        """Schließt offene Ressourcen"""
+        pass
+
+
+class TicketStore(ABC):
+    """Schnittstelle für offene Tickets"""
+
+    @abstractmethod
+    def get(self, channel_id) -> Optional[dict]:
+        """Gibt ein Ticket zurück (None wenn kein Ticket)"""
+
+    @abstractmethod
+    def create(self, ticket: dict):
+        """Speichert ein neues Ticket"""
+
+    @abstractmethod
+    def kill(self, channel_id):
+        """Entfernt ein Ticket"""
+
+    @abstractmethod
+    def set_field(self, channel_id, key: str, value):
+        """Ändert ein einzelnes Feld eines Tickets"""
+
+    @abstractmethod
+    def count_by_owner(self, owner_id) -> int:
+        """Zählt die offenen Tickets eines Users"""
+
+    def apply(self, record: dict):
+        """Wendet eine Ticket-Änderung aus dem Journal an"""
+        op = record["op"]
+        if op == "ticket_create":
+            self.create(record["ticket"])
+        elif op == "ticket_kill":
+            self.kill(record["id"])
+        elif op == "ticket_set":
+            self.set_field(record["id"], record["key"], record["value"])
+
+    def close(self):
+        """Schließt offene Ressourcen"""
+        pass
+
+
+class ListStore(ABC):
+    """Schnittstelle für die Listen ("shopping" und "todo")"""
+
+    @abstractmethod
+    def items(self, list_name: str) -> list:
+        """Gibt die Einträge einer Liste als [{"author", "task"}] zurück"""
+
+    @abstractmethod
+    def push(self, list_name: str, item: dict):
+        """Hängt einen Eintrag an eine Liste an"""
+
+    @abstractmethod
+    def pop(self, list_name: str, index: int):
+        """Entfernt den Eintrag an Position index"""
+
+    @abstractmethod
+    def get_message_id(self, list_name: str) -> int:
+        """Gibt die ID der zuletzt gesendeten Listen-Nachricht zurück (0 wenn keine)"""
+
+    @abstractmethod
+    def set_message_id(self, list_name: str, message_id: int):
+        """Speichert die ID der zuletzt gesendeten Listen-Nachricht"""
+
+    def apply(self, record: dict):
+        """Wendet eine Listen-Änderung aus dem Journal an"""
+        op = record["op"]
+        if op == "list_push":
+            self.push(record["list"], record["item"])
+        elif op == "list_pop":
+            self.pop(record["list"], record["index"])
+
+    def close(self):
+        """Schließt offene Ressourcen"""
+        pass
+
+
+# ====== JSON-BACKEND ======
+class ShardedLevelStore(LevelStore):
+    """Level-Daten als eine JSON-Datei pro Server (levels/<guild_id>.json)
+
+    Server werden beim ersten Zugriff geladen und ab max_guilds nach LRU
+    wieder entfernt. Änderungen laufen über commit() und landen über apply()
+    in der Partition; get_user() gibt immer eine Kopie zurück.
+
+    Inaktive User wandern über prepare_archive(), write_archive() und
+    commit_archive() nach levels/<guild_id>.cold/. Rang und Ranglisten
+    zählen sie weiter mit. Liegt ein User in Partition und Archiv, gilt der
+    Datensatz in der Partition.
+    """
+
+    def __init__(self, path: str, commit, lock, max_guilds: int = 50):
+        self._path = path
+        self._commit = commit
+        self._lock = lock                  # Gemeinsame Sperre mit dem Flusher
+        self._max_guilds = max_guilds
+        self._loaded = OrderedDict()       # guild_id -> Partition (LRU-Reihenfolge)
+        self._dirty = set()                # Geänderte, noch nicht geschriebene Partitionen
+        self._writing = set()              # Serialisiert, Schreibvorgang läuft noch
+        self._ranks = {}                   # guild_id -> RankIndex (lazy aufgebaut)
+        self._cold = {}                    # guild_id -> ColdIndex der archivierten User
+        self._promoted = {}                # guild_id -> User, die nur im Speicher aus dem Archiv geholt wurden
+        self._chunks = OrderedDict()       # (guild_id, Archiv-Datei) -> UserTable (LRU)
+        self._curves = {}                  # guild_id -> (Kurven-Konfiguration, XPCurve) für archivierte Level
+        os.makedirs(path, exist_ok=True)
+        # Nur die Dateinamen, die Partitionen selbst werden lazy geladen
+        self._known = {
+            name[:-5] for name in os.listdir(path)
+            if name.endswith(".json")
+        }
+        self._stats = {"loads": 0, "evictions": 0, "shard_writes": 0, "archived": 0, "thawed": 0, "chunk_loads": 0}
+
+    def _shard_path(self, guild_id):
+        return os.path.join(self._path, f"{guild_id}.json")
+
+    def _cold_path(self, guild_id):
+        return os.path.join(self._path, f"{guild_id}.cold")
+
+    def _chunk_path(self, guild_id, chunk: int):
+        return os.path.join(self._cold_path(guild_id), f"{chunk:02d}.json.gz")
+
+    @staticmethod
+    def _chunk_of(user_id) -> int:
+        """Archiv-Datei eines Users (Zeitstempel-Bits der Snowflake, gleichmäßig verteilt)"""
+        return (int(user_id) >> 22) % COLD_CHUNKS
+
+    def _guild(self, guild_id):
+        """Gibt die Partition eines Servers zurück und lädt sie bei Bedarf"""
+        guild = self._loaded.get(guild_id)
+        if guild is not None:
+            self._loaded.move_to_end(guild_id)
+            return guild
+        if guild_id not in self._known:
+            return None
+        with self._lock:
+            with open(self._shard_path(guild_id), encoding="utf-8") as file:
+                guild = json.load(file)
+            guild["users"] = UserTable.from_json(guild["users"])
+            guild["activity"] = ActivityWindow.from_json(guild.get("activity"))
+            self._cold[guild_id] = self._load_cold(guild_id, guild["users"])
+            self._loaded[guild_id] = _load_guild_config(guild)
+            self._stats["loads"] += 1
+            self._evict()
+        return guild
+
+    def _evict(self):
+        """Entfernt die am längsten ungenutzten, bereits gespeicherten Partitionen"""
+        if len(self._loaded) <= self._max_guilds:
+            return
+        # Der zuletzt angefragte Server (Ende der Reihenfolge) bleibt immer geladen
+        for guild_id in list(self._loaded)[:-1]:
+            if len(self._loaded) <= self._max_guilds:
+                break
+            if guild_id not in self._dirty and guild_id not in self._writing:
+                del self._loaded[guild_id]
+                self._ranks.pop(guild_id, None)
+                self._cold.pop(guild_id, None)
+                self._promoted.pop(guild_id, None)
+                self._curves.pop(guild_id, None)
+                self._drop_chunks(guild_id)
+                self._stats["evictions"] += 1
+
+    def adopt(self, levels: dict):
+        """Übernimmt Server aus dem alten data["levels"] (Migration beim Start)"""
+        with self._lock:
+            for guild_id, guild in levels.items():
+                self._loaded[guild_id] = _load_guild_config({
+                    **guild,
+                    "users": UserTable.from_json(guild.get("users", {})),
+                    "activity": ActivityWindow()
+                })
+                self._cold[guild_id] = ColdIndex()
+                self._known.add(guild_id)
+                self._dirty.add(guild_id)
+
+    def apply(self, record: dict):
+        """Wendet eine Level-Änderung an (live und beim Journal-Replay)"""
+        op = record["op"]
+        guild_id = record["guild"]
+        if op == "guild_create":
+            self._loaded[guild_id] = _load_guild_config({**record["config"], "users": UserTable(), "activity": ActivityWindow()})
+            self._cold[guild_id] = ColdIndex()
+            self._promoted.pop(guild_id, None)
+            self._known.add(guild_id)
+            self._ranks.pop(guild_id, None)
+        else:
+            guild = self._guild(guild_id)
+            if guild is None:
+                return
+            if op == "guild_set":
+                guild[record["key"]] = _guild_value(record["key"], record["value"])
+            elif op == "user":
+                self._set_record(guild_id, guild, record["user"], record["data"])
+            elif op == "user_many":
+                rank_index = self._ranks.get(guild_id)
+                if rank_index is not None and len(record["users"]) * 16 > len(rank_index):
+                    # Großer Import -> Neuaufbau beim nächsten Zugriff statt Einzel-Updates
+                    del self._ranks[guild_id]
+                for user_id, data in record["users"].items():
+                    self._set_record(guild_id, guild, user_id, data)
+            elif op == "block":
+                guild["blocked_channels"].add(record["channel"])
+            elif op == "unblock":
+                guild["blocked_channels"].discard(record["channel"])
+            elif op == "block_many":
+                guild["blocked_channels"].update(record["channels"])
+            elif op == "unblock_many":
+                guild["blocked_channels"].difference_update(record["channels"])
+            elif op == "curve_set":
+                # XP bleiben unverändert, der Rang-Index damit auch
+                guild["xp_curve"] = record["curve"]
+                guild["users"].recompute_levels(XPCurve.from_config(record["curve"]))
+            elif op == "activity":
+                activity = guild["activity"]
+                for user_id, day, xp in record["entries"]:
+                    activity.add(user_id, day, xp)
+            elif op == "cold_freeze":
+                self._freeze(guild_id, guild, record["users"])
+                # Tages-Buckets inaktiver User fallen sonst erst beim nächsten Wochen-Ranking heraus
+                guild["activity"].prune(record["today"])
+        self._dirty.add(guild_id)
+
+    def _set_record(self, guild_id, guild, user_id, data):
+        """Schreibt einen Datensatz in die Partition und hält Rang-Index und Archiv aktuell"""
+        previous_xp = guild["users"].xp_of(user_id)
+        if previous_xp is None and self._cold[guild_id].remove(user_id) is not None:
+            # Archivierter User ist wieder aktiv, die Kopie im Archiv gilt nicht mehr
+            self._stats["thawed"] += 1
+        self._promoted.get(guild_id, set()).discard(user_id)
+        guild["users"].set(user_id, data)
+        rank_index = self._ranks.get(guild_id)
+        if rank_index is not None:
+            rank_index.update(user_id, previous_xp, data["xp"])
+
+    def _freeze(self, guild_id, guild, entries):
+        """Entfernt archivierte User aus der Partition und nimmt sie in den ColdIndex auf"""
+        users = guild["users"]
+        moved = []
+        for user_id, xp, last_message_time in entries:
+            current = users.get(user_id)
+            # Seit dem Schreiben des Archivs wieder aktiv -> bleibt in der Partition
+            if current is None or current["xp"] != xp or current["last_message_time"] != last_message_time:
+                continue
+            moved.append((user_id, xp))
+        users.remove_many(user_id for user_id, _ in moved)
+        self._promoted.get(guild_id, set()).difference_update(user_id for user_id, _ in moved)
+        rank_index = self._ranks.get(guild_id)
+        if rank_index is not None:
+            if len(moved) * 16 > len(rank_index):
+                # Großer Anteil -> Neuaufbau beim nächsten Zugriff ist billiger als Einzel-Updates
+                del self._ranks[guild_id]
+            else:
+                for user_id, xp in moved:
+                    rank_index.update(user_id, xp, None)
+        self._cold[guild_id].add_many(moved)
+        self._drop_chunks(guild_id)
+        self._stats["archived"] += len(moved)
+
+    def _load_cold(self, guild_id, users) -> ColdIndex:
+        """Lädt den Archiv-Index (User, die wieder in der Partition liegen, zählen dort)"""
+        path = os.path.join(self._cold_path(guild_id), "index.json.gz")
+        if not os.path.isfile(path):
+            return ColdIndex()
+        with gzip.open(path, "rt", encoding="utf-8") as file:
+            return ColdIndex.from_json(json.load(file), users)
+
+    def _read_chunk(self, guild_id, chunk: int) -> UserTable:
+        """Liest eine Archiv-Datei von der Platte (ohne Cache)"""
+        path = self._chunk_path(guild_id, chunk)
+        if not os.path.isfile(path):
+            return UserTable()
+        with gzip.open(path, "rt", encoding="utf-8") as file:
+            return UserTable.from_json(json.load(file))
+
+    @staticmethod
+    def _write_gzip(path: str, obj):
+        """Schreibt JSON gzip-komprimiert über Temp-Datei + os.replace"""
+        tmp_path = f"{path}.tmp"
+        with gzip.open(tmp_path, "wt", encoding="utf-8", compresslevel=6) as file:
+            json.dump(obj, file)
+        os.replace(tmp_path, path)
+
+    def _chunk(self, guild_id, chunk: int) -> UserTable:
+        """Gibt eine Archiv-Datei aus dem LRU-Cache zurück"""
+        key = (guild_id, chunk)
+        table = self._chunks.get(key)
+        if table is not None:
+            self._chunks.move_to_end(key)
+            return table
+        table = self._read_chunk(guild_id, chunk)
+        self._chunks[key] = table
+        self._stats["chunk_loads"] += 1
+        if len(self._chunks) > COLD_CACHE_CHUNKS:
+            self._chunks.popitem(last=False)
+        return table
+
+    def _drop_chunks(self, guild_id):
+        for key in [key for key in self._chunks if key[0] == guild_id]:
+            del self._chunks[key]
+
+    def _curve(self, guild_id) -> XPCurve:
+        """Level-Kurve für archivierte Datensätze (Level werden beim Lesen neu berechnet)"""
+        config = self._guild(guild_id).get("xp_curve") or DEFAULT_CURVE
+        cached = self._curves.get(guild_id)
+        if cached is None or cached[0] is not config:
+            cached = (config, XPCurve.from_config(config))
+            self._curves[guild_id] = cached
+        return cached[1]
+
+    def _cold_record(self, guild_id, user_id):
+        """Liest einen archivierten Datensatz, ohne ihn zurückzuholen (None wenn nicht archiviert)"""
+        if user_id not in self._cold[guild_id]:
+            return None
+        record = self._chunk(guild_id, self._chunk_of(user_id)).get(user_id)
+        if record is not None:
+            # Die Kurve kann sich seit dem Archivieren geändert haben
+            record["level"] = self._curve(guild_id).level_for(record["xp"])
+        return record
+
+    def _record(self, guild_id, user_id):
+        """Datensatz aus der Partition oder dem Archiv"""
+        record = self._guild(guild_id)["users"].get(user_id)
+        return record if record is not None else self._cold_record(guild_id, user_id)
+
+    def collect_dirty(self) -> list:
+        """Kopiert alle geänderten Partitionen (nur unter der Sperre aufrufen)
+
+        Der JSON-Text entsteht erst beim Schreiben (siehe _serialize).
+        """
+        shards = [
+            (guild_id, self._shard_path(guild_id), self._serialize(self._snapshot(self._loaded[guild_id])))
+            for guild_id in self._dirty
+        ]
+        self._writing.update(self._dirty)
+        self._dirty.clear()
+        return shards
+
+    @staticmethod
+    def _snapshot(guild: dict) -> tuple:
+        """Unabhängige Kopie einer Partition: (Konfiguration, User, Aktivität)"""
+        config = {key: value for key, value in guild.items() if key not in ("users", "activity")}
+        return marshal.loads(marshal.dumps(_dump_guild_config(config))), guild["users"].copy(), guild["activity"].copy()
+
+    @staticmethod
+    def _serialize(snapshot: tuple):
+        """Serialisiert eine kopierte Partition (User spaltenweise), läuft erst beim Schreiben"""
+        config, users, activity = snapshot
+        yield json.dumps({**config, "users": users.to_json(), "activity": activity.to_json()})
+
+    def finish_write(self, guild_ids, success):
+        """Gibt geschriebene Partitionen zur Verdrängung frei (bei Fehler wieder dirty)"""
+        with self._lock:
+            self._writing.difference_update(guild_ids)
+            if success:
+                self._stats["shard_writes"] += len(guild_ids)
+            else:
+                self._dirty.update(guild_ids)
+            self._evict()
+
+    def stats(self) -> dict:
+        return {
+            **self._stats, "loaded": len(self._loaded), "known": len(self._known), "dirty": len(self._dirty),
+            "cold": sum(len(cold) for cold in self._cold.values())
+        }
+
+    def get_guild(self, guild_id):
+        return self._guild(guild_id)
+
+    def create_guild(self, guild_id, config):
+        self._commit("guild_create", guild=guild_id, config=config)
+
+    def set_guild_value(self, guild_id, key, value):
+        self._commit("guild_set", guild=guild_id, key=key, value=value)
+
+    def block_channels(self, guild_id, channel_ids):
+        self._commit("block_many", guild=guild_id, channels=list(channel_ids))
+
+    def unblock_channels(self, guild_id, channel_ids):
+        self._commit("unblock_many", guild=guild_id, channels=list(channel_ids))
+
+    def set_curve(self, guild_id, curve):
+        self._commit("curve_set", guild=guild_id, curve=curve)
+
+    def add_activity(self, guild_id, entries):
+        self._commit("activity", guild=guild_id, entries=[list(entry) for entry in entries])
+
+    def get_user(self, guild_id, user_id):
+        guild = self._guild(guild_id)
+        if guild is None:
+            return None
+        record = guild["users"].get(user_id)
+        if record is None:
+            record = self._cold_record(guild_id, user_id)
+            if record is not None:
+                self._promote(guild_id, guild, user_id, record)
+        return record
+
+    def _promote(self, guild_id, guild, user_id, record):
+        """Holt einen archivierten User nur im Speicher in die Partition (Lesen schreibt nichts)
+
+        Gespeichert wird er erst mit der nächsten echten Änderung; bis dahin
+        bleibt seine Kopie im Archiv gültig (siehe prepare_archive).
+        """
+        with self._lock:
+            self._set_record(guild_id, guild, user_id, record)
+            self._promoted.setdefault(guild_id, set()).add(user_id)
+
+    def set_user(self, guild_id, user_id, record):
+        self._commit("user", guild=guild_id, user=user_id, data=record)
+
+    def get_users(self, guild_id, user_ids):
+        result = {}
+        for user_id in user_ids:
+            record = self._record(guild_id, user_id)
+            if record is not None:
+                result[user_id] = record
+        return result
+
+    def set_users(self, guild_id, records):
+        self._commit("user_many", guild=guild_id, users=records)
+
+    def _rank_index(self, guild_id) -> TieredRanking:
+        """Gibt die Rangliste aus aktiven und archivierten Usern zurück (Rang-Index wird einmal aufgebaut)"""
+        guild = self._guild(guild_id)
+        rank_index = self._ranks.get(guild_id)
+        if rank_index is None:
+            rank_index = RankIndex(guild["users"].iter_xp())
+            self._ranks[guild_id] = rank_index
+        return TieredRanking(rank_index, self._cold[guild_id])
+
+    def top_users(self, guild_id, limit):
+        return [(user_id, self._record(guild_id, user_id)) for user_id, _ in self._rank_index(guild_id).top(limit)]
+
+    def get_xp_many(self, guild_id, user_ids):
+        users = self._guild(guild_id)["users"]
+        cold = self._cold[guild_id]
+        result = {}
+        for user_id in user_ids:
+            xp = users.xp_of(user_id)
+            if xp is None:
+                xp = cold.xp_of(user_id)
+            if xp is not None:
+                result[user_id] = xp
+        return result
+
+    def iter_ranked(self, guild_id, page: int = 256):
+        rank_index = self._rank_index(guild_id)
+        start = 0
+        while True:
+            entries = rank_index.slice(start, start + page)
+            if not entries:
+                return
+            yield from entries
+            start += len(entries)
+
+    def top_activity(self, guild_id, today, window, limit):
+        activity = self._guild(guild_id)["activity"]
+        with self._lock:
+            # Inaktive User fallen beim Lesen heraus, die Datei folgt beim nächsten Schreiben
+            activity.prune(today)
+        return activity.top(today, window, limit)
+
+    def iter_users(self, guild_id):
+        yield from self._guild(guild_id)["users"].items()
+        cold = self._cold[guild_id]
+        if not cold:
+            return
+        curve = self._curve(guild_id)
+        for chunk in range(COLD_CHUNKS):
+            # Direkt von der Platte, ein Durchlauf soll den Cache nicht verdrängen
+            for user_id, record in self._read_chunk(guild_id, chunk).items():
+                if user_id in cold:
+                    record["level"] = curve.level_for(record["xp"])
+                    yield user_id, record
+
+    def rank_of(self, guild_id, user_id):
+        user = self.get_user(guild_id, user_id)
+        if user is None:
+            return None
+        rank_index = self._rank_index(guild_id)
+        return rank_index.rank(user_id, user["xp"]), len(rank_index)
+
+    def users_around(self, guild_id, user_id, radius):
+        user = self.get_user(guild_id, user_id)
+        if user is None:
+            return []
+        return [
+            (rank, entry_id, self._record(guild_id, entry_id))
+            for rank, entry_id, _ in self._rank_index(guild_id).around(user_id, user["xp"], radius)
+        ]
+
+    def prepare_archive(self, guild_id, before):
+        guild = self._guild(guild_id)
+        if guild is None:
+            return None
+        users, activity = guild["users"], guild["activity"]
+        before_day = before // 86400
+        records = {}
+        for user_id in users.inactive(before):
+            # Sprachzeit setzt last_message_time nicht, zählt aber in den Tages-Buckets
+            last_day = activity.last_day(user_id)
+            if last_day is not None and last_day >= before_day:
+                continue
+            records[str(user_id)] = users.get(user_id)
+        if not records:
+            return None
+        cold = self._cold[guild_id].copy()
+        # Nur im Speicher zurückgeholte User behalten ihre Kopie im Archiv
+        cold.add_many(
+            (user_id, users.xp_of(user_id))
+            for user_id in self._promoted.get(guild_id, ()) if user_id not in records
+        )
+        return {"guild": guild_id, "users": records, "cold": cold}
+
+    def write_archive(self, plan):
+        guild_id = plan["guild"]
+        cold = plan["cold"]
+        os.makedirs(self._cold_path(guild_id), exist_ok=True)
+        chunks = {}
+        for user_id, record in plan["users"].items():
+            chunks.setdefault(self._chunk_of(user_id), []).append((user_id, record))
+        for chunk, records in chunks.items():
+            table = self._read_chunk(guild_id, chunk)
+            # Veraltete Kopien (User inzwischen wieder aktiv) fallen beim Umschreiben heraus
+            for user_id, _ in list(table.iter_xp()):
+                if user_id not in cold:
+                    table.remove(user_id)
+            for user_id, record in records:
+                table.set(user_id, record)
+            self._write_gzip(self._chunk_path(guild_id, chunk), table.to_json())
+        index = cold.to_json()
+        for user_id, record in plan["users"].items():
+            index["ids"].append(int(user_id))
+            index["xp"].append(record["xp"])
+        self._write_gzip(os.path.join(self._cold_path(guild_id), "index.json.gz"), index)
+
+    def commit_archive(self, plan):
+        entries = [[user_id, record["xp"], record["last_message_time"]] for user_id, record in plan["users"].items()]
+        self._commit("cold_freeze", guild=plan["guild"], users=entries, today=int(time.time()) // 86400)
+        return len(entries)
+
+
+class JsonTicketStore(TicketStore):
+    """Tickets in data["Tickets"] (Dict nach Channel-ID), Änderungen laufen über commit()
+
+    Die Anzahl offener Tickets pro Owner wird mitgeführt.
+    """
+
+    def __init__(self, data: dict, commit):
+        self._data = data
+        self._commit = commit
+        self._open_by_owner = Counter(int(ticket["Owner_ID"]) for ticket in data["Tickets"].values())
+
+    def _count(self, owner_id, delta: int):
+        owner_id = int(owner_id)
+        self._open_by_owner[owner_id] += delta
+        if self._open_by_owner[owner_id] <= 0:
+            del self._open_by_owner[owner_id]
+
+    def apply(self, record: dict):
+        """Wendet eine Ticket-Änderung an und hält den Owner-Index aktuell"""
+        tickets = self._data["Tickets"]
+        op = record["op"]
+        if op == "ticket_create":
+            ticket = record["ticket"]
+            previous = tickets.get(str(ticket["ID"]))
+            if previous is not None:
+                self._count(previous["Owner_ID"], -1)
+            tickets[str(ticket["ID"])] = ticket
+            self._count(ticket["Owner_ID"], 1)
+        elif op == "ticket_kill":
+            ticket = tickets.pop(str(record["id"]), None)
+            if ticket is not None:
+                self._count(ticket["Owner_ID"], -1)
+        elif op == "ticket_set":
+            ticket = tickets.get(str(record["id"]))
+            if ticket is not None:
+                if record["key"] == "Owner_ID":
+                    self._count(ticket["Owner_ID"], -1)
+                    self._count(record["value"], 1)
+                ticket[record["key"]] = record["value"]
+
+    def get(self, channel_id):
+        return self._data["Tickets"].get(str(channel_id))
+
+    def create(self, ticket):
+        self._commit("ticket_create", ticket=ticket)
+
+    def kill(self, channel_id):
+        self._commit("ticket_kill", id=channel_id)
+
+    def set_field(self, channel_id, key, value):
+        self._commit("ticket_set", id=channel_id, key=key, value=value)
+
+    def count_by_owner(self, owner_id):
+        return self._open_by_owner.get(int(owner_id), 0)
+
+
+class JsonListStore(ListStore):
+    """Listen in data[list_name] ({"Profiles": [...], "Last Message ID": int}), Änderungen laufen über commit()"""
+
+    def __init__(self, data: dict, commit):
+        self._data = data
+        self._commit = commit
+
+    def apply(self, record: dict):
+        op = record["op"]
+        if op == "list_push":
+            self._data[record["list"]]["Profiles"].append(record["item"])
+        elif op == "list_pop":
+            self._data[record["list"]]["Profiles"].pop(record["index"])
+
+    def items(self, list_name):
+        return self._data[list_name]["Profiles"]
+
+    def push(self, list_name, item):
+        self._commit("list_push", list=list_name, item=item)
+
+    def pop(self, list_name, index):
+        self._commit("list_pop", list=list_name, index=index)
+
+    def get_message_id(self, list_name):
+        return self._data[list_name]["Last Message ID"]
+
+    def set_message_id(self, list_name, message_id):
+        self._commit("set", path=[list_name, "Last Message ID"], value=message_id)
+
+
+# ====== SQLITE-BACKEND ======
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS guilds (
+    guild_id INTEGER PRIMARY KEY,
+    config TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS levels (
+    guild_id INTEGER NOT NULL,
+    user_id INTEGER NOT NULL,
+    xp INTEGER NOT NULL DEFAULT 0,
+    level INTEGER NOT NULL DEFAULT 0,
+    messages INTEGER NOT NULL DEFAULT 0,
+    last_message_time INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (guild_id, user_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_levels_xp ON levels (guild_id, xp DESC);
+CREATE TABLE IF NOT EXISTS activity (
+    guild_id INTEGER NOT NULL,
+    day INTEGER NOT NULL,
+    user_id INTEGER NOT NULL,
+    xp INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (guild_id, day, user_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS tickets (
+    id INTEGER PRIMARY KEY,
+    owner_id INTEGER NOT NULL,
+    type TEXT,
+    created TEXT,
+    message_id INTEGER,
+    extra TEXT NOT NULL DEFAULT '{}'
+);
+CREATE INDEX IF NOT EXISTS idx_tickets_owner ON tickets (owner_id);
+CREATE TABLE IF NOT EXISTS list_items (
+    id INTEGER PRIMARY KEY,
+    list TEXT NOT NULL,
+    author TEXT,
+    task TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_list_items_list ON list_items (list, id);
+CREATE TABLE IF NOT EXISTS lists (
+    name TEXT PRIMARY KEY,
+    message_id INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+_LEVEL_COLUMNS = ("xp", "level", "messages", "last_message_time")
+
+# Ticket-Felder mit eigener Spalte, alles andere landet in "extra"
+_TICKET_COLUMNS = {
+    "ID": "id",
+    "Owner_ID": "owner_id",
+    "Type": "type",
+    "Created": "created",
+    "message_id": "message_id",
+}
+
+
+def open_database(path: str) -> sqlite3.Connection:
+    """Öffnet (und initialisiert) die SQLite-Datenbank"""
+    connection = sqlite3.connect(path)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    connection.executescript(_SCHEMA)
+    return connection
+
+
+class SQLiteLevelStore(LevelStore):
+    """Level-Daten in SQLite, Server-Konfigurationen zusätzlich im Speicher"""
+
+    def __init__(self, connection: sqlite3.Connection):
+        self._db = connection
+        self._guilds = {
+            str(guild_id): _load_guild_config(json.loads(config))
+            for guild_id, config in self._db.execute("SELECT guild_id, config FROM guilds")
+        }
+
+    def _save_guild(self, guild_id):
+        with self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO guilds (guild_id, config) VALUES (?, ?)",
+                (int(guild_id), json.dumps(_dump_guild_config(self._guilds[guild_id])))
+            )
+
+    def get_guild(self, guild_id):
+        return self._guilds.get(guild_id)
+
+    def create_guild(self, guild_id, config):
+        self._guilds[guild_id] = _load_guild_config(dict(config))
+        self._save_guild(guild_id)
+
+    def set_guild_value(self, guild_id, key, value):
+        self._guilds[guild_id][key] = _guild_value(key, value)
+        self._save_guild(guild_id)
+
+    def block_channels(self, guild_id, channel_ids):
+        blocked = self._guilds[guild_id]["blocked_channels"]
+        size = len(blocked)
+        blocked.update(channel_ids)
+        if len(blocked) != size:
+            self._save_guild(guild_id)
+
+    def unblock_channels(self, guild_id, channel_ids):
+        blocked = self._guilds[guild_id]["blocked_channels"]
+        size = len(blocked)
+        blocked.difference_update(channel_ids)
+        if len(blocked) != size:
+            self._save_guild(guild_id)
+
+    def set_curve(self, guild_id, curve):
+        # Ein UPDATE über alle User des Servers, Level kommt aus der Kurve als SQL-Funktion
+        self._db.create_function("xp_level", 1, XPCurve.from_config(curve).level_for, deterministic=True)
+        self._guilds[guild_id]["xp_curve"] = curve
+        with self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO guilds (guild_id, config) VALUES (?, ?)",
+                (int(guild_id), json.dumps(_dump_guild_config(self._guilds[guild_id])))
+            )
+            self._db.execute(
+                "UPDATE levels SET level = xp_level(xp) WHERE guild_id = ? AND level != xp_level(xp)",
+                (int(guild_id),)
+            )
+
+    def get_user(self, guild_id, user_id):
+        row = self._db.execute(
+            "SELECT xp, level, messages, last_message_time FROM levels WHERE guild_id = ? AND user_id = ?",
+            (int(guild_id), int(user_id))
+        ).fetchone()
+        if row is None:
+            return None
+        return dict(zip(_LEVEL_COLUMNS, row))
+
+    def set_user(self, guild_id, user_id, record):
+        with self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO levels (guild_id, user_id, xp, level, messages, last_message_time) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (int(guild_id), int(user_id), *(record[column] for column in _LEVEL_COLUMNS))
+            )
+
+    def get_users(self, guild_id, user_ids):
+        result = {}
+        for start in range(0, len(user_ids), 500):
+            chunk = user_ids[start:start + 500]
+            by_id = {int(user_id): user_id for user_id in chunk}
+            rows = self._db.execute(
+                f"SELECT user_id, xp, level, messages, last_message_time FROM levels "
+                f"WHERE guild_id = ? AND user_id IN ({','.join('?' * len(chunk))})",
+                (int(guild_id), *by_id)
+            )
+            for row in rows:
+                result[by_id[row[0]]] = dict(zip(_LEVEL_COLUMNS, row[1:]))
+        return result
+
+    def set_users(self, guild_id, records):
+        with self._db:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO levels (guild_id, user_id, xp, level, messages, last_message_time) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    (int(guild_id), int(user_id), *(record[column] for column in _LEVEL_COLUMNS))
+                    for user_id, record in records.items()
+                )
+            )
+
+    def top_users(self, guild_id, limit):
+        rows = self._db.execute(
+            "SELECT user_id, xp, level, messages, last_message_time FROM levels "
+            "WHERE guild_id = ? ORDER BY xp DESC, user_id ASC LIMIT ?",
+            (int(guild_id), limit)
+        )
+        return [(str(row[0]), dict(zip(_LEVEL_COLUMNS, row[1:]))) for row in rows]
+
+    def get_xp_many(self, guild_id, user_ids):
+        result = {}
+        for start in range(0, len(user_ids), 500):
+            chunk = user_ids[start:start + 500]
+            by_id = {int(user_id): user_id for user_id in chunk}
+            rows = self._db.execute(
+                f"SELECT user_id, xp FROM levels WHERE guild_id = ? AND user_id IN ({','.join('?' * len(chunk))})",
+                (int(guild_id), *by_id)
+            )
+            for user_id, xp in rows:
+                result[by_id[user_id]] = xp
+        return result
+
+    def iter_ranked(self, guild_id, page: int = 256):
+        # Keyset-Pagination über den Index (guild_id, xp), kein OFFSET
+        rows = self._db.execute(
+            "SELECT user_id, xp FROM levels WHERE guild_id = ? ORDER BY xp DESC, user_id ASC LIMIT ?",
+            (int(guild_id), page)
+        ).fetchall()
+        while rows:
+            for user_id, xp in rows:
+                yield str(user_id), xp
+            last_id, last_xp = rows[-1]
+            rows = self._db.execute(
+                "SELECT user_id, xp FROM levels WHERE guild_id = ? AND (xp < ? OR (xp = ? AND user_id > ?)) "
+                "ORDER BY xp DESC, user_id ASC LIMIT ?",
+                (int(guild_id), last_xp, last_xp, last_id, page)
+            ).fetchall()
+
+    def add_activity(self, guild_id, entries):
+        entries = list(entries)
+        if not entries:
+            return
+        with self._db:
+            self._db.executemany(
+                "INSERT INTO activity (guild_id, day, user_id, xp) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (guild_id, day, user_id) DO UPDATE SET xp = xp + excluded.xp",
+                ((int(guild_id), day, int(user_id), xp) for user_id, day, xp in entries)
+            )
+            # Entspricht dem Ringpuffer des JSON-Backends: ältere Tage verfallen
+            self._db.execute(
+                "DELETE FROM activity WHERE guild_id = ? AND day <= ?",
+                (int(guild_id), max(day for _, day, _ in entries) - ACTIVITY_DAYS)
+            )
+
+    def top_activity(self, guild_id, today, window, limit):
+        window = min(window, ACTIVITY_DAYS)
+        rows = self._db.execute(
+            "SELECT user_id, SUM(xp) AS total FROM activity WHERE guild_id = ? AND day > ? AND day <= ? "
+            "GROUP BY user_id ORDER BY total DESC, user_id ASC LIMIT ?",
+            (int(guild_id), today - window, today, limit)
+        )
+        return [(str(user_id), total) for user_id, total in rows]
+
+    def iter_users(self, guild_id):
+        rows = self._db.execute(
+            "SELECT user_id, xp, level, messages, last_message_time FROM levels WHERE guild_id = ?",
+            (int(guild_id),)
+        )
+        for row in rows:
+            yield str(row[0]), dict(zip(_LEVEL_COLUMNS, row[1:]))
+
+    def rank_of(self, guild_id, user_id):
+        user = self.get_user(guild_id, user_id)
+        if user is None:
+            return None
+        # Zählt über den Index (guild_id, xp), ohne die Tabelle zu sortieren
+        above = self._db.execute(
+            "SELECT COUNT(*) FROM levels WHERE guild_id = ? AND (xp > ? OR (xp = ? AND user_id < ?))",
+            (int(guild_id), user["xp"], user["xp"], int(user_id))
+        ).fetchone()[0]
+        total = self._db.execute(
+            "SELECT COUNT(*) FROM levels WHERE guild_id = ?", (int(guild_id),)
+        ).fetchone()[0]
+        return above + 1, total
+
+    def users_around(self, guild_id, user_id, radius):
+        position = self.rank_of(guild_id, user_id)
+        if position is None:
+            return []
+        rank = position[0]
+        xp = self.get_user(guild_id, user_id)["xp"]
+        columns = "user_id, xp, level, messages, last_message_time"
+        above = self._db.execute(
+            f"SELECT {columns} FROM levels WHERE guild_id = ? AND (xp > ? OR (xp = ? AND user_id < ?)) "
+            "ORDER BY xp ASC, user_id DESC LIMIT ?",
+            (int(guild_id), xp, xp, int(user_id), radius)
+        ).fetchall()
+        below = self._db.execute(
+            f"SELECT {columns} FROM levels WHERE guild_id = ? AND (xp < ? OR (xp = ? AND user_id >= ?)) "
+            "ORDER BY xp DESC, user_id ASC LIMIT ?",
+            (int(guild_id), xp, xp, int(user_id), radius + 1)
+        ).fetchall()
+        rows = list(reversed(above)) + below
+        start = rank - len(above)
+        return [
+            (start + i, str(row[0]), dict(zip(_LEVEL_COLUMNS, row[1:])))
+            for i, row in enumerate(rows)
+        ]
+
+    def close(self):
+        self._db.close()
+
+
+class SQLiteTicketStore(TicketStore):
+    """Tickets in SQLite (Primärschlüssel Channel-ID, Index auf Owner)"""
+
+    def __init__(self, connection: sqlite3.Connection):
+        self._db = connection
+
+    def get(self, channel_id):
+        row = self._db.execute(
+            "SELECT id, owner_id, type, created, message_id, extra FROM tickets WHERE id = ?",
+            (int(channel_id),)
+        ).fetchone()
+        if row is None:
+            return None
+        ticket = {"ID": row[0], "Owner_ID": row[1], "Type": row[2], "Created": row[3]}
+        if row[4] is not None:
+            ticket["message_id"] = row[4]
+        ticket.update(json.loads(row[5]))
+        return ticket
+
+    def create(self, ticket):
+        extra = {key: value for key, value in ticket.items() if key not in _TICKET_COLUMNS}
+        with self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO tickets (id, owner_id, type, created, message_id, extra) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (int(ticket["ID"]), int(ticket["Owner_ID"]), ticket.get("Type"),
+                 ticket.get("Created"), ticket.get("message_id"), json.dumps(extra))
+            )
+
+    def kill(self, channel_id):
+        with self._db:
+            self._db.execute("DELETE FROM tickets WHERE id = ?", (int(channel_id),))
+
+    def set_field(self, channel_id, key, value):
+        if key in _TICKET_COLUMNS:
+            with self._db:
+                self._db.execute(
+                    f"UPDATE tickets SET {_TICKET_COLUMNS[key]} = ? WHERE id = ?",
+                    (value, int(channel_id))
+                )
+            return
+        ticket = self.get(channel_id)
+        if ticket is not None:
+            ticket[key] = value
+            self.create(ticket)
+
+    def count_by_owner(self, owner_id):
+        return self._db.execute(
+            "SELECT COUNT(*) FROM tickets WHERE owner_id = ?", (int(owner_id),)
+        ).fetchone()[0]
+
+
+class SQLiteListStore(ListStore):
+    """Listen in SQLite (Einträge in Einfüge-Reihenfolge, Nachrichten-ID pro Liste)"""
+
+    def __init__(self, connection: sqlite3.Connection):
+        self._db = connection
+
+    def items(self, list_name):
+        rows = self._db.execute("SELECT author, task FROM list_items WHERE list = ? ORDER BY id", (list_name,))
+        return [{"author": author, "task": task} for author, task in rows]
+
+    def push(self, list_name, item):
+        with self._db:
+            self._db.execute(
+                "INSERT INTO list_items (list, author, task) VALUES (?, ?, ?)",
+                (list_name, item.get("author"), item["task"])
+            )
+
+    def pop(self, list_name, index):
+        with self._db:
+            self._db.execute(
+                "DELETE FROM list_items WHERE id = "
+                "(SELECT id FROM list_items WHERE list = ? ORDER BY id LIMIT 1 OFFSET ?)",
+                (list_name, index)
+            )
+
+    def get_message_id(self, list_name):
+        row = self._db.execute("SELECT message_id FROM lists WHERE name = ?", (list_name,)).fetchone()
+        return row[0] if row is not None else 0
+
+    def set_message_id(self, list_name, message_id):
+        with self._db:
+            self._db.execute(
+                "INSERT INTO lists (name, message_id) VALUES (?, ?) "
+                "ON CONFLICT (name) DO UPDATE SET message_id = excluded.message_id",
+                (list_name, message_id)
+            )
+
+
+# ====== EXPORT / IMPORT ======
+EXPORT_FORMATS = ("jsonl", "csv")
+EXPORT_COLUMNS = ("user_id",) + USER_FIELDS
+_COLUMN_ALIASES = {
+    "id": "user_id", "userid": "user_id", "user": "user_id",
+    "experience": "xp", "message_count": "messages",
+}
+_MAX_VALUE = 2 ** 63 - 1
+
+
+def guess_format(path: str) -> str:
+    """Leitet das Format aus der Dateiendung ab (Standard: jsonl)"""
+    return "csv" if path.lower().endswith(".csv") else "jsonl"
+
+
+def write_level_rows(rows, file, fmt: str, header: bool = True) -> int:
+    """Schreibt (user_id, record)-Paare zeilenweise in eine Textdatei
+
+    Die Zeilen werden einzeln geschrieben, rows darf also ein Generator sein.
+    header=False lässt die CSV-Kopfzeile weg (Fortsetzung eines Exports).
+    Gibt die Anzahl geschriebener Zeilen zurück.
+    """
+    count = 0
+    if fmt == "csv":
+        writer = csv.writer(file)
+        if header:
+            writer.writerow(EXPORT_COLUMNS)
+        for user_id, record in rows:
+            writer.writerow((user_id, *(record.get(field, 0) for field in USER_FIELDS)))
+            count += 1
+    else:
+        for user_id, record in rows:
+            entry = {"user_id": user_id}
+            entry.update((field, record.get(field, 0)) for field in USER_FIELDS)
+            file.write(json.dumps(entry, separators=(",", ":")) + "\n")
+            count += 1
+    return count
+
+
+def _column_name(key) -> str:
+    """Vereinheitlicht einen Spaltennamen (Groß-/Kleinschreibung, Aliase)"""
+    key = str(key).strip().lower()
+    return _COLUMN_ALIASES.get(key, key)
+
+
+def _parse_count(value, name: str, default=None) -> int:
+    """Prüft einen Zählerwert (int >= 0) aus JSON oder CSV"""
+    if type(value) is int:
+        pass
+    elif value is None or value == "":
+        if default is None:
+            raise ValueError(f"{name} fehlt")
+        return default
+    elif isinstance(value, str):
+        value = value.strip()
+        if not value.isdigit():
+            raise ValueError(f"{name} ist keine ganze Zahl >= 0")
+        value = int(value)
+    elif isinstance(value, float) and value.is_integer():
+        value = int(value)
+    else:
+        raise ValueError(f"{name} ist keine ganze Zahl")
+    if not 0 <= value <= _MAX_VALUE:
+        raise ValueError(f"{name} außerhalb des gültigen Bereichs")
+    return value
+
+
+def _parse_row(row: dict):
+    """Prüft eine Import-Zeile (Spalten bereits vereinheitlicht) und gibt (user_id, record) zurück
+
+    Das Level wird ignoriert und vom Aufrufer aus den XP neu berechnet.
+    """
+    user_id = str(row.get("user_id", "")).strip()
+    if not user_id.isdigit() or not 0 < int(user_id) <= _MAX_VALUE:
+        raise ValueError(f"ungültige user_id {user_id[:24]!r}")
+    return str(int(user_id)), {
+        "xp": _parse_count(row.get("xp"), "xp"),
+        "level": 0,
+        "messages": _parse_count(row.get("messages"), "messages", 0),
+        "last_message_time": _parse_count(row.get("last_message_time"), "last_message_time", 0)
+    }
+
+
+def read_level_rows(file, fmt: str):
+    """Liest eine Export-Datei zeilenweise und prüft jede Zeile
+
+    Liefert (zeile, user_id, record) für gültige Zeilen und
+    (zeile, None, fehlermeldung) für ungültige. Es wird immer nur eine
+    Zeile gleichzeitig gehalten.
+    """
+    if fmt == "csv":
+        reader = csv.DictReader(file)
+        if not reader.fieldnames:
+            return
+        # Kopfzeile einmal vereinheitlichen statt in jeder Zeile
+        reader.fieldnames = [_column_name(key) for key in reader.fieldnames]
+        for row in reader:
+            try:
+                user_id, record = _parse_row(row)
+            except ValueError as e:
+                yield reader.line_num, None, str(e)
+                continue
+            yield reader.line_num, user_id, record
+        return
+    known = set(EXPORT_COLUMNS)
+    for line_no, line in enumerate(file, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+            if not isinstance(row, dict):
+                raise ValueError("Zeile ist kein JSON-Objekt")
+            if not known.issuperset(row):
+                row = {_column_name(key): value for key, value in row.items()}
+            user_id, record = _parse_row(row)
+        except ValueError as e:
+            # json.JSONDecodeError ist ebenfalls ein ValueError
+            yield line_no, None, str(e)
+            continue
+        yield line_no, user_id, record
+
+
+# ====== MIGRATION ======
+LIST_NAMES = ("shopping", "todo")
+
+
+def migrate_json_to_sqlite(data: dict, connection: sqlite3.Connection) -> tuple:
+    """Überträgt Level-Daten, Tickets und Listen aus data.json in SQLite
+
+    Gibt (Anzahl Server, Anzahl User, Anzahl Tickets, Anzahl Listen-Einträge)
+    zurück. Level laufen in einer einzigen Transaktion, eine Liste ersetzt
+    ihren bisherigen Inhalt (erneuter Aufruf dupliziert nichts).
+    """
+    guild_count = user_count = 0
+    with connection:
+        for guild_id, guild in data.get("levels", {}).items():
+            config = {key: value for key, value in guild.items() if key != "users"}
+            connection.execute(
+                "INSERT OR REPLACE INTO guilds (guild_id, config) VALUES (?, ?)",
+                (int(guild_id), json.dumps(config))
+            )
+            connection.executemany(
+                "INSERT OR REPLACE INTO levels (guild_id, user_id, xp, level, messages, last_message_time) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    (int(guild_id), int(user_id), *(record.get(column, 0) for column in _LEVEL_COLUMNS))
+                    for user_id, record in guild["users"].items()
+                )
+            )
+            guild_count += 1
+            user_count += len(guild["users"])
+    tickets = data.get("Tickets", [])
+    if isinstance(tickets, dict):
+        tickets = list(tickets.values())
+    ticket_store = SQLiteTicketStore(connection)
+    for ticket in tickets:
+        ticket_store.create(ticket)
+    item_count = 0
+    with connection:
+        for list_name in LIST_NAMES:
+            section = data.get(list_name)
+            if not section:
+                continue
+            connection.execute("DELETE FROM list_items WHERE list = ?", (list_name,))
+            connection.executemany(
+                "INSERT INTO list_items (list, author, task) VALUES (?, ?, ?)",
+                ((list_name, item.get("author"), item["task"]) for item in section.get("Profiles", []))
+            )
+            connection.execute(
+                "INSERT OR REPLACE INTO lists (name, message_id) VALUES (?, ?)",
+                (list_name, section.get("Last Message ID", 0))
+            )
+            item_count += len(section.get("Profiles", []))
+    return guild_count, user_count, len(tickets), item_count
+
+
+def _run_transfer(args: list):
+    """CLI für Export/Import eines Servers (der Bot darf dabei nicht laufen)"""
+    # Erst hier importieren: functions lädt Konfiguration und Daten
+    from functions import export_level_users, import_level_users, flush_data
+    command, guild_id, path = args[:3]
+    fmt = args[3] if len(args) > 3 else guess_format(path)
+    if fmt not in EXPORT_FORMATS:
+        print(f"Unbekanntes Format: {fmt} (jsonl oder csv)")
+        sys.exit(1)
+    start = time.perf_counter()
+    if command == "export":
+        with open(path, "w", encoding="utf-8", newline="") as file:
+            for rows in export_level_users(guild_id, file, fmt):
+                pass
+        duration = time.perf_counter() - start
+        print(f"Export abgeschlossen: {rows} User in {duration:.1f}s ({rows / max(duration, 1e-9):,.0f} Zeilen/s) -> {path}")
+        return
+    mode = args[4] if len(args) > 4 else "replace"
+    try:
+        with open(path, encoding="utf-8-sig", newline="") as file:
+            for state in import_level_users(guild_id, file, fmt, mode):
+                print(f"\r{state['rows']:,} Zeilen gelesen", end="", flush=True)
+    except ValueError as e:
+        print(f"Import abgebrochen: {e}")
+        sys.exit(1)
+    flush_data()
+    duration = time.perf_counter() - start
+    print(f"\nImport abgeschlossen: {state['imported']} importiert, {state['skipped']} übersprungen "
+          f"in {duration:.1f}s ({state['rows'] / max(duration, 1e-9):,.0f} Zeilen/s)")
+    for error in state["errors"]:
+        print(f"  {error}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) >= 4 and sys.argv[1] in ("export", "import"):
+        _run_transfer(sys.argv[1:])
+        sys.exit(0)
+    if len(sys.argv) < 2 or sys.argv[1] != "migrate":
+        print("Verwendung: python storage.py migrate [data.json] [data.sqlite3]")
+        print("            python storage.py export <guild_id> <datei> [jsonl|csv]")
+        print("            python storage.py import <guild_id> <datei> [jsonl|csv] [replace|add]")
+        sys.exit(1)
+    json_path = sys.argv[2] if len(sys.argv) > 2 else "data.json"
+    db_path = sys.argv[3] if len(sys.argv) > 3 else "data.sqlite3"
+    with open(json_path, encoding="utf-8") as file:
+        source = json.load(file)
+    guilds, users, tickets, items = migrate_json_to_sqlite(source, open_database(db_path))
+    print(f"Migration abgeschlossen: {guilds} Server, {users} User, {tickets} Tickets, {items} Listen-Einträge -> {db_path}")
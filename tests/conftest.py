@@ -0,0 +1,40 @@
+"""
+Gemeinsames Setup für die Tests
+
+functions.py liest beim Import config.py sowie data.json aus dem
+Arbeitsverzeichnis und startet die Persistenz. Die Tests laufen deshalb in
+einem eigenen Temp-Verzeichnis mit einer Dummy-Konfiguration (die echte
+config.py enthält Tokens und wird nie importiert). Der Flusher schreibt nur,
+wenn ein Test es ausdrücklich anstößt.
+"""
+
+import os
+import sys
+import tempfile
+import types
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+config = types.ModuleType("config")
+config.BOT_CONFIG = {"prefix": "!", "beta": True, "application_id": 0, "token": "", "test_token": ""}
+config.DISCORD_IDS = {}
+config.COLORS = {"violet": 0x8A2BE2, "red": 0xFF0000, "green": 0x00FF00, "blue": 0x0000FF, "orange": 0xFFA500}
+config.SYSTEM_CONFIG = {
+    "data": "data.json",
+    "FILEPATH": "data.json",
+    "BACKUP_PATH": "backup",
+    "PERSISTENCE_MODE": "write_behind",
+    "FLUSH_INTERVAL": 3600,
+    "FLUSH_MAX_CHANGES": 10 ** 9,
+}
+config.ALLOWED_GUILDS = {"level": []}
+sys.modules["config"] = config
+
+WORKDIR = tempfile.mkdtemp(prefix="bot-tests-")
+os.chdir(WORKDIR)
+
+
+def pytest_sessionfinish(session, exitstatus):
+    # pytest kehrt vorher ins Start-Verzeichnis zurück, der Flush beim Beenden gehört ins Temp-Verzeichnis
+    os.chdir(WORKDIR)
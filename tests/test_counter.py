@@ -0,0 +1,99 @@
+"""Stresstest für die Reihenfolge im Counter (CounterSequencer)"""
+
+import asyncio
+import random
+from types import SimpleNamespace
+
+from Extensions.counter import Counter, CounterSequencer
+
+CHANNELS = 10
+NUMBERS = 100
+USERS = 5
+WINDOW = 0.05
+JITTER = 0.03  # kleiner als WINDOW -> jede Nachricht muss richtig einsortiert werden
+
+
+class FakeChannel:
+    def __init__(self, channel_id: int):
+        self.id = channel_id
+        self.sent = []
+
+    async def send(self, content):
+        self.sent.append(content)
+
+
+def make_message(message_id: int, guild, channel, user_id: int, content: str):
+    async def add_reaction(emoji):
+        pass
+    author = SimpleNamespace(id=user_id, bot=False, mention=f"<@{user_id}>")
+    return SimpleNamespace(id=message_id, guild=guild, channel=channel, author=author,
+                           content=content, add_reaction=add_reaction)
+
+
+def test_interleaved_burst_keeps_every_chain():
+    """Gleichzeitig gesendete Zahlen in vielen Channels, zugestellt in gemischter Reihenfolge"""
+    rng = random.Random(7)
+
+    async def run():
+        cog = Counter(SimpleNamespace(is_ready=lambda: False))
+        cog.counter_data = {}
+        cog.legacy = {}
+        cog.sequencer = CounterSequencer(cog.apply_number, cog.respond, window=WINDOW)
+        respond = cog.sequencer.respond
+
+        async def slow_respond(message, result):
+            # Reaktion/Nachricht per REST: zufällige Dauer, Antworten überlappen sich
+            await asyncio.sleep(rng.random() * 0.003)
+            await respond(message, result)
+        cog.sequencer.respond = slow_respond
+
+        guild = SimpleNamespace(id=1)
+        channels = [FakeChannel(100 + c) for c in range(CHANNELS)]
+        cog.counter_data["1"] = {
+            str(channel.id): {"current_number": 0, "last_user": None, "active": True} for channel in channels
+        }
+
+        # Snowflake-IDs steigen in Sende-Reihenfolge, die Channels sind verschränkt
+        messages = []
+        snowflake = 1 << 40
+        for number in range(1, NUMBERS + 1):
+            for c, channel in enumerate(channels):
+                snowflake += rng.randint(1, 1000)
+                messages.append(make_message(snowflake, guild, channel, (number + c) % USERS, str(number)))
+
+        async def deliver(message, delay):
+            await asyncio.sleep(delay)
+            await cog.on_message(message)
+
+        # Zustellung wie vom Gateway: eigene Task pro Event, Reihenfolge durch Jitter vertauscht
+        await asyncio.gather(*(
+            deliver(message, index * 0.0005 + rng.random() * JITTER)
+            for index, message in enumerate(messages)
+        ))
+        await cog.cog_unload()
+        return cog, channels
+
+    cog, channels = asyncio.run(run())
+    for channel in channels:
+        assert cog.counter_data["1"][str(channel.id)]["current_number"] == NUMBERS
+        assert channel.sent == []
+    assert cog.sequencer.stats["applied"] == CHANNELS * NUMBERS
+    assert cog.sequencer.stats["late"] == 0
+
+
+def test_message_later_than_window_is_counted_late():
+    """Ein Nachzügler nach Ablauf des Fensters wird trotzdem gewertet, aber gezählt"""
+    applied = []
+
+    async def run():
+        sequencer = CounterSequencer(lambda message, number: applied.append(number), None, window=0.01)
+        channel = FakeChannel(1)
+        sequencer.enqueue(make_message(20, None, channel, 1, "2"), 2)
+        await asyncio.sleep(0.05)
+        sequencer.enqueue(make_message(10, None, channel, 2, "1"), 1)
+        await sequencer.close()
+        return sequencer
+
+    sequencer = asyncio.run(run())
+    assert applied == [2, 1]
+    assert sequencer.stats["late"] == 1
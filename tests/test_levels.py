@@ -0,0 +1,112 @@
+"""Tests für die Level-Funktionen in functions.py"""
+
+import asyncio
+from types import SimpleNamespace
+
+import discord
+
+import functions
+import storage
+
+
+def test_setup_records_setup_snowflake():
+    """Der Einrichtungszeitpunkt begrenzt später den History-Backfill"""
+    assert functions.setup_level_system("1001", 1234567890123456789)
+    assert functions.get_level_setup_id("1001") == 1234567890123456789
+    # Bereits gesetzt -> nicht überschreibbar
+    assert not functions.set_level_setup_id("1001", 1)
+
+    before = discord.utils.time_snowflake(discord.utils.utcnow())
+    functions.setup_level_system("1002")
+    assert functions.get_level_setup_id("1002") >= before
+
+
+def test_legacy_guild_gets_setup_id_once():
+    """Server ohne gespeicherten Zeitpunkt bekommen ihn einmalig nachgetragen"""
+    functions._levels.create_guild("1003", {"enabled": True, "blocked_channels": []})
+    assert functions.get_level_setup_id("1003") is None
+    assert functions.set_level_setup_id("1003", 42)
+    assert functions.get_level_setup_id("1003") == 42
+    assert not functions.set_level_setup_id("1003", 43)
+
+
+def test_iter_ranked_levels_stops_at_min_level():
+    """Nur User ab der Stufe, absteigend nach XP, ohne alle Datensätze zu lesen"""
+    functions.setup_level_system("1004", 1)
+    threshold = functions.get_xp_curve("1004").xp_for_level(5)
+    functions.add_xp_bulk("1004", {
+        "1": (threshold * 3, 1, 0),
+        "2": (threshold, 1, 0),
+        "3": (threshold - 1, 1, 0),
+        "4": (1, 1, 0),
+    })
+    ranked = list(functions.iter_ranked_levels("1004", 5))
+    assert [user_id for user_id, _ in ranked] == ["1", "2"]
+    assert ranked[1][1] == 5
+    assert functions.get_level_xp_many("1004", ["3", "9"]) == {"3": threshold - 1}
+
+
+def test_user_resolver_prefers_client_cache_over_not_found():
+    """Ein gecachtes "nicht gefunden" verdeckt keinen User, den der Client inzwischen kennt"""
+    resolver = functions.UserResolver(ttl=60)
+    known = {}
+
+    async def fetch_user(user_id):
+        raise discord.NotFound(SimpleNamespace(status=404, reason="Not Found"), "Unknown User")
+
+    client = SimpleNamespace(get_user=known.get, fetch_user=fetch_user)
+    assert asyncio.run(resolver.resolve_one(client, None, 7)) is None
+    known[7] = user = SimpleNamespace(id=7)
+    assert asyncio.run(resolver.resolve_one(client, None, 7)) is user
+    assert resolver.stats["not_found"] == 1
+
+
+def test_add_xp_bulk_writes_one_change(monkeypatch):
+    """Alle User eines Batches landen als eine Änderung im Store"""
+    functions.setup_level_system("1005", 1)
+    writes = []
+    monkeypatch.setattr(functions._levels, "set_user", lambda *args: writes.append(("set_user", args)))
+    set_users = functions._levels.set_users
+    monkeypatch.setattr(functions._levels, "set_users",
+                        lambda guild_id, records: writes.append(("set_users", len(records))) or set_users(guild_id, records))
+    changed = []
+
+    def listener(guild_id, user_id, old_record, record):
+        changed.append(user_id)
+
+    functions.register_level_listener(listener)
+    try:
+        functions.add_xp_bulk("1005", {str(user_id): (10, 1, 0) for user_id in range(50)})
+    finally:
+        functions.unregister_level_listener(listener)
+    assert writes == [("set_users", 50)]
+    assert len(changed) == 50
+    assert functions.get_user_level_data("1005", "7")["xp"] == 10
+
+
+def test_reading_archived_user_does_not_write():
+    """Ein archivierter User wird beim Lesen nur im Speicher zurückgeholt"""
+    functions.setup_level_system("1006", 1)
+    # Letzte Nachricht 1970 -> sofort archivierbar
+    functions.add_xp_bulk("1006", {"3": (500, 5, 1), "4": (20, 1, 1)})
+    assert asyncio.run(functions.archive_inactive_users("1006")) == 2
+    functions.flush_data()
+
+    pending = functions._pending_changes
+    record = functions.get_user_level_data("1006", "3")
+    assert record["xp"] == 500
+    assert functions.get_user_rank("1006", "3") == (1, 2)
+    assert functions._pending_changes == pending
+    assert "1006" not in functions._levels._dirty
+
+    # Ein weiterer Archivlauf behält die Archiv-Kopie des nur gelesenen Users
+    functions.add_xp_bulk("1006", {"5": (1, 1, 1)})
+    assert asyncio.run(functions.archive_inactive_users("1006")) == 2
+    functions.flush_data()
+    reloaded = storage.ShardedLevelStore(functions.LEVELS_PATH, functions.commit, functions._data_lock)
+    assert reloaded.get_user("1006", "3")["xp"] == 500
+
+    # Die nächste echte Änderung speichert den User wieder in der Partition
+    functions.add_xp_bulk("1006", {"4": (5, 1, 2)})
+    assert functions.get_user_level_data("1006", "4")["xp"] == 25
+    assert "1006" in functions._levels._dirty
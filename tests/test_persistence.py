@@ -0,0 +1,91 @@
+"""Tests für die Write-Behind-Persistenz in functions.py"""
+
+import asyncio
+import json
+import time
+
+import pytest
+
+import functions
+
+
+def test_failed_flush_is_retried(monkeypatch):
+    """Ein fehlgeschlagener Schreibvorgang darf keine Änderungen verlieren"""
+    functions.commit("set", path=["Last ID"], value=4711)
+
+    original = functions._write_file_atomic
+    def broken(path, payload):
+        raise OSError("Platte voll")
+    monkeypatch.setattr(functions, "_write_file_atomic", broken)
+    with pytest.raises(OSError):
+        functions.flush_data()
+
+    # Die Änderung ist weiterhin vorgemerkt, Flusher und Shutdown schreiben sie erneut
+    assert functions._needs_flush()
+    assert functions.get_persistence_stats()["pending"] > 0
+
+    monkeypatch.setattr(functions, "_write_file_atomic", original)
+    functions.flush_data()
+    with open("data.json", encoding="utf-8") as file:
+        assert json.load(file)["Last ID"] == 4711
+    assert not functions._needs_flush()
+
+
+def _large_section(entries: int) -> dict:
+    """Ticket-ähnliche Einträge (ca. 300 Byte JSON pro Eintrag)"""
+    return {
+        str(10 ** 17 + i): {
+            "ID": 10 ** 17 + i, "Owner_ID": 10 ** 17 + i % 500, "Type": "support",
+            "Status": "open", "Title": f"Ticket {i} mit etwas Beschreibungstext",
+            "Messages": [{"author": 10 ** 17 + i, "content": "x" * 40}] * 3,
+        }
+        for i in range(entries)
+    }
+
+
+def test_large_write_keeps_event_loop_responsive():
+    """Ein großer Flush darf weder den Event-Loop noch commit() für die ganze Serialisierung blockieren"""
+    section = _large_section(60000)
+    functions.commit("set", path=["lag_test"], value=section)
+
+    # Vergleichswert: dieselbe Serialisierung direkt im Event-Loop
+    start = time.perf_counter()
+    json.dumps(functions.data)
+    blocking = time.perf_counter() - start
+
+    async def measure():
+        stop = asyncio.Event()
+        lags, commits = [], []
+
+        async def probe():
+            while not stop.is_set():
+                start = time.perf_counter()
+                await asyncio.sleep(0.005)
+                lags.append(time.perf_counter() - start - 0.005)
+
+        async def writer():
+            i = 0
+            while not stop.is_set():
+                start = time.perf_counter()
+                functions.commit("set", path=["lag_probe"], value=i)
+                commits.append(time.perf_counter() - start)
+                i += 1
+                await asyncio.sleep(0.005)
+
+        tasks = [asyncio.create_task(probe()), asyncio.create_task(writer())]
+        await asyncio.sleep(0.05)
+        await functions.flush_data_async()
+        stop.set()
+        await asyncio.gather(*tasks)
+        return max(lags), max(commits)
+
+    max_lag, max_commit = asyncio.run(measure())
+    print(f"json.dumps im Loop: {blocking * 1000:.0f} ms, max. Loop-Lag: {max_lag * 1000:.1f} ms, "
+          f"max. commit(): {max_commit * 1000:.1f} ms")
+    assert max_lag < blocking / 4
+    assert max_commit < blocking / 2
+
+    with open("data.json", encoding="utf-8") as file:
+        assert len(json.load(file)["lag_test"]) == len(section)
+    functions.commit("set", path=["lag_test"], value={})
+    functions.flush_data()
@@ -0,0 +1,69 @@
+"""Tests für RankIndex (leveling.py) gegen eine mit sorted() berechnete Rangliste"""
+
+import random
+
+import pytest
+
+from leveling import RankIndex
+
+
+class SmallRankIndex(RankIndex):
+    # Kleine Blöcke, damit Teilen, Löschen leerer Blöcke und Fenwick-Neuaufbau oft vorkommen
+    LOAD = 4
+
+
+def expected(users: dict) -> list:
+    return [(str(user_id), xp) for user_id, xp in sorted(users.items(), key=lambda item: (-item[1], item[0]))]
+
+
+def check(index: RankIndex, users: dict, rng: random.Random):
+    ranking = expected(users)
+    assert len(index) == len(ranking)
+    assert index.slice(0, len(ranking) + 5) == ranking
+    for _ in range(10):
+        start = rng.randint(-2, len(ranking) + 2)
+        stop = rng.randint(max(start, 0), len(ranking) + 4)
+        assert index.slice(start, stop) == ranking[max(start, 0):stop]
+    for position, (user_id, xp) in enumerate(ranking, 1):
+        assert index.rank(user_id, xp) == position
+        assert index.count_before(user_id, xp) == position - 1
+    assert index.rank(10 ** 9, 5) == 0
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_random_updates_match_sorted(seed):
+    rng = random.Random(seed)
+    users = {user_id: rng.randint(0, 50) for user_id in rng.sample(range(1, 1000), 40)}
+    index = SmallRankIndex(users.items())
+    check(index, users, rng)
+    for step in range(600):
+        action = rng.random()
+        if action < 0.4 or not users:
+            user_id = rng.randint(1, 1000)
+            xp = rng.randint(0, 50)  # wenige XP-Werte -> viele Gleichstände
+            index.update(user_id, users.get(user_id), xp)
+            users[user_id] = xp
+        elif action < 0.7:
+            user_id = rng.choice(list(users))
+            new_xp = users[user_id] + rng.randint(1, 20)
+            index.update(user_id, users[user_id], new_xp)
+            users[user_id] = new_xp
+        else:
+            user_id = rng.choice(list(users))
+            index.update(user_id, users.pop(user_id), None)
+        if step % 25 == 0:
+            check(index, users, rng)
+    check(index, users, rng)
+
+
+def test_around_and_empty():
+    index = SmallRankIndex()
+    assert index.top(3) == [] and index.around(1, 0, 2) == []
+    for user_id in range(1, 11):
+        index.update(user_id, None, user_id * 10)
+    assert index.top(3) == [("10", 100), ("9", 90), ("8", 80)]
+    assert index.around(5, 50, 1) == [(5, "6", 60), (6, "5", 50), (7, "4", 40)]
+    assert index.around(10, 100, 2) == [(1, "10", 100), (2, "9", 90), (3, "8", 80)]
+    for user_id in range(1, 11):
+        index.update(user_id, user_id * 10, None)
+    assert len(index) == 0 and index.top(3) == []
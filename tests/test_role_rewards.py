@@ -0,0 +1,33 @@
+"""Tests für den Rollen-Abgleich (RoleRewardQueue in Extensions/level.py)"""
+
+import asyncio
+from types import SimpleNamespace
+
+import functions
+from Extensions.level import RoleRewardQueue
+
+
+def test_reconcile_only_enqueues_candidates():
+    """Abgeglichen werden User ab der niedrigsten Stufe und Members mit Belohnungs-Rolle"""
+    functions.setup_level_system("2001", 1)
+    threshold = functions.get_xp_curve("2001").xp_for_level(5)
+    functions.add_xp_bulk("2001", {str(user_id): (1, 1, 0) for user_id in range(100, 2100)})
+    functions.add_xp_bulk("2001", {"1": (threshold, 1, 0), "2": (threshold * 2, 1, 0)})
+    functions.set_level_reward("2001", 5, "555")
+    # User 100 trägt die Rolle noch, liegt aber unter der Schwelle
+    role = SimpleNamespace(members=[SimpleNamespace(id=100)])
+    guild = SimpleNamespace(get_role=lambda role_id: role if role_id == 555 else None)
+    queue = RoleRewardQueue(SimpleNamespace(get_guild=lambda guild_id: guild))
+
+    async def run():
+        job = queue.reconcile("2001")
+        assert job["scanning"]
+        await asyncio.gather(*queue._scans.values())
+        return job
+
+    job = asyncio.run(run())
+    assert not job["scanning"]
+    assert job["total"] == 3
+    assert list(queue._pending) == [("2001", "2"), ("2001", "1"), ("2001", "100")]
+    assert queue._pending[("2001", "1")] == 5
+    assert queue._pending[("2001", "100")] < 5
@@ -0,0 +1,99 @@
+"""Tests für die Speicher-Backends in storage.py"""
+
+import pytest
+
+from leveling import ACTIVITY_DAYS
+from storage import (
+    open_database, migrate_json_to_sqlite, SQLiteLevelStore, SQLiteTicketStore, SQLiteListStore, JsonListStore, TicketStore
+)
+
+
+def sqlite_store():
+    store = SQLiteLevelStore(open_database(":memory:"))
+    store.create_guild("1", {"enabled": True, "blocked_channels": []})
+    return store
+
+
+def test_sqlite_top_activity_is_read_only():
+    """Ranglisten lesen nur, alte Tage verfallen beim Schreiben neuer XP"""
+    store = sqlite_store()
+    store.add_activity("1", [("10", 100, 5), ("11", 100, 3)])
+    changes = store._db.total_changes
+    assert store.top_activity("1", 100 + ACTIVITY_DAYS, 7, 10) == []
+    assert store._db.total_changes == changes
+
+    store.add_activity("1", [("10", 100 + ACTIVITY_DAYS, 7)])
+    assert store._db.execute("SELECT COUNT(*) FROM activity").fetchone()[0] == 1
+    assert store.top_activity("1", 100 + ACTIVITY_DAYS, 7, 10) == [("10", 7)]
+
+
+def test_incomplete_backend_fails_on_construction():
+    """Ein Backend ohne alle Methoden der Schnittstelle lässt sich nicht anlegen"""
+    class PartialTickets(TicketStore):
+        def get(self, channel_id):
+            return None
+
+    with pytest.raises(TypeError, match="count_by_owner"):
+        PartialTickets()
+
+
+def legacy_data():
+    return {
+        "levels": {
+            "1": {"enabled": True, "blocked_channels": ["5"], "users": {
+                "10": {"xp": 120, "level": 2, "messages": 4, "last_message_time": 100},
+                "11": {"xp": 30, "level": 1, "messages": 1},
+            }},
+        },
+        "Tickets": {"900": {"ID": 900, "Owner_ID": 7, "Type": "support", "Created": "heute", "message_id": 3, "note": "x"}},
+        "shopping": {"Profiles": [{"author": "a", "task": "Milch"}, {"author": "b", "task": "Brot"}], "Last Message ID": 44},
+        "todo": {"Profiles": [], "Last Message ID": 0},
+    }
+
+
+def test_migrate_json_to_sqlite():
+    """Level, Tickets und Listen kommen vollständig an, ein zweiter Lauf dupliziert nichts"""
+    connection = open_database(":memory:")
+    assert migrate_json_to_sqlite(legacy_data(), connection) == (1, 2, 1, 2)
+    assert migrate_json_to_sqlite(legacy_data(), connection) == (1, 2, 1, 2)
+
+    levels = SQLiteLevelStore(connection)
+    assert levels.get_guild("1")["blocked_channels"] == {"5"}
+    assert levels.get_user("1", "10") == {"xp": 120, "level": 2, "messages": 4, "last_message_time": 100}
+    assert levels.get_user("1", "11")["last_message_time"] == 0
+    assert [user_id for user_id, _ in levels.top_users("1", 10)] == ["10", "11"]
+
+    tickets = SQLiteTicketStore(connection)
+    assert tickets.get(900) == {"ID": 900, "Owner_ID": 7, "Type": "support", "Created": "heute", "message_id": 3, "note": "x"}
+    assert tickets.count_by_owner(7) == 1
+
+    lists = SQLiteListStore(connection)
+    assert [item["task"] for item in lists.items("shopping")] == ["Milch", "Brot"]
+    assert lists.get_message_id("shopping") == 44
+    assert lists.items("todo") == [] and lists.get_message_id("todo") == 0
+
+
+def test_list_stores_behave_the_same():
+    """JSON- und SQLite-Listen liefern nach denselben Änderungen denselben Stand"""
+    data = legacy_data()
+
+    def commit(op, **fields):
+        record = {"op": op, **fields}
+        if op == "set":
+            data[record["path"][0]][record["path"][1]] = record["value"]
+        else:
+            json_store.apply(record)
+
+    json_store = JsonListStore(data, commit)
+    connection = open_database(":memory:")
+    migrate_json_to_sqlite(legacy_data(), connection)
+    sqlite_store = SQLiteListStore(connection)
+    for store in (json_store, sqlite_store):
+        store.push("shopping", {"author": "c", "task": "Käse"})
+        store.pop("shopping", 0)
+        store.push("todo", {"author": "d", "task": "Aufräumen"})
+        store.set_message_id("todo", 99)
+    for list_name in ("shopping", "todo"):
+        assert json_store.items(list_name) == sqlite_store.items(list_name)
+        assert json_store.get_message_id(list_name) == sqlite_store.get_message_id(list_name)
+    assert [item["task"] for item in sqlite_store.items("shopping")] == ["Brot", "Käse"]
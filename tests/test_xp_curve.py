@@ -0,0 +1,69 @@
+"""Tests für XPCurve (leveling.py)"""
+
+import math
+import random
+
+import pytest
+
+from leveling import XPCurve, MAX_LEVEL
+
+
+def reference_level(thresholds: list, xp: int) -> int:
+    """Höchstes Level, dessen Schwelle erreicht ist (lineare Suche)"""
+    return max(level for level, threshold in enumerate(thresholds) if threshold <= xp)
+
+
+@pytest.mark.parametrize("config", [
+    {"type": "quadratic", "factor": 100},
+    {"type": "quadratic", "factor": 7},
+    {"type": "linear", "step": 250},
+    {"type": "mee6"},
+    {"type": "table", "thresholds": [10, 30, 70, 150]},
+])
+def test_level_for_matches_thresholds(config):
+    curve = XPCurve.from_config(config)
+    rng = random.Random(1)
+    top = curve.thresholds[-1]
+    samples = {0, 1, top - 1, top, top + 1, 10 ** 12}
+    for threshold in curve.thresholds[:50]:
+        samples.update((threshold - 1, threshold, threshold + 1))
+    samples.update(rng.randint(0, top + 1000) for _ in range(200))
+    for xp in sorted(value for value in samples if value >= 0):
+        level = curve.level_for(xp)
+        assert level == reference_level(curve.thresholds, xp)
+        # Über der letzten Schwelle bleibt das Level konstant
+        assert level <= curve.max_level
+    assert list(curve.levels_for([0, top, top + 5])) == [0, curve.max_level, curve.max_level]
+
+
+def test_quadratic_matches_previous_formula():
+    """Standardkurve = bisherige Berechnung int(sqrt(xp / 100))"""
+    curve = XPCurve.from_config(None)
+    for xp in list(range(0, 5000)) + [10 ** 6, 99 ** 2 * 100 - 1, 99 ** 2 * 100]:
+        assert curve.level_for(xp) == min(math.isqrt(xp // 100), MAX_LEVEL)
+
+
+def test_mee6_known_thresholds():
+    curve = XPCurve.from_config({"type": "mee6"})
+    assert curve.thresholds[:4] == [0, 100, 255, 475]
+    assert curve.level_for(254) == 1 and curve.level_for(255) == 2
+
+
+def test_progress_and_xp_for_level():
+    curve = XPCurve.from_config({"type": "linear", "step": 100})
+    assert curve.xp_for_level(3) == 300
+    assert curve.xp_for_level(-1) == 0 and curve.xp_for_level(10 ** 6) == curve.thresholds[-1]
+    assert curve.progress(350) == (50, 100, 50.0)
+    assert curve.progress(curve.thresholds[-1] + 7) == (7, 0, 100)
+
+
+@pytest.mark.parametrize("config", [
+    {"type": "quadratic", "factor": 0},
+    {"type": "linear", "step": -5},
+    {"type": "table", "thresholds": []},
+    {"type": "table", "thresholds": [10, 10]},
+    {"type": "cubic"},
+])
+def test_invalid_config_raises(config):
+    with pytest.raises(ValueError):
+        XPCurve.from_config(config)